@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark du formatage des sections
+Compare l'ancien HTMLGenerator._format_content (regex multi-passes) au
+convertisseur Markdown en une passe, sur un corpus de sorties du modèle
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generators.markdown_converter import MarkdownConverter
+from generators.section_stream import parse_sections
+
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'corpus'
+
+
+def legacy_format_content(content: str) -> str:
+    """Ancienne implémentation de HTMLGenerator._format_content (référence)"""
+    content = re.sub(r'^- (.+)', r'<li>\1</li>', content, flags=re.MULTILINE)
+    content = re.sub(r'(<li>.*</li>)', r'<ul>\1</ul>', content, flags=re.DOTALL)
+
+    paragraphs = content.split('\n\n')
+    formatted_paragraphs = []
+
+    for para in paragraphs:
+        para = para.strip()
+        if para:
+            if not para.startswith('<'):
+                para = f'<p>{para}</p>'
+            formatted_paragraphs.append(para)
+
+    return '\n\n                '.join(formatted_paragraphs)
+
+
+def load_corpus(cache_path: str = None) -> List[str]:
+    """Sections du corpus : exemples fournis + sorties réelles du cache de génération"""
+    outputs = [path.read_text(encoding='utf-8') for path in sorted(CORPUS_DIR.glob('*.txt'))]
+
+    if cache_path and Path(cache_path).exists():
+        conn = sqlite3.connect(cache_path)
+        outputs.extend(row[0] for row in conn.execute('SELECT response FROM generations'))
+        conn.close()
+
+    sections = []
+    for output in outputs:
+        sections.extend(text for text in parse_sections(output).values() if text)
+    return sections
+
+
+def bench(func: Callable[[str], str], sections: List[str], repeat: int) -> float:
+    """Meilleur temps (s) pour formater tout le corpus"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for section in sections:
+            func(section)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scaling(func: Callable[[str], str], sections: List[str], factors: List[int]) -> Dict[int, float]:
+    """Temps par Ko sur une section unique de taille croissante (vérifie la linéarité)"""
+    base = '\n'.join(sections)
+    results = {}
+    for factor in factors:
+        text = '\n'.join([base] * factor)
+        start = time.perf_counter()
+        func(text)
+        elapsed = time.perf_counter() - start
+        results[factor] = elapsed / (len(text) / 1024) * 1e6
+    return results
+
+
+def main():
+    """Point d'entrée du benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark du formatage Markdown -> HTML')
+    parser.add_argument('--cache', default='output/cache/generations.db',
+                        help='Cache de génération contenant des sorties réelles du modèle')
+    parser.add_argument('--repeat', type=int, default=20, help='Nombre de répétitions')
+    parser.add_argument('--json', help='Fichier de résultats JSON')
+    args = parser.parse_args()
+
+    sections = load_corpus(args.cache)
+    corpus_bytes = sum(len(section.encode('utf-8')) for section in sections)
+    converter = MarkdownConverter()
+
+    candidates = {
+        'legacy': legacy_format_content,
+        'single_pass': converter.convert
+    }
+
+    results = {'sections': len(sections), 'corpus_bytes': corpus_bytes}
+    print(f"Corpus: {len(sections)} sections, {corpus_bytes / 1024:.1f} Ko")
+
+    for name, func in candidates.items():
+        elapsed = bench(func, sections, args.repeat)
+        scaling = bench_scaling(func, sections, [1, 10, 100])
+        results[name] = {
+            'total_s': elapsed,
+            'us_per_section': elapsed / max(1, len(sections)) * 1e6,
+            'mb_per_s': corpus_bytes / elapsed / 1e6 if elapsed else 0.0,
+            'us_per_kb_by_size': scaling
+        }
+        print(f"{name:>12}: {results[name]['us_per_section']:8.1f} µs/section, "
+              f"{results[name]['mb_per_s']:6.1f} Mo/s, "
+              f"µs/Ko x1/x10/x100: " + ' / '.join(f"{v:.1f}" for v in scaling.values()))
+
+    results['speedup'] = results['legacy']['total_s'] / max(1e-12, results['single_pass']['total_s'])
+    print(f"Accélération (legacy / single_pass): {results['speedup']:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
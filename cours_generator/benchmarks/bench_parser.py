@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark du parser d'inventaire
+Mesure FrancaisParser sur francais_all.md et sur des inventaires 2, 3, 10 et
+100 fois plus grands (mêmes arbres, noms suffixés) pour vérifier que le temps
+par ligne reste constant
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from parsers.md_parser import FrancaisParser
+
+
+SECTION_RE = re.compile(r'^/[^/\s]+/\s*$', re.MULTILINE)
+NAME_RE = re.compile(r'([\w-]+)(\.md\b|/$)', re.MULTILINE)
+
+
+def scale_inventory(content: str, factor: int) -> str:
+    """Inventaire factor fois plus grand : chaque section répète son arbre avec des noms suffixés"""
+    headers = SECTION_RE.findall(content)
+    bodies = SECTION_RE.split(content)[1:]
+    parts = []
+    for header, body in zip(headers, bodies):
+        parts.append(header)
+        for copy in range(factor):
+            parts.append(NAME_RE.sub(rf'\1_{copy}\2', body.rstrip('\n')) if copy else body.rstrip('\n'))
+        parts.append('')
+    return '\n'.join(parts)
+
+
+def bench(content: str, repeat: int) -> float:
+    """Meilleur temps (s) pour parser le contenu"""
+    parser = FrancaisParser()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser._parse_content(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Point d'entrée du benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark du parser d'inventaire")
+    parser.add_argument('--input', default=str(ROOT.parent / 'francais_all.md'), help='Inventaire de référence')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 2, 3, 10, 100],
+                        help="Facteurs d'agrandissement de l'inventaire")
+    parser.add_argument('--repeat', type=int, default=20, help='Nombre de répétitions')
+    parser.add_argument('--json', help='Fichier de résultats JSON')
+    args = parser.parse_args()
+
+    content = Path(args.input).read_text(encoding='utf-8')
+    results: Dict[str, List[Dict]] = {'runs': []}
+
+    for factor in args.factors:
+        scaled = scale_inventory(content, factor)
+        lines = scaled.count('\n') + 1
+        items = sum(len(items) for items in FrancaisParser()._parse_content(scaled).values())
+        elapsed = bench(scaled, max(1, args.repeat // factor))
+        run = {
+            'factor': factor,
+            'lines': lines,
+            'items': items,
+            'total_ms': round(elapsed * 1000, 3),
+            'us_per_line': round(elapsed / lines * 1e6, 3)
+        }
+        results['runs'].append(run)
+        print(f"x{factor:<4} {lines:>7} lignes, {items:>7} éléments: {run['total_ms']:9.3f} ms, "
+              f"{run['us_per_line']:.3f} µs/ligne")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
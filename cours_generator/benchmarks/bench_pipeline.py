@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du pipeline de génération
+Lance CourseGenerator.run contre un serveur Ollama factice local sur des
+inventaires synthétiques (100, 1 000, 10 000 éléments) et enregistre le débit,
+les percentiles de latence, le temps CPU par page et la mémoire maximale
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_ollama import serve
+from main import CourseGenerator, load_config
+
+
+CATEGORIES = ('auteur', 'mouvement', 'notions', 'methodes')
+
+
+def write_inventory(path: Path, size: int) -> Path:
+    """Inventaire synthétique au format de francais_all.md, réparti entre les catégories"""
+    lines = []
+    for index, category in enumerate(CATEGORIES):
+        lines.append(f'/{category}/')
+        lines.append('│')
+        numbers = range(index, size, len(CATEGORIES))
+        for n in numbers:
+            suffix = ' (à créer)' if n % 3 == 0 else ''
+            branch = '└──' if n == numbers[-1] else '├──'
+            lines.append(f'{branch} {category}_{n:05d}.md{suffix}')
+        lines.append('')
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    return path
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    """Attend que le serveur factice accepte les connexions"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Serveur factice injoignable sur {host}:{port}")
+
+
+def run_server(config: Dict[str, Any]):
+    """Processus du serveur factice (hors du processus mesuré)"""
+    try:
+        asyncio.run(serve(config))
+    except KeyboardInterrupt:
+        pass
+
+
+def cpu_time() -> float:
+    """Temps CPU utilisateur + système du processus et de ses enfants terminés (pool de rendu)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def run_single(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Un run complet dans un processus dédié (mémoire maximale non partagée entre tailles)"""
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as tmp:
+        tmp_dir = Path(tmp)
+        inventory = write_inventory(tmp_dir / 'francais_all.md', size)
+
+        config = load_config(args.config)
+        config.update({
+            'output_dir': str(tmp_dir / 'generated_courses'),
+            'batch_size': args.concurrency,
+            'build_mode': 'force',
+            'ollama': {
+                **config.get('ollama', {}),
+                'base_urls': [f"http://{args.host}:{args.port + n}" for n in range(args.nodes)],
+                'cache': {'path': ':memory:'},
+                'prefix_reuse': args.prefix_reuse,
+                'adaptive_concurrency': {
+                    **config.get('ollama', {}).get('adaptive_concurrency', {}),
+                    'enabled': args.adaptive,
+                    'initial_limit': args.concurrency
+                }
+            },
+            'pipeline': {**config.get('pipeline', {}), 'render_executor': args.render_executor},
+            'streaming': {**config.get('streaming', {}), 'enabled': args.stream},
+            'writer': {**config.get('writer', {}), 'archive': None},
+            'templates': {'base_template': str(ROOT / 'templates' / 'base_template.html')},
+            'metrics': {'json': None, 'sample_interval': 0},
+            'logging': {'level': 'WARNING', 'file': str(tmp_dir / 'bench.log')}
+        })
+
+        generator = CourseGenerator(config)
+        cpu_start = cpu_time()
+        start = time.perf_counter()
+        report = asyncio.run(generator.run(str(inventory))) or {}
+        wall = time.perf_counter() - start
+        cpu = cpu_time() - cpu_start
+
+    fetch = report.get('pipeline', {}).get('fetch', {})
+    pages = report.get('successful', 0)
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'items': report.get('items', 0),
+        'pages': pages,
+        'wall_time_s': round(wall, 3),
+        'items_per_s': round(pages / wall, 2) if wall else 0.0,
+        'latency_p50_s': fetch.get('latency_p50', 0.0),
+        'latency_p95_s': fetch.get('latency_p95', 0.0),
+        'latency_p99_s': fetch.get('latency_p99', 0.0),
+        'cpu_s_per_page': round(cpu / pages, 5) if pages else 0.0,
+        'render_s_per_page': round(report.get('pipeline', {}).get('render_time', 0.0) / pages, 5) if pages else 0.0,
+        'peak_rss_mb': round(peak_rss / 1024, 1),
+        'slot_utilisation': fetch.get('slot_utilisation', 0.0),
+        'prompt_eval_tokens': report.get('ollama', {}).get('prompt_eval_tokens', 0),
+        'prompt_eval_s': round(report.get('ollama', {}).get('prompt_eval_time', 0.0), 2),
+        'adaptive_limit': (report.get('ollama', {}).get('concurrency') or {}).get('limit'),
+        'requests_per_node': [backend['requests'] for backend in report.get('ollama', {}).get('backends', [])]
+    }
+
+
+def child_args(args: argparse.Namespace) -> List[str]:
+    """Options transmises au processus qui exécute une taille d'inventaire"""
+    forwarded = ['--config', args.config, '--concurrency', str(args.concurrency),
+                 '--render-executor', args.render_executor, '--host', args.host, '--port', str(args.port),
+                 '--nodes', str(args.nodes)]
+    if args.stream:
+        forwarded.append('--stream')
+    if args.adaptive:
+        forwarded.append('--adaptive')
+    if args.prefix_reuse:
+        forwarded.append('--prefix-reuse')
+    return forwarded
+
+
+def main():
+    """Point d'entrée du benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark de bout en bout du pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="Tailles d'inventaire")
+    parser.add_argument('--config', default=str(ROOT / 'config.json'), help='Configuration de base')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requêtes simultanées')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Concurrence adaptative (--concurrency devient la limite initiale)')
+    parser.add_argument('--prefix-reuse', action='store_true',
+                        help='Réutilise le contexte du préfixe de chaque catégorie')
+    parser.add_argument('--render-executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--stream', action='store_true', help='Génération en streaming')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--nodes', type=int, default=1,
+                        help='Nombre de serveurs factices (ports consécutifs, répartition de charge)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence du serveur factice (s)')
+    parser.add_argument('--token-rate', type=float, default=2000.0, help='Tokens par seconde')
+    parser.add_argument('--prompt-rate', type=float, default=0.0,
+                        help='Tokens de prompt évalués par seconde (0 = instantané)')
+    parser.add_argument('--tokens', type=int, default=400, help='Tokens par réponse')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probabilité d'erreur HTTP 500")
+    parser.add_argument('--parallel', type=int, default=8, help='Générations simultanées du serveur')
+    parser.add_argument('--json', default='bench_pipeline.json', help='Fichier de résultats JSON')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_single(args.single, args)))
+        return
+
+    servers = [multiprocessing.Process(target=run_server, daemon=True, args=({
+        'host': args.host,
+        'port': args.port + n,
+        'latency': args.latency,
+        'token_rate': args.token_rate,
+        'prompt_rate': args.prompt_rate,
+        'tokens': args.tokens,
+        'error_rate': args.error_rate,
+        'parallel': args.parallel,
+        'seed': n
+    },)) for n in range(args.nodes)]
+    for server in servers:
+        server.start()
+
+    results: Dict[str, Any] = {
+        'server': {
+            'latency': args.latency, 'token_rate': args.token_rate, 'prompt_rate': args.prompt_rate,
+            'tokens': args.tokens,
+            'error_rate': args.error_rate, 'parallel': args.parallel, 'stream': args.stream
+        },
+        'nodes': args.nodes,
+        'concurrency': args.concurrency,
+        'adaptive': args.adaptive,
+        'prefix_reuse': args.prefix_reuse,
+        'render_executor': args.render_executor,
+        'runs': []
+    }
+    try:
+        for n in range(args.nodes):
+            wait_for_port(args.host, args.port + n)
+        for size in args.sizes:
+            completed = subprocess.run(
+                [sys.executable, __file__, *child_args(args), '--single', str(size)],
+                capture_output=True, text=True, check=True
+            )
+            run = {'size': size, **json.loads(completed.stdout.strip().splitlines()[-1])}
+            results['runs'].append(run)
+            print(f"{size:>6} éléments: {run['items_per_s']:8.2f} él/s, "
+                  f"p50/p95/p99 {run['latency_p50_s']}/{run['latency_p95_s']}/{run['latency_p99_s']}s, "
+                  f"CPU {run['cpu_s_per_page'] * 1000:.2f} ms/page, RSS max {run['peak_rss_mb']} Mo")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.join()
+
+    with open(args.json, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Résultats: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
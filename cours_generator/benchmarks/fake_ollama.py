@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Serveur Ollama factice pour les benchmarks
+Imite /api/generate (normal et streaming NDJSON, contexte réutilisable) et
+/api/tags avec une latence, un débit de tokens (évaluation du prompt et
+génération), un taux d'erreur et un nombre de slots configurables
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+
+GENERIC_SECTIONS = ('Introduction', 'Développement', 'Exemples', 'Conseils pratiques', 'Synthèse')
+WORDS = ('le', 'roman', 'poésie', 'auteur', 'siècle', 'style', 'thème', 'personnage', 'lecteur',
+         'œuvre', 'image', 'registre', 'argument', 'exemple', 'scène', 'vers', 'récit', 'idée')
+STRUCTURE_RE = re.compile(r'^\d+\. \*\*(.+?)\*\*', re.MULTILINE)
+
+
+def build_text(words: int, rng: random.Random, degenerate_rate: float = 0.0) -> str:
+    """Phrase de mots tirés au hasard ; degenerate_rate : boucle sur les mêmes mots"""
+    if rng.random() < degenerate_rate:
+        return ' '.join(WORDS[index % 4] for index in range(words)).capitalize() + '.'
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def build_response(prompt: str, tokens: int, rng: random.Random, degenerate_rate: float = 0.0) -> str:
+    """Texte structuré en sections **...** reprenant la structure demandée dans le prompt"""
+    sections = STRUCTURE_RE.findall(prompt) or list(GENERIC_SECTIONS)
+    per_section = max(1, tokens // len(sections))
+    lines = []
+    for index, title in enumerate(sections):
+        lines.append(f"**{title}**")
+        words = [rng.choice(WORDS) for _ in range(per_section)]
+        if index == 1:
+            lines.extend(f"{1600 + 20 * i}: {' '.join(words[i::4])}" for i in range(4))
+        elif index == 2:
+            lines.extend(f"- {' '.join(words[i::3])}" for i in range(3))
+        else:
+            lines.append(build_text(per_section, rng, degenerate_rate))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def build_json_response(prompt: str, tokens: int, rng: random.Random, drop_rate: float = 0.0,
+                        degenerate_rate: float = 0.0) -> str:
+    """Objet JSON rempli d'après le squelette qui termine le prompt ; drop_rate omet des sections"""
+    try:
+        skeleton = json.loads(prompt.rstrip().rsplit('\n', 1)[-1])
+    except ValueError:
+        skeleton = {'contenu': {title.lower(): '...' for title in GENERIC_SECTIONS}}
+    sections = sum(len(fields) for fields in skeleton.values() if isinstance(fields, dict)) or 1
+    per_section = max(8, tokens // sections)
+    return json.dumps({
+        subject: {
+            field: build_text(per_section, rng, degenerate_rate)
+            for field in fields
+            if rng.random() >= drop_rate
+        }
+        for subject, fields in skeleton.items()
+        if isinstance(fields, dict)
+    }, ensure_ascii=False)
+
+
+class FakeOllamaServer:
+    """Serveur HTTP local imitant l'API Ollama"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.host = config.get('host', 'localhost')
+        self.port = config.get('port', 11435)
+        self.latency = config.get('latency', 0.05)
+        self.jitter = config.get('jitter', 0.2)
+        self.token_rate = config.get('token_rate', 2000.0)
+        # Tokens de prompt évalués par seconde (0 = évaluation instantanée)
+        self.prompt_rate = config.get('prompt_rate', 0.0)
+        self.tokens = config.get('tokens', 400)
+        self.error_rate = config.get('error_rate', 0.0)
+        # Probabilité d'omettre une section dans une réponse JSON
+        self.drop_rate = config.get('drop_rate', 0.0)
+        self.degenerate_rate = config.get('degenerate_rate', 0.0)
+        self.parallel = config.get('parallel', 4)
+        self.models = config.get('models', ['gemma:7b'])
+        self.rng = random.Random(config.get('seed', 42))
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Contextes renvoyés : identifiant (premier token) -> prompt évalué
+        self.contexts: Dict[int, str] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.stats = {'requests': 0, 'errors': 0, 'tokens': 0, 'prompt_tokens': 0}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/api/generate', self.handle_generate)
+        app.router.add_get('/api/tags', self.handle_tags)
+        return app
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.parallel)
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_tags(self, request: web.Request) -> web.Response:
+        return web.json_response({'models': [{'name': name} for name in self.models]})
+
+    async def handle_generate(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.stats['requests'] += 1
+
+        if self.rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            return web.json_response({'error': 'erreur simulée'}, status=500)
+
+        prompt = payload.get('prompt', '')
+        context = payload.get('context') or []
+        # Contexte connu : déjà en cache KV, seule la suite du prompt est évaluée
+        known_prefix = self.contexts.get(context[0]) if context else None
+        prompt_tokens = len(prompt) // 4 + (0 if known_prefix is not None else len(context))
+        num_predict = payload.get('options', {}).get('num_predict', self.tokens)
+
+        # Nombre limité de générations simultanées, comme OLLAMA_NUM_PARALLEL
+        async with self._slots:
+            started = time.monotonic()
+            await asyncio.sleep(self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+            prompt_started = time.monotonic()
+            if self.prompt_rate:
+                await asyncio.sleep(prompt_tokens / self.prompt_rate)
+            prompt_duration = time.monotonic() - prompt_started
+            self.stats['prompt_tokens'] += prompt_tokens
+
+            if num_predict <= 8:
+                text = 'OK'
+            elif payload.get('format'):
+                text = build_json_response(prompt, min(self.tokens, num_predict), self.rng, self.drop_rate,
+                                           self.degenerate_rate)
+            else:
+                text = build_response(f"{known_prefix or ''}\n{prompt}", min(self.tokens, num_predict), self.rng,
+                                      self.degenerate_rate)
+            tokens = text.split(' ')
+            self.stats['tokens'] += len(tokens)
+
+            context_id = len(self.contexts) + 1
+            self.contexts[context_id] = f"{known_prefix or ''}\n{prompt}"
+            final = {
+                'done': True,
+                'eval_count': len(tokens),
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prompt_duration * 1e9),
+                'context': [context_id] + list(range(prompt_tokens + len(tokens)))
+            }
+
+            if payload.get('stream'):
+                return await self._stream(request, tokens, started, final)
+
+            await asyncio.sleep(len(tokens) / self.token_rate)
+            return web.json_response({
+                'model': payload.get('model'),
+                'response': text,
+                **final,
+                'total_duration': int((time.monotonic() - started) * 1e9)
+            })
+
+    async def _stream(self, request: web.Request, tokens: List[str], started: float,
+                      final: Dict[str, Any]) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+
+        # Envoi par paquets de tokens pour garder un débit réaliste sans trop de sleeps
+        chunk = max(1, int(self.token_rate / 100))
+        for i in range(0, len(tokens), chunk):
+            piece = ' '.join(tokens[i:i + chunk]) + (' ' if i + chunk < len(tokens) else '')
+            await response.write((json.dumps({'response': piece, 'done': False}) + '\n').encode('utf-8'))
+            await asyncio.sleep(chunk / self.token_rate)
+
+        await response.write((json.dumps({
+            'response': '',
+            **final,
+            'total_duration': int((time.monotonic() - started) * 1e9)
+        }) + '\n').encode('utf-8'))
+        await response.write_eof()
+        return response
+
+
+async def serve(config: Dict[str, Any]):
+    """Démarre le serveur et attend indéfiniment"""
+    server = FakeOllamaServer(config)
+    await server.start()
+    print(f"Ollama factice sur {server.base_url}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    """Point d'entrée du serveur factice"""
+    parser = argparse.ArgumentParser(description='Serveur Ollama factice')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.05, help='Latence de base (s)')
+    parser.add_argument('--token-rate', type=float, default=2000.0, help='Tokens par seconde')
+    parser.add_argument('--prompt-rate', type=float, default=0.0,
+                        help='Tokens de prompt évalués par seconde (0 = instantané)')
+    parser.add_argument('--tokens', type=int, default=400, help='Tokens par réponse')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probabilité d'erreur HTTP 500")
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help="Probabilité d'omettre une section d'une réponse JSON")
+    parser.add_argument('--degenerate-rate', type=float, default=0.0,
+                        help="Probabilité qu'une section boucle sur les mêmes mots")
+    parser.add_argument('--parallel', type=int, default=4, help='Générations simultanées')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve({
+            'host': args.host,
+            'port': args.port,
+            'latency': args.latency,
+            'token_rate': args.token_rate,
+            'prompt_rate': args.prompt_rate,
+            'tokens': args.tokens,
+            'error_rate': args.error_rate,
+            'drop_rate': args.drop_rate,
+            'degenerate_rate': args.degenerate_rate,
+            'parallel': args.parallel
+        }))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
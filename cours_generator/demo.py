@@ -8,7 +8,7 @@ import json
 import asyncio
 from pathlib import Path
 
-from parsers.md_parser import FrancaisParser
+from parsers.inventory import load_inventory
 from generators.html_generator import HTMLGenerator
 from generators.prompt_templates import PromptTemplates
 
@@ -19,12 +19,10 @@ async def demo_parser():
     print("🔍 DÉMONSTRATION DU PARSER")
     print("="*60)
     
-    parser = FrancaisParser()
-    
     try:
-        # Parse du fichier francais_all.md
-        data = parser.parse_file('../francais_all.md')
-        stats = parser.get_statistics(data)
+        # Parse du fichier francais_all.md (index construits une fois)
+        data = load_inventory('../francais_all.md')
+        stats = data.statistics()
         
         print(f"\n📊 STATISTIQUES:")
         print(f"   • Total d'éléments: {stats['total_items']}")
@@ -33,7 +31,8 @@ async def demo_parser():
         print(f"   • Catégories: {stats['categories']}")
         
         print(f"\n📂 DÉTAIL PAR CATÉGORIE:")
-        for category, items in data.items():
+        for category in data.categories:
+            items = data.select(category)
             print(f"\n   {category.upper()} ({len(items)} éléments):")
             for item in items[:3]:  # Afficher les 3 premiers
                 status_emoji = "✅" if item.status == "exists" else "🔄"
@@ -175,7 +174,7 @@ async def demo_complete():
     print("="*60)
     
     if parsed_data:
-        stats = FrancaisParser().get_statistics(parsed_data)
+        stats = parsed_data.statistics()
         print(f"\n✅ Système prêt pour traiter {stats['total_items']} éléments")
         print(f"   • Parser: ✅ Opérationnel")
         print(f"   • Prompts: ✅ Configurés")
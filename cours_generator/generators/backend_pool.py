@@ -0,0 +1,126 @@
+"""
+Répartition des requêtes entre plusieurs serveurs Ollama
+Choisit le nœud sain le moins chargé (requêtes en cours x latence glissante),
+écarte les nœuds en timeout et les réintègre après un test /api/tags avec backoff
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+
+class Backend:
+    """Un serveur Ollama et son état de charge"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # moyenne glissante (EWMA) en secondes
+        self.healthy = True
+        self.ejections = 0
+        self.retry_at = 0.0
+
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def expected_wait(self, default_latency: float) -> float:
+        """Attente estimée si on envoie une requête de plus à ce nœud"""
+        latency = self.latency if self.latency is not None else default_latency
+        return (self.in_flight + 1) * latency
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'in_flight': self.in_flight,
+            'latency_ewma': round(self.latency, 3) if self.latency is not None else None,
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'ejections': self.ejections
+        }
+
+
+class BackendPool:
+    """Pool de nœuds Ollama côté client"""
+
+    def __init__(self, urls: List[str], config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        if not urls:
+            raise ValueError("Au moins un serveur Ollama est requis")
+        self.backends = [Backend(url) for url in urls]
+        # Poids de la dernière mesure dans la latence glissante
+        self.latency_alpha = config.get('latency_alpha', 0.3)
+        self.eject_backoff = config.get('eject_backoff', 5.0)
+        self.max_eject_backoff = config.get('max_eject_backoff', 120.0)
+        self.probe_interval = config.get('probe_interval', 5.0)
+        self.logger = logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def acquire(self) -> Backend:
+        """Réserve le nœud sain dont l'attente estimée est la plus faible"""
+        candidates = [backend for backend in self.backends if backend.healthy]
+        if not candidates:
+            # Tous écartés : on tente quand même le nœud réintégrable le plus tôt
+            candidates = [min(self.backends, key=lambda backend: backend.retry_at)]
+            self.logger.warning(f"Aucun nœud Ollama sain, tentative sur {candidates[0].url}")
+
+        # Un nœud sans mesure est supposé aussi rapide que la moyenne des autres
+        known = [b.latency for b in candidates if b.latency is not None]
+        default_latency = sum(known) / len(known) if known else 0.0
+        backend = min(candidates, key=lambda b: (b.expected_wait(default_latency), b.in_flight, b.requests))
+        backend.in_flight += 1
+        backend.requests += 1
+        return backend
+
+    def release(self, backend: Backend, elapsed: float, ok: bool = True):
+        """Libère le nœud et met à jour sa latence glissante"""
+        backend.in_flight -= 1
+        if not ok:
+            backend.errors += 1
+            return
+        if backend.latency is None:
+            backend.latency = elapsed
+        else:
+            backend.latency += self.latency_alpha * (elapsed - backend.latency)
+        backend.ejections = 0
+        if not backend.healthy:
+            # Requête réussie sur un nœud écarté (tentée faute de nœud sain) : il répond de nouveau
+            backend.healthy = True
+            self.logger.info(f"Nœud Ollama {backend.url} réintégré après une requête réussie")
+
+    def eject(self, backend: Backend, reason: str):
+        """Écarte un nœud (timeout, connexion refusée) jusqu'à son prochain test réussi"""
+        if not backend.healthy:
+            return
+        backoff = min(self.max_eject_backoff, self.eject_backoff * 2 ** backend.ejections)
+        backend.healthy = False
+        backend.ejections += 1
+        backend.retry_at = time.monotonic() + backoff
+        self.logger.warning(f"Nœud Ollama {backend.url} écarté ({reason}), nouveau test dans {backoff:.1f}s")
+
+    def due_for_probe(self) -> List[Backend]:
+        """Nœuds écartés dont le délai de backoff est écoulé"""
+        now = time.monotonic()
+        return [backend for backend in self.backends if not backend.healthy and backend.retry_at <= now]
+
+    def probe_result(self, backend: Backend, ok: bool):
+        """Réintègre le nœud si le test /api/tags a réussi, sinon double le backoff"""
+        if ok:
+            if not backend.healthy:
+                self.logger.info(f"Nœud Ollama {backend.url} réintégré")
+            backend.healthy = True
+            backend.latency = None  # la latence d'avant l'éjection n'est plus représentative
+            return
+        backend.healthy = True  # permet à eject() de recalculer le backoff
+        self.eject(backend, 'test /api/tags échoué')
+
+    def healthy_count(self) -> int:
+        return sum(1 for backend in self.backends if backend.healthy)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """État et compteurs de chaque nœud"""
+        return [backend.get_stats() for backend in self.backends]
@@ -0,0 +1,144 @@
+"""
+Limiteur de concurrence adaptatif
+Ajuste le nombre de requêtes Ollama simultanées d'après la latence observée :
+croissance tant que la latence reste stable (gradient), réduction
+multiplicative sur timeout, surcharge ou pic de latence
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class AdaptiveLimiter:
+    """Limite de concurrence de type gradient avec décroissance multiplicative"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.min_limit = config.get('min_limit', 1)
+        self.max_limit = config.get('max_limit', 32)
+        self.limit = float(min(self.max_limit, max(self.min_limit, config.get('initial_limit', 4))))
+        # Hausse de latence tolérée avant de réduire (1.3 = +30 %)
+        self.tolerance = config.get('tolerance', 1.3)
+        # Facteur appliqué à la limite sur timeout ou surcharge
+        self.backoff_ratio = config.get('backoff_ratio', 0.5)
+        self.smoothing = config.get('smoothing', 0.2)
+        self.short_alpha = config.get('short_alpha', 0.5)
+        # Remontée de la latence de référence par requête, pour suivre un modèle
+        # devenu durablement plus lent (prompts plus longs, autre modèle)
+        self.baseline_drift = config.get('baseline_drift', 0.001)
+
+        self.logger = logging.getLogger(__name__)
+        self.in_flight = 0
+        self.short_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        # Attente FIFO : un slot libéré est transmis au plus ancien demandeur
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Statistiques
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=config.get('history', 20))
+        self.stats = {
+            'increases': 0,
+            'decreases': 0,
+            'timeouts': 0,
+            'overloads': 0,
+            'max_in_flight': 0,
+            'wait_time': 0.0
+        }
+        self._started = time.monotonic()
+
+    async def acquire(self):
+        """Attend qu'un slot soit libre sous la limite courante (ordre d'arrivée)"""
+        start = time.monotonic()
+        if self._waiters or self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Slot déjà transmis : on le rend
+                    self.in_flight -= 1
+                    self._wake_waiters()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        else:
+            self.in_flight += 1
+        self.stats['wait_time'] += time.monotonic() - start
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def release(self, latency: float, outcome: str = 'ok'):
+        """Libère le slot et ajuste la limite
+
+        outcome : 'ok' (latence mesurée), 'timeout', 'overload' (429/503) ou
+        'error' (sans effet sur la limite)
+        """
+        in_flight = self.in_flight
+        previous = int(self.limit)
+
+        if outcome == 'ok':
+            self._on_sample(latency, in_flight)
+        elif outcome in ('timeout', 'overload'):
+            self.stats['timeouts' if outcome == 'timeout' else 'overloads'] += 1
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+        current = int(self.limit)
+        if current != previous:
+            reason = {'timeout': 'timeout', 'overload': 'surcharge'}.get(
+                outcome, 'latence stable' if current > previous else 'pic de latence'
+            )
+            self._record(previous, current, reason)
+
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _on_sample(self, latency: float, in_flight: int):
+        """Gradient : rapport entre latence hors charge (référence) et latence récente"""
+        if self.short_latency is None:
+            self.short_latency = self.baseline_latency = latency
+            return
+
+        self.short_latency += self.short_alpha * (latency - self.short_latency)
+        self.baseline_latency = min(self.short_latency, self.baseline_latency * (1 + self.baseline_drift))
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline_latency / self.short_latency))
+        # Croissance additive, seulement si la limite est utilisée (demande suffisante)
+        headroom = 1.0 if in_flight >= self.limit / 2 else 0.0
+        target = self.limit * gradient + headroom
+        self.limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+
+    def _record(self, previous: int, current: int, reason: str):
+        if current > previous:
+            self.stats['increases'] += 1
+        else:
+            self.stats['decreases'] += 1
+        self.decisions.append({
+            't': round(time.monotonic() - self._started, 2),
+            'from': previous,
+            'to': current,
+            'reason': reason
+        })
+        self.logger.debug(f"Concurrence Ollama: {previous} -> {current} ({reason})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Limite courante, latences suivies et dernières décisions"""
+        return {
+            **self.stats,
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'wait_time': round(self.stats['wait_time'], 3),
+            'latency_short': round(self.short_latency or 0.0, 3),
+            'latency_baseline': round(self.baseline_latency or 0.0, 3),
+            'recent_decisions': list(self.decisions)
+        }
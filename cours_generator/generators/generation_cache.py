@@ -0,0 +1,171 @@
+"""
+Cache persistant des générations Ollama
+Stocké dans une base SQLite locale, avec des clés SHA-256 stables entre les exécutions
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class GenerationCache:
+    """Cache SQLite des réponses du modèle avec éviction par taille et par âge"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.path = config.get('path', 'output/cache/generations.db')
+        self.max_entries = config.get('max_entries', 10000)
+        self.max_size_mb = config.get('max_size_mb', 200)
+        self.max_age_days = config.get('max_age_days', 30)
+
+        self.logger = logging.getLogger(__name__)
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON generations(accessed_at)')
+        self._conn.commit()
+
+        # Statistiques
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0
+        }
+
+        self.evict()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, system_prompt: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """Construit une clé SHA-256 stable à partir du modèle, des prompts et des options"""
+        payload = json.dumps({
+            'model': model,
+            'prompt': prompt,
+            'system': system_prompt or '',
+            'options': options or {}
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retourne la réponse en cache ou None"""
+        row = self._conn.execute(
+            'SELECT response, created_at FROM generations WHERE key = ?', (key,)
+        ).fetchone()
+
+        if row is None or self._is_expired(row[1]):
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        self._conn.execute(
+            'UPDATE generations SET accessed_at = ? WHERE key = ?', (time.time(), key)
+        )
+        self._conn.commit()
+        return row[0]
+
+    def set(self, key: str, model: str, response: str):
+        """Enregistre une réponse"""
+        now = time.time()
+        self._conn.execute(
+            'INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)',
+            (key, model, response, len(response.encode('utf-8')), now, now)
+        )
+        self._conn.commit()
+        self.stats['writes'] += 1
+
+        if self.stats['writes'] % 100 == 0:
+            self.evict()
+
+    def __contains__(self, key: str) -> bool:
+        row = self._conn.execute(
+            'SELECT created_at FROM generations WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and not self._is_expired(row[0])
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+
+    def _is_expired(self, created_at: float) -> bool:
+        if not self.max_age_days:
+            return False
+        return time.time() - created_at > self.max_age_days * 86400
+
+    def evict(self):
+        """Supprime les entrées trop anciennes puis les moins récemment utilisées"""
+        removed = 0
+
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += self._conn.execute(
+                'DELETE FROM generations WHERE created_at < ?', (cutoff,)
+            ).rowcount
+
+        if self.max_entries:
+            removed += self._conn.execute("""
+                DELETE FROM generations WHERE key IN (
+                    SELECT key FROM generations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+
+        if self.max_size_mb:
+            max_bytes = self.max_size_mb * 1024 * 1024
+            total = self.total_bytes()
+            if total > max_bytes:
+                rows = self._conn.execute(
+                    'SELECT key, size FROM generations ORDER BY accessed_at ASC'
+                ).fetchall()
+                to_delete = []
+                for key, size in rows:
+                    if total <= max_bytes:
+                        break
+                    to_delete.append((key,))
+                    total -= size
+                self._conn.executemany('DELETE FROM generations WHERE key = ?', to_delete)
+                removed += len(to_delete)
+
+        self._conn.commit()
+        if removed:
+            self.stats['evictions'] += removed
+            self.logger.info(f"Cache: {removed} entrées évincées")
+
+    def total_bytes(self) -> int:
+        """Taille totale des réponses stockées"""
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM generations').fetchone()[0]
+
+    def clear(self):
+        """Vide le cache"""
+        self._conn.execute('DELETE FROM generations')
+        self._conn.commit()
+
+    def close(self):
+        """Ferme la base"""
+        self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du cache"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self),
+            'size_bytes': self.total_bytes(),
+            'hit_rate': self.stats['hits'] / max(1, lookups) * 100
+        }
@@ -0,0 +1,131 @@
+"""
+Convertisseur Markdown -> HTML en une seule passe
+Traite le texte ligne par ligne avec des expressions précompilées (temps linéaire)
+"""
+
+import html
+import re
+from typing import List, Tuple
+
+
+# Motifs de blocs combinés : un seul match par ligne (sans indentation)
+BLOCK_RE = re.compile(
+    r'(?:[-*•]\s+(?P<bullet>.*))'
+    r'|(?:\d+[.)]\s+(?P<numbered>.*))'
+    r'|(?:(?P<year>\d{3,4}(?:\s*[-–]\s*\d{3,4})?)\s*(?::|–|—|-)\s+(?P<event>.+))'
+    r'|(?:#{1,6}\s+(?P<heading>.*))'
+    r'|(?P<quote>(?:"[^"]+"|«[^»]+»|“[^”]+”)[.!?]?(?:\s*[-–—]\s*.+)?)$'
+)
+
+# Motifs en ligne, combinés pour un seul parcours de chaque ligne
+INLINE_RE = re.compile(
+    r'\*\*(?P<bold>.+?)\*\*'
+    r'|(?<![\w*])\*(?P<italic>[^*\s](?:[^*]*?[^*\s])?)\*(?![\w*])'
+    r'|(?P<quote>"[^"\n]+"|«[^»\n]+»|“[^”\n]+”)'
+)
+
+INDENT = '\n                '
+
+
+def _inline_replace(match: 're.Match') -> str:
+    if match.group('bold') is not None:
+        return f"<strong>{match.group('bold')}</strong>"
+    if match.group('italic') is not None:
+        return f"<em>{match.group('italic')}</em>"
+    return f"<em>{match.group('quote')}</em>"
+
+
+def escape(text: str) -> str:
+    """Échappe &, < et > (court-circuité si aucun n'est présent)"""
+    if '&' not in text and '<' not in text and '>' not in text:
+        return text
+    return html.escape(text, quote=False)
+
+
+def format_inline(text: str) -> str:
+    """Échappe le texte puis applique gras, italique et citations en ligne"""
+    text = escape(text)
+    if '*' not in text and '"' not in text and '«' not in text and '“' not in text:
+        return text
+    return INLINE_RE.sub(_inline_replace, text)
+
+
+class MarkdownConverter:
+    """Convertit le Markdown simple produit par le modèle en HTML"""
+
+    def convert(self, content: str) -> str:
+        """Convertit un bloc de texte en HTML"""
+        out: List[str] = []
+        # Listes ouvertes : (balise, indentation)
+        stack: List[Tuple[str, int]] = []
+        in_timeline = False
+
+        def close_lists(min_indent: int = -1):
+            while stack and stack[-1][1] > min_indent:
+                out.append(f'</li></{stack.pop()[0]}>')
+
+        for raw_line in content.split('\n'):
+            line = raw_line.strip()
+            if not line:
+                continue
+
+            match = BLOCK_RE.match(line)
+            kind = match.lastgroup if match else None
+            if kind == 'bullet' or kind == 'numbered':
+                text = match.group(kind)
+            elif kind == 'event':
+                kind = 'timeline'
+
+            if kind == 'bullet' or kind == 'numbered':
+                if in_timeline:
+                    out.append('</div>')
+                    in_timeline = False
+
+                tag = 'ul' if kind == 'bullet' else 'ol'
+                indent = len(raw_line.expandtabs(4)) - len(raw_line.expandtabs(4).lstrip(' '))
+
+                close_lists(indent)
+                if stack and stack[-1][1] == indent:
+                    if stack[-1][0] == tag:
+                        out.append('</li>')
+                    else:
+                        out.append(f'</li></{stack.pop()[0]}>')
+                        out.append(f'<{tag}>')
+                        stack.append((tag, indent))
+                else:
+                    # Nouvelle liste, imbriquée dans l'élément courant le cas échéant
+                    out.append(f'<{tag}>')
+                    stack.append((tag, indent))
+
+                out.append(f'<li>{format_inline(text)}')
+                continue
+
+            if stack:
+                close_lists()
+
+            if kind == 'timeline':
+                if not in_timeline:
+                    out.append('<div class="timeline">')
+                    in_timeline = True
+                out.append(
+                    f'<div class="timeline-item"><h4>{match.group("year")}</h4>'
+                    f'<p>{format_inline(match.group("event"))}</p></div>'
+                )
+                continue
+
+            if in_timeline:
+                out.append('</div>')
+                in_timeline = False
+
+            if kind == 'heading':
+                out.append(f'<h4>{format_inline(match.group("heading"))}</h4>')
+            elif kind == 'quote':
+                out.append(f'<div class="citation-center">{escape(line)}</div>')
+            else:
+                out.append(f'<p>{format_inline(line)}</p>')
+
+        close_lists()
+        if in_timeline:
+            out.append('</div>')
+
+        return INDENT.join(out)
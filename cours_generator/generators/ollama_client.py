@@ -5,27 +5,84 @@ Gère les appels au modèle local et l'optimisation du contexte
 
 import aiohttp
 import asyncio
-import json
 import logging
-from typing import Dict, List, Optional, Any
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 from datetime import datetime
 
+try:
+    from .backend_pool import Backend, BackendPool
+    from .concurrency_limiter import AdaptiveLimiter
+    from .generation_cache import GenerationCache
+    from .similarity_cache import SimilarityCache
+    from .structured_output import loads
+    from .tokenizer import Tokenizer, load_tokenizer
+except ImportError:  # exécution directe depuis generators/
+    from backend_pool import Backend, BackendPool
+    from concurrency_limiter import AdaptiveLimiter
+    from generation_cache import GenerationCache
+    from similarity_cache import SimilarityCache
+    from structured_output import loads
+    from tokenizer import Tokenizer, load_tokenizer
+
+
+# Ajouté au préfixe évalué seul, pour que le modèle attende la suite
+PREFIX_ACK = "Le sujet est donné dans le message suivant. Pour l'instant, réponds seulement « OK »."
+
 
 class OllamaClient:
     """Client pour communiquer avec Ollama"""
     
     def __init__(self, config: Dict[str, Any]):
-        self.base_url = config.get('base_url', 'http://localhost:11434')
+        # Plusieurs nœuds Ollama possibles : base_urls prime sur base_url
+        base_urls = config.get('base_urls') or [config.get('base_url', 'http://localhost:11434')]
+        self.base_url = base_urls[0]
+        self.pool = BackendPool(base_urls, config.get('load_balancing', {}))
+        self.probe_timeout = config.get('load_balancing', {}).get('probe_timeout', 5)
+        self._probe_task: Optional[asyncio.Task] = None
         self.model = config.get('model', 'gemma:7b')
         self.max_tokens = config.get('max_tokens', 4096)
         self.temperature = config.get('temperature', 0.7)
         self.retry_count = config.get('retry_count', 3)
         self.timeout = config.get('timeout', 120)
+        # Taille du contexte envoyée au modèle (sinon valeur par défaut d'Ollama)
+        self.num_ctx = config.get('num_ctx')
+        # Durée de maintien du modèle en mémoire entre deux requêtes (ex. "30m", -1 = toujours)
+        self.keep_alive = config.get('keep_alive', '30m')
+        # Réutilisation du contexte d'un préfixe commun (consignes de la catégorie)
+        self.prefix_reuse = config.get('prefix_reuse', False)
+        self._prefix_contexts: Dict[str, List[int]] = {}
+        self._prefix_locks: Dict[str, asyncio.Lock] = {}
+        
+        # Pool de connexions partagé pendant toute la durée de vie du client
+        self.connection_limit = config.get('connection_limit', 10)
+        self.keepalive_timeout = config.get('keepalive_timeout', 60)
+        self.dns_cache_ttl = config.get('dns_cache_ttl', 300)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Concurrence ajustée d'après la latence observée (désactivée par défaut)
+        adaptive = config.get('adaptive_concurrency', {})
+        # La limite ne dépasse pas le pool de connexions : au-delà, les requêtes
+        # attendraient une connexion dans aiohttp, sans ordre garanti
+        self.limiter = AdaptiveLimiter({
+            **adaptive,
+            'max_limit': min(adaptive.get('max_limit', 32), self.connection_limit)
+        }) if adaptive.get('enabled') else None
         
         self.logger = logging.getLogger(__name__)
         
-        # Cache pour éviter les appels répétés
-        self.cache = {}
+        # Cache persistant pour éviter les appels répétés entre exécutions
+        self.cache = GenerationCache(config.get('cache', {}))
+        # Second niveau : réponses des sujets proches (même sujet dans une autre catégorie...)
+        self.similar = SimilarityCache(self.cache, config.get('similarity', {}))
+        
+        # Budget des prompts en tokens (la sortie max_tokens est réservée)
+        self.tokenizer = load_tokenizer(config.get('tokenizer', {}))
+        self.prompt_optimizer = PromptOptimizer(self.max_tokens, self.tokenizer, self.num_ctx or 8192)
+        
+        # Métriques détaillées (pipeline.metrics.MetricsRegistry), fournies par l'appelant
+        self.metrics = None
         
         # Statistiques
         self.stats = {
@@ -33,41 +90,154 @@ class OllamaClient:
             'successful_requests': 0,
             'failed_requests': 0,
             'cache_hits': 0,
-            'total_tokens': 0
+            'total_tokens': 0,
+            'streamed_requests': 0,
+            'prefix_evaluations': 0,
+            'prefix_reuses': 0,
+            'prompt_eval_tokens': 0,
+            'prompt_eval_time': 0.0,
+            'time_to_first_token': 0.0,
+            'sessions_created': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_lookups': 0,
+            'connect_time': 0.0,
+            'request_time': 0.0
         }
     
-    async def generate_content(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
-        """Génère du contenu avec le modèle Ollama"""
+    async def __aenter__(self) -> 'OllamaClient':
+        await self._get_session()
+        if len(self.pool) > 1:
+            await self.check_backends()
+        # Même avec un seul nœud : un nœud écarté sur timeout doit pouvoir être réintégré
+        self._probe_task = asyncio.create_task(self._probe_loop())
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Retourne la session HTTP partagée, créée à la première utilisation"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._build_trace_config()]
+            )
+            self.stats['sessions_created'] += 1
+        return self._session
+    
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        """Trace les ouvertures/réutilisations de connexions pour les statistiques"""
+        trace_config = aiohttp.TraceConfig()
+        
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.monotonic()
+        
+        async def on_connection_create_end(session, ctx, params):
+            self.stats['connections_created'] += 1
+            self.stats['connect_time'] += time.monotonic() - ctx.connect_start
+        
+        async def on_connection_reuseconn(session, ctx, params):
+            self.stats['connections_reused'] += 1
+        
+        async def on_dns_resolvehost_end(session, ctx, params):
+            self.stats['dns_lookups'] += 1
+        
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        return trace_config
+    
+    async def _probe(self, backend: Backend) -> bool:
+        """Test de santé d'un nœud via /api/tags"""
+        try:
+            session = await self._get_session()
+            async with session.get(
+                f"{backend.url}/api/tags",
+                timeout=aiohttp.ClientTimeout(total=self.probe_timeout)
+            ) as response:
+                return response.status == 200
+        except Exception:
+            return False
+    
+    async def check_backends(self) -> int:
+        """Teste tous les nœuds et écarte ceux qui ne répondent pas ; retourne le nombre de nœuds sains"""
+        results = await asyncio.gather(*(self._probe(backend) for backend in self.pool.backends))
+        for backend, ok in zip(self.pool.backends, results):
+            if not ok:
+                self.pool.eject(backend, 'test /api/tags échoué')
+        self.logger.info(f"Nœuds Ollama sains: {self.pool.healthy_count()}/{len(self.pool)}")
+        return self.pool.healthy_count()
+    
+    async def _probe_loop(self):
+        """Retente périodiquement les nœuds écartés dont le backoff est écoulé"""
+        while True:
+            await asyncio.sleep(self.pool.probe_interval)
+            for backend in self.pool.due_for_probe():
+                self.pool.probe_result(backend, await self._probe(backend))
+    
+    async def close(self):
+        """Arrête les tests de santé et ferme la session HTTP partagée"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def generate_content(self, prompt: str, system_prompt: Optional[str] = None,
+                               prefix: Optional[str] = None,
+                               options: Optional[Dict[str, Any]] = None,
+                               subject: Optional[Tuple[str, str]] = None) -> Optional[str]:
+        """Génère du contenu avec le modèle Ollama
+        
+        prefix : partie fixe du prompt (consignes communes) ; avec prefix_reuse, elle
+        est évaluée une seule fois et seul prompt est envoyé avec son contexte.
+        options : options d'échantillonnage remplacées (graine, température d'une relance),
+        prises en compte dans la clé de cache.
+        subject : (catégorie, nom) pour le cache des sujets proches (similarity).
+        """
+        # Préparation de la requête
+        payload = self._build_payload(self.join_prefix(prefix, prompt), system_prompt, options=options)
+        
         # Vérifier le cache
-        cache_key = self._get_cache_key(prompt, system_prompt)
-        if cache_key in self.cache:
+        cache_key = self._get_cache_key(payload['prompt'], system_prompt, payload['options'])
+        cached = self.cache.get(cache_key)
+        if cached is not None:
             self.stats['cache_hits'] += 1
+            self._count('ollama_cache_hits')
             self.logger.info("Résultat trouvé dans le cache")
-            return self.cache[cache_key]
-        
-        self.stats['total_requests'] += 1
+            return cached
         
-        # Préparation de la requête
-        payload = {
-            'model': self.model,
-            'prompt': prompt,
-            'stream': False,
-            'options': {
-                'temperature': self.temperature,
-                'num_predict': self.max_tokens
-            }
-        }
+        match = self.similar.lookup(*subject) if subject else None
+        if match is not None:
+            if match.reuse:
+                return match.response
+            prompt = self.similar.seed_prompt(prompt, match)
+            payload['prompt'] = self.join_prefix(prefix, prompt)
         
-        if system_prompt:
-            payload['system'] = system_prompt
+        self.stats['total_requests'] += 1
+        await self._apply_prefix_context(payload, prefix, prompt, system_prompt)
         
         # Tentatives avec retry
         for attempt in range(self.retry_count):
+            if attempt:
+                self._count('ollama_retries')
             try:
                 result = await self._make_request(payload)
                 if result:
                     self.stats['successful_requests'] += 1
-                    self.cache[cache_key] = result
+                    self.cache.set(cache_key, self.model, result)
+                    if subject:
+                        self.similar.add(*subject, cache_key)
                     return result
                 
             except Exception as e:
@@ -79,84 +249,341 @@ class OllamaClient:
         self.logger.error(f"Échec de génération après {self.retry_count} tentatives")
         return None
     
-    async def _make_request(self, payload: Dict) -> Optional[str]:
-        """Effectue la requête HTTP vers Ollama"""
-        try:
-            timeout = aiohttp.ClientTimeout(total=self.timeout)
+    async def generate_json(self, prompt: str, system_prompt: Optional[str] = None,
+                            output_format: Any = 'json',
+                            options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Génère un objet JSON
+        
+        output_format : « json » ou schéma JSON (sortie structurée, Ollama >= 0.5).
+        Pas de cache ici : l'appelant met en cache chaque partie de la réponse.
+        Une réponse qui n'est pas un objet JSON compte comme une tentative échouée.
+        """
+        payload = self._build_payload(prompt, system_prompt, options=options)
+        payload['format'] = output_format
+        self.stats['total_requests'] += 1
+        
+        for attempt in range(self.retry_count):
+            if attempt:
+                self._count('ollama_retries')
+            try:
+                result = await self._make_request(payload)
+                if result:
+                    data = loads(result)
+                    if isinstance(data, dict):
+                        self.stats['successful_requests'] += 1
+                        return data
+                    self.logger.warning(f"Tentative {attempt + 1}: la réponse n'est pas un objet JSON")
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    f"{self.base_url}/api/generate",
-                    json=payload
-                ) as response:
-                    
-                    if response.status != 200:
-                        self.logger.error(f"Erreur HTTP {response.status}: {await response.text()}")
+            except ValueError as e:
+                self.logger.warning(f"Tentative {attempt + 1}: JSON invalide ({str(e)})")
+            except Exception as e:
+                self.logger.warning(f"Tentative {attempt + 1} échouée: {str(e)}")
+                if attempt < self.retry_count - 1:
+                    await asyncio.sleep(2 ** attempt)
+        
+        self.stats['failed_requests'] += 1
+        self.logger.error(f"Échec de génération JSON après {self.retry_count} tentatives")
+        return None
+    
+    def generation_options(self) -> Dict[str, Any]:
+        """Options d'échantillonnage envoyées au modèle"""
+        options = {
+            'temperature': self.temperature,
+            'num_predict': self.max_tokens
+        }
+        if self.num_ctx:
+            options['num_ctx'] = self.num_ctx
+        return options
+    
+    def _build_payload(self, prompt: str, system_prompt: Optional[str] = None,
+                       stream: bool = False, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Construit le corps de la requête /api/generate"""
+        payload = {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': stream,
+            'options': {**self.generation_options(), **(options or {})}
+        }
+        
+        if system_prompt:
+            payload['system'] = system_prompt
+        if self.keep_alive is not None:
+            payload['keep_alive'] = self.keep_alive
+        
+        return payload
+    
+    @staticmethod
+    def join_prefix(prefix: Optional[str], prompt: str) -> str:
+        """Prompt complet équivalent à un préfixe suivi de la partie propre à l'élément"""
+        return f"{prefix}\n\n{prompt}" if prefix else prompt
+    
+    async def _apply_prefix_context(self, payload: Dict[str, Any], prefix: Optional[str],
+                                    prompt: str, system_prompt: Optional[str]):
+        """Remplace le préfixe par son contexte évalué, si la réutilisation est active"""
+        if not prefix or not self.prefix_reuse:
+            return
+        context = await self._get_prefix_context(prefix, system_prompt)
+        if context:
+            payload['prompt'] = prompt
+            payload['context'] = context
+    
+    async def _get_prefix_context(self, prefix: str, system_prompt: Optional[str] = None) -> Optional[List[int]]:
+        """Contexte (tokens) du préfixe, évalué une fois par préfixe et mis en mémoire"""
+        key = self._get_cache_key(prefix, system_prompt, self.generation_options())
+        context = self._prefix_contexts.get(key)
+        if context is None:
+            # Un seul calcul par préfixe, même avec de nombreuses requêtes simultanées
+            async with self._prefix_locks.setdefault(key, asyncio.Lock()):
+                context = self._prefix_contexts.get(key)
+                if context is None:
+                    payload = self._build_payload(f"{prefix}\n\n{PREFIX_ACK}", system_prompt)
+                    payload['options'] = {**payload['options'], 'num_predict': 8}
+                    result = await self._request_json(payload)
+                    context = result.get('context') if result else None
+                    if not context:
+                        self.logger.warning("Contexte du préfixe indisponible, envoi du prompt complet")
                         return None
+                    self._prefix_contexts[key] = context
+                    self.stats['prefix_evaluations'] += 1
+                    return context
+        self.stats['prefix_reuses'] += 1
+        return context
+    
+    async def stream_content(self, prompt: str, system_prompt: Optional[str] = None,
+                             prefix: Optional[str] = None,
+                             subject: Optional[Tuple[str, str]] = None) -> AsyncIterator[str]:
+        """Génère du contenu en streaming et produit les morceaux au fil de l'eau
+        
+        Fermer le générateur (aclose) ferme la connexion et arrête la génération.
+        Le texte complet est mis en cache uniquement si le flux est allé au bout ;
+        une erreur HTTP ou un flux incomplet lève une exception.
+        """
+        payload = self._build_payload(self.join_prefix(prefix, prompt), system_prompt, stream=True)
+        
+        cache_key = self._get_cache_key(payload['prompt'], system_prompt, payload['options'])
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            self._count('ollama_cache_hits')
+            yield cached
+            return
+        
+        match = self.similar.lookup(*subject) if subject else None
+        if match is not None:
+            if match.reuse:
+                yield match.response
+                return
+            prompt = self.similar.seed_prompt(prompt, match)
+            payload['prompt'] = self.join_prefix(prefix, prompt)
+        
+        self.stats['total_requests'] += 1
+        self.stats['streamed_requests'] += 1
+        await self._apply_prefix_context(payload, prefix, prompt, system_prompt)
+        
+        if self.limiter:
+            await self.limiter.acquire()
+        start = time.monotonic()
+        chunks: List[str] = []
+        completed = False
+        outcome = 'error'
+        backend = self.pool.acquire()
+        
+        try:
+            session = await self._get_session()
+            
+            async with session.post(
+                f"{backend.url}/api/generate",
+                json=payload
+            ) as response:
+                
+                if response.status != 200:
+                    if response.status in (429, 503):
+                        outcome = 'overload'
+                    raise RuntimeError(f"Erreur HTTP {response.status}: {await response.text()}")
+                
+                # Ollama renvoie un objet JSON par ligne (NDJSON)
+                async for raw_line in response.content:
+                    if not raw_line.strip():
+                        continue
                     
-                    result = await response.json()
+                    data = loads(raw_line)
+                    if 'error' in data:
+                        raise RuntimeError(f"Erreur Ollama: {data['error']}")
                     
-                    if 'response' in result:
-                        content = result['response'].strip()
-                        
-                        # Mise à jour des stats
-                        if 'eval_count' in result:
-                            self.stats['total_tokens'] += result['eval_count']
-                        
-                        return content
+                    token = data.get('response', '')
+                    if token:
+                        if not chunks:
+                            self.stats['time_to_first_token'] += time.monotonic() - start
+                            self._observe('ollama_time_to_first_token_seconds', time.monotonic() - start)
+                        chunks.append(token)
+                        yield token
                     
-                    self.logger.error(f"Réponse invalide: {result}")
+                    if data.get('done'):
+                        self._record_eval(payload, data)
+                        completed = True
+                        break
+            
+            if not completed:
+                raise RuntimeError("Flux interrompu avant la fin de la génération")
+        
+        except asyncio.TimeoutError:
+            self.logger.error(f"Timeout lors de la requête en streaming ({backend.url})")
+            outcome = 'timeout'
+            backend.timeouts += 1
+            self.pool.eject(backend, 'timeout')
+            raise
+        except aiohttp.ClientConnectionError:
+            self.pool.eject(backend, 'connexion impossible')
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            self.pool.release(backend, elapsed, completed)
+            if self.limiter:
+                self.limiter.release(elapsed, 'ok' if completed else outcome)
+            self.stats['request_time'] += elapsed
+            self._record_request(elapsed, 'ok' if completed else outcome)
+            if completed:
+                self.stats['successful_requests'] += 1
+                self.cache.set(cache_key, self.model, ''.join(chunks).strip())
+                if subject:
+                    self.similar.add(*subject, cache_key)
+            else:
+                self.stats['failed_requests'] += 1
+    
+    async def _make_request(self, payload: Dict) -> Optional[str]:
+        """Effectue la requête HTTP vers Ollama et retourne le texte généré"""
+        result = await self._request_json(payload)
+        return result['response'].strip() if result else None
+    
+    async def _request_json(self, payload: Dict) -> Optional[Dict[str, Any]]:
+        """Requête /api/generate vers le nœud Ollama le moins chargé ; retourne la réponse JSON"""
+        if self.limiter:
+            await self.limiter.acquire()
+        start = time.monotonic()
+        backend = self.pool.acquire()
+        outcome = 'error'
+        try:
+            session = await self._get_session()
+            
+            async with session.post(
+                f"{backend.url}/api/generate",
+                json=payload
+            ) as response:
+                
+                if response.status != 200:
+                    if response.status in (429, 503):
+                        outcome = 'overload'
+                    self.logger.error(f"Erreur HTTP {response.status}: {await response.text()}")
                     return None
+                
+                result = await response.json(loads=loads)
+                
+                if 'response' in result:
+                    # Mise à jour des stats
+                    self._record_eval(payload, result)
+                    
+                    outcome = 'ok'
+                    return result
+                
+                self.logger.error(f"Réponse invalide: {result}")
+                return None
         
         except asyncio.TimeoutError:
-            self.logger.error("Timeout lors de la requête")
+            self.logger.error(f"Timeout lors de la requête ({backend.url})")
+            outcome = 'timeout'
+            backend.timeouts += 1
+            self.pool.eject(backend, 'timeout')
+            return None
+        except aiohttp.ClientConnectionError as e:
+            self.logger.error(f"Connexion impossible à {backend.url}: {str(e)}")
+            self.pool.eject(backend, 'connexion impossible')
             return None
         except Exception as e:
             self.logger.error(f"Erreur lors de la requête: {str(e)}")
             return None
+        finally:
+            elapsed = time.monotonic() - start
+            self.pool.release(backend, elapsed, outcome == 'ok')
+            if self.limiter:
+                self.limiter.release(elapsed, outcome)
+            self.stats['request_time'] += elapsed
+            self._record_request(elapsed, outcome)
     
-    def _get_cache_key(self, prompt: str, system_prompt: Optional[str] = None) -> str:
-        """Génère une clé de cache unique"""
-        content = f"{self.model}:{prompt}"
-        if system_prompt:
-            content += f":{system_prompt}"
-        return str(hash(content))
+    def _record_eval(self, payload: Dict[str, Any], result: Dict[str, Any]):
+        """Compteurs de tokens et d'évaluation du prompt d'une réponse terminée"""
+        if 'eval_count' in result:
+            self.stats['total_tokens'] += result['eval_count']
+            self._count('ollama_eval_tokens', result['eval_count'])
+        if 'prompt_eval_count' in result:
+            self.stats['prompt_eval_tokens'] += result['prompt_eval_count']
+            self._count('ollama_prompt_eval_tokens', result['prompt_eval_count'])
+            self.stats['prompt_eval_time'] += result.get('prompt_eval_duration', 0) / 1e9
+            # Avec un contexte, Ollama ne compte que la partie nouvelle du prompt
+            if 'context' not in payload:
+                self.tokenizer.observe(payload.get('system', '') + payload['prompt'], result['prompt_eval_count'])
+    
+    def _record_request(self, elapsed: float, outcome: str):
+        if self.metrics:
+            self.metrics.observe('ollama_request_seconds', elapsed)
+            self.metrics.inc('ollama_requests', outcome=outcome)
+    
+    def _count(self, name: str, amount: float = 1):
+        if self.metrics:
+            self.metrics.inc(name, amount)
+    
+    def _observe(self, name: str, value: float):
+        if self.metrics:
+            self.metrics.observe(name, value)
+    
+    def store(self, prompt: str, content: str, system_prompt: Optional[str] = None,
+              prefix: Optional[str] = None):
+        """Remplace la réponse en cache du prompt (options par défaut), par exemple par
+        une relance acceptée à la place d'une réponse refusée"""
+        payload = self._build_payload(self.join_prefix(prefix, prompt), system_prompt)
+        self.cache.set(self._get_cache_key(payload['prompt'], system_prompt, payload['options']), self.model, content)
+    
+    def _get_cache_key(self, prompt: str, system_prompt: Optional[str] = None,
+                       options: Optional[Dict[str, Any]] = None) -> str:
+        """Génère une clé de cache stable (SHA-256)"""
+        return GenerationCache.make_key(self.model, prompt, system_prompt, options)
     
     async def check_model_availability(self) -> bool:
-        """Vérifie si le modèle est disponible"""
-        try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(f"{self.base_url}/api/tags") as response:
+        """Vérifie si le modèle est disponible sur au moins un nœud"""
+        session = await self._get_session()
+        for backend in self.pool.backends:
+            try:
+                async with session.get(
+                    f"{backend.url}/api/tags",
+                    timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
                     if response.status == 200:
                         models = await response.json()
                         available_models = [m['name'] for m in models.get('models', [])]
-                        return self.model in available_models
+                        if self.model in available_models:
+                            return True
             
-            return False
+            except Exception as e:
+                self.logger.error(f"Erreur vérification modèle sur {backend.url}: {str(e)}")
         
-        except Exception as e:
-            self.logger.error(f"Erreur vérification modèle: {str(e)}")
-            return False
+        return False
     
-    def optimize_prompt(self, prompt: str, max_length: int = 3000) -> str:
-        """Optimise un prompt pour respecter la limite de tokens"""
-        if len(prompt) <= max_length:
-            return prompt
-        
-        # Stratégie simple: garder le début et la fin
-        half_length = max_length // 2
-        truncated = prompt[:half_length] + "\n[...]\n" + prompt[-half_length:]
-        
-        self.logger.info(f"Prompt tronqué de {len(prompt)} à {len(truncated)} caractères")
-        return truncated
+    def optimize_prompt(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Ramène un prompt dans le budget de tokens (contexte - sortie réservée)"""
+        return self.prompt_optimizer.fit_prompt(prompt, system_prompt)
     
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques d'utilisation"""
         return {
             **self.stats,
             'cache_size': len(self.cache),
+            'cache': self.cache.get_stats(),
+            'similarity': self.similar.get_stats() if self.similar.enabled else None,
+            'backends': self.pool.get_stats(),
+            'concurrency': self.limiter.get_stats() if self.limiter else None,
+            'tokenizer': self.tokenizer.get_stats(),
+            'avg_connect_time': self.stats['connect_time'] / max(1, self.stats['connections_created']),
+            'avg_request_time': self.stats['request_time'] / max(1, self.stats['total_requests']),
+            'avg_time_to_first_token': self.stats['time_to_first_token'] / max(1, self.stats['streamed_requests']),
             'success_rate': self.stats['successful_requests'] / max(1, self.stats['total_requests']) * 100
         }
     
@@ -177,11 +604,25 @@ class OllamaClient:
             return False
 
 
+HINT_RE = re.compile(r'[ \t]*\([^)\n]*\)[ \t]*$', re.MULTILINE)
+
+
 class PromptOptimizer:
-    """Optimiseur de prompts pour les modèles locaux"""
+    """Budget de tokens des prompts pour les modèles locaux"""
+    
+    # En-têtes de sections des prompts (voir PromptTemplates)
+    PROTECTED_SECTIONS = ('STRUCTURE', 'Commence directement')
+    OPTIONAL_SECTIONS = ('EXEMPLE DE TON',)
+    TRIMMABLE_SECTIONS = ('CONSIGNES',)
     
-    def __init__(self, max_tokens: int = 4096):
+    def __init__(self, max_tokens: int = 4096, tokenizer: Optional[Tokenizer] = None,
+                 context_tokens: int = 8192, template_overhead: int = 32):
+        # max_tokens : tokens réservés à la réponse (num_predict)
         self.max_tokens = max_tokens
+        self.context_tokens = context_tokens
+        # Tokens ajoutés par le template de chat du modèle
+        self.template_overhead = template_overhead
+        self.tokenizer = tokenizer or load_tokenizer()
         self.logger = logging.getLogger(__name__)
     
     def chunk_content(self, content: str, chunk_size: int = 2000) -> List[str]:
@@ -212,38 +653,78 @@ class PromptOptimizer:
         return chunks
     
     def estimate_tokens(self, text: str) -> int:
-        """Estime le nombre de tokens (approximation)"""
-        # Approximation: 1 token ≈ 4 caractères pour le français
-        return len(text) // 4
+        """Nombre de tokens du texte (tokenizer local ou estimation calibrée)"""
+        return self.tokenizer.count(text)
+    
+    def prompt_budget(self, system_prompt: Optional[str] = None) -> int:
+        """Tokens disponibles pour le prompt : contexte - sortie réservée - prompt système"""
+        reserved = self.max_tokens + self.template_overhead
+        if system_prompt:
+            reserved += self.estimate_tokens(system_prompt)
+        return max(0, self.context_tokens - reserved)
+    
+    def fit_prompt(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Ramène le prompt dans le budget du contexte"""
+        return self.optimize_for_model(prompt, self.prompt_budget(system_prompt))
     
     def optimize_for_model(self, prompt: str, available_tokens: int) -> str:
-        """Optimise un prompt pour un nombre de tokens disponible"""
-        estimated_tokens = self.estimate_tokens(prompt)
+        """Réduit un prompt section par section jusqu'à tenir dans available_tokens
         
-        if estimated_tokens <= available_tokens:
+        Les sections sont les blocs séparés par une ligne vide. Dans l'ordre : retrait
+        des exemples de ton, des blocs annexes (du dernier au premier), puis des lignes
+        de consignes ; la demande, la structure et la consigne finale sont conservées.
+        """
+        if self.estimate_tokens(prompt) <= available_tokens:
             return prompt
         
-        # Réduction proportionnelle
-        reduction_ratio = available_tokens / estimated_tokens
-        target_length = int(len(prompt) * reduction_ratio)
+        blocks: List[Optional[str]] = prompt.split('\n\n')
+        counts = [self.estimate_tokens(block) for block in blocks]
+        last = len(blocks) - 1
+        protected = {0, last} | {
+            i for i, block in enumerate(blocks) if block.lstrip().startswith(self.PROTECTED_SECTIONS)
+        }
         
-        # Stratégie: garder le début (instructions) et une partie du contenu
-        if target_length < 200:
-            return prompt[:target_length]
+        def total() -> int:
+            # Chaque séparateur de blocs compte pour un token
+            kept = [count for block, count in zip(blocks, counts) if block is not None]
+            return sum(kept) + len(kept) - 1
         
-        # Garder les 200 premiers caractères (instructions) et le reste du contenu
-        instructions = prompt[:200]
-        remaining_length = target_length - 200
-        content = prompt[200:]
+        optional = [i for i, block in enumerate(blocks) if block.lstrip().startswith(self.OPTIONAL_SECTIONS)]
+        others = [i for i in range(last, -1, -1) if i not in protected and i not in optional
+                  and not blocks[i].lstrip().startswith(self.TRIMMABLE_SECTIONS)]
+        for i in optional + others:
+            if total() <= available_tokens:
+                break
+            blocks[i], counts[i] = None, 0
         
-        if len(content) <= remaining_length:
-            return prompt
+        # Consignes et sections restantes : retrait ligne par ligne, en gardant l'en-tête
+        for i in range(last, -1, -1):
+            if blocks[i] is None or (i in protected and i != 0):
+                continue
+            lines = blocks[i].split('\n')
+            while len(lines) > 1 and total() > available_tokens:
+                lines.pop()
+                blocks[i] = '\n'.join(lines)
+                counts[i] = self.estimate_tokens(blocks[i])
+            # Un en-tête de section sans contenu ne sert à rien
+            if i != 0 and len(lines) == 1 and total() > available_tokens:
+                blocks[i], counts[i] = None, 0
         
-        # Prendre le début et la fin du contenu
-        half_remaining = remaining_length // 2
-        optimized_content = content[:half_remaining] + "\n[...]\n" + content[-half_remaining:]
+        # En dernier recours : les indications entre parenthèses de la structure
+        for i in sorted(protected):
+            if total() <= available_tokens:
+                break
+            if blocks[i] is not None and blocks[i].lstrip().startswith('STRUCTURE'):
+                blocks[i] = HINT_RE.sub('', blocks[i])
+                counts[i] = self.estimate_tokens(blocks[i])
         
-        return instructions + optimized_content
+        optimized = '\n\n'.join(block for block in blocks if block is not None)
+        tokens = self.estimate_tokens(optimized)
+        if tokens > available_tokens:
+            self.logger.warning(f"Prompt au-dessus du budget malgré la réduction: {tokens}/{available_tokens} tokens")
+        else:
+            self.logger.info(f"Prompt réduit à {tokens}/{available_tokens} tokens")
+        return optimized
 
 
 async def main():
@@ -263,6 +744,7 @@ async def main():
         print("✅ Connexion réussie!")
     else:
         print("❌ Échec de connexion")
+        await client.close()
         return
     
     # Test de génération
@@ -277,6 +759,7 @@ async def main():
     
     # Statistiques
     print(f"\nStatistiques: {client.get_stats()}")
+    await client.close()
 
 
 if __name__ == "__main__":
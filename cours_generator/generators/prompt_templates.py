@@ -3,14 +3,26 @@ Templates de prompts pour la génération de contenu éducatif
 Optimisés pour les modèles locaux (Gemma 7B, Mistral 7B)
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import json
+import re
+
+
+# Désigne l'élément dans la partie fixe d'un prompt (réutilisation de préfixe)
+SUBJECT = '[SUJET]'
+
+# Ligne de la STRUCTURE OBLIGATOIRE : « 1. **Titre** (consigne) »
+STRUCTURE_LINE_RE = re.compile(r'^\d+\.\s*\*\*(.+?)\*\*\s*\((.+)\)\s*$', re.MULTILINE)
+CONSIGNES_RE = re.compile(r'^CONSIGNES :\n((?:- .*\n?)+)', re.MULTILINE)
+MAX_WORDS_RE = re.compile(r'Maximum (\d+) mots')
 
 
 class PromptTemplates:
     """Gestionnaire des templates de prompts"""
     
     def __init__(self):
+        # Nombre de tokens de chaque template sans le nom de l'élément
+        self._template_tokens: Dict[tuple, int] = {}
         self.base_system_prompt = """Tu es un assistant spécialisé dans la création de contenu éducatif pour des cours de français.
 Tu dois créer du contenu structuré, clair et engageant pour des lycéens français.
 Ton style doit être :
@@ -216,29 +228,74 @@ Commence directement par le contenu."""
         """Retourne le prompt système adapté à la catégorie"""
         return self.base_system_prompt
     
-    def optimize_prompt_length(self, prompt: str, max_length: int = 3000) -> str:
-        """Optimise la longueur d'un prompt"""
-        if len(prompt) <= max_length:
-            return prompt
+    def get_prompt_parts(self, category: str, item: Dict[str, Any]) -> Tuple[str, str]:
+        """Prompt découpé en partie fixe de la catégorie et partie propre à l'élément
         
-        # Garder l'essentiel: structure + consignes
-        lines = prompt.split('\n')
-        important_lines = []
+        La partie fixe est identique pour tous les éléments de la catégorie : Ollama
+        peut l'évaluer une seule fois et réutiliser son contexte.
+        """
+        prefix = self.get_prompt(category, {**item, 'name': SUBJECT})
+        return prefix, f"{SUBJECT} = {item.get('name', '')}"
+    
+    def count_tokens(self, category: str, item: Dict[str, Any], tokenizer) -> int:
+        """Nombre de tokens du prompt d'un élément (template mémorisé + nom)
         
-        for line in lines:
-            if any(keyword in line.upper() for keyword in ['STRUCTURE', 'CONSIGNES', 'EXEMPLE']):
-                important_lines.append(line)
-            elif line.strip() and not line.startswith('EXEMPLE DE TON'):
-                important_lines.append(line)
+        Le template n'est compté qu'une fois par catégorie ; le total est exact à
+        quelques tokens près (fusions BPE autour du nom).
+        """
+        key = (category, tokenizer.name, getattr(tokenizer, 'version', 0))
+        if key not in self._template_tokens:
+            self._template_tokens[key] = tokenizer.count(self.get_prompt(category, {**item, 'name': ''}))
+        return self._template_tokens[key] + tokenizer.count(item.get('name', ''))
+    
+    def get_sections(self, category: str) -> List[Tuple[str, str]]:
+        """Sections demandées par le prompt de la catégorie : (titre, consigne)
         
-        optimized = '\n'.join(important_lines)
+        Le titre en minuscules est la clé de la section dans le contenu parsé.
+        """
+        return [(title.strip(), hint.strip())
+                for title, hint in STRUCTURE_LINE_RE.findall(self.get_prompt(category, {'name': SUBJECT}))]
+    
+    def get_max_words(self, category: str) -> Optional[int]:
+        """Longueur maximale d'une page demandée par le prompt de la catégorie"""
+        match = MAX_WORDS_RE.search(self.get_prompt(category, {'name': SUBJECT}))
+        return int(match.group(1)) if match else None
+    
+    def get_sections_prompt(self, category: str, subjects: List[Tuple[str, List[str]]],
+                            fields: List[Tuple[str, str, str]]) -> str:
+        """Prompt JSON demandant certaines sections pour un ou plusieurs sujets d'une catégorie
         
-        if len(optimized) > max_length:
-            # Dernière réduction
-            optimized = optimized[:max_length-50] + "\n\nCommence directement par le contenu."
+        fields : (identifiant JSON, titre, consigne) des sections ; subjects : (nom,
+        identifiants à rédiger). La réponse attendue est un objet {nom: {identifiant:
+        texte Markdown}}, dont le squelette termine le prompt.
+        """
+        consignes = CONSIGNES_RE.search(self.get_prompt(category, {'name': SUBJECT}))
+        max_words = self.get_max_words(category)
+        wanted_ids = {field_id for _, ids in subjects for field_id in ids}
         
-        return optimized
-
+        lines = [f"Rédige les sections demandées pour chacun des sujets suivants "
+                 f"(cours de français lycée, catégorie {category}).", "", "SECTIONS :"]
+        lines.extend(f"- {field_id} : {title}" + (f" ({hint})" if hint else '')
+                     for field_id, title, hint in fields if field_id in wanted_ids)
+        lines.extend(["", "CONSIGNES :"])
+        if consignes:
+            lines.extend(line for line in consignes.group(1).splitlines() if not MAX_WORDS_RE.search(line))
+        if max_words:
+            lines.append(f"- Maximum {max_words} mots par sujet")
+        lines.extend(["", "SUJETS :"])
+        lines.extend(f"- {name} : {', '.join(ids)}" for name, ids in subjects)
+        skeleton = {name: {field_id: '...' for field_id in ids} for name, ids in subjects}
+        lines.extend([
+            "",
+            "Réponds uniquement avec un objet JSON de cette forme (une clé par sujet, "
+            "une clé par section, textes en Markdown) :",
+            json.dumps(skeleton, ensure_ascii=False)
+        ])
+        return '\n'.join(lines)
+    
+    def optimize_prompt_length(self, prompt: str, optimizer, system_prompt: Optional[str] = None) -> str:
+        """Ramène un prompt dans le budget de tokens, section par section (voir PromptOptimizer)"""
+        return optimizer.fit_prompt(prompt, system_prompt)
 
 def main():
     """Test des templates"""
@@ -0,0 +1,262 @@
+"""
+Contrôle qualité des générations
+Vérifications locales et peu coûteuses avant d'accepter une réponse du modèle :
+longueur (« Maximum N mots » du prompt), couverture des sections, langue
+française (petit modèle de trigrammes de caractères hors ligne) et
+répétitions/dégénérescence. Un refus désigne les sections à redemander
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    from .html_generator import CATEGORY_LAYOUTS
+    from .prompt_templates import PromptTemplates
+    from .section_stream import parse_sections
+except ImportError:  # exécution directe depuis generators/
+    from html_generator import CATEGORY_LAYOUTS
+    from prompt_templates import PromptTemplates
+    from section_stream import parse_sections
+
+
+WORD_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*|\d+")
+LETTERS_RE = re.compile(r"[^a-zàâäçéèêëîïôöùûüÿœæ]+")
+
+# Textes de référence du modèle de langue : le refus le plus fréquent d'un
+# modèle local est une réponse en anglais, d'où le couple français/anglais
+REFERENCE_TEXTS = {
+    'fr': """
+Molière est le maître incontesté de la comédie française. Ses pièces, jouées
+devant le roi comme devant le public parisien, dénoncent l'hypocrisie, l'avarice
+et la vanité des hommes. Le romantisme est un mouvement littéraire né au début
+du dix-neuvième siècle : les écrivains y expriment leurs sentiments, leur
+mélancolie et leur goût pour la nature. Pour réussir le commentaire de texte,
+il faut d'abord lire attentivement l'extrait, repérer les procédés d'écriture et
+construire un plan organisé autour de deux ou trois axes. La métaphore rapproche
+deux réalités sans outil de comparaison ; elle donne au lecteur une image forte.
+Les élèves de seconde étudient la poésie, le théâtre, le roman et la littérature
+d'idées. Chaque œuvre est replacée dans son contexte historique afin de comprendre
+les enjeux de l'époque, les choix de l'auteur et la portée du texte aujourd'hui.
+Victor Hugo défend les pauvres et les exclus dans Les Misérables, tandis que
+Baudelaire cherche la beauté jusque dans la laideur de la ville moderne. Une
+bonne dissertation répond à une problématique précise, s'appuie sur des exemples
+tirés des œuvres au programme et se termine par une conclusion qui ouvre la
+réflexion. Les personnages, les registres et les thèmes permettent d'analyser
+la manière dont l'écrivain cherche à émouvoir, convaincre ou faire rire.
+""",
+    'en': """
+Molière is the undisputed master of French comedy. His plays, performed for the
+king as well as for the Parisian public, expose the hypocrisy, greed and vanity
+of men. Romanticism is a literary movement that emerged at the beginning of the
+nineteenth century: writers express their feelings, their melancholy and their
+love of nature. To succeed in a text commentary, you should first read the
+passage carefully, identify the writing techniques and build a structured plan
+around two or three main ideas. A metaphor brings together two realities without
+a word of comparison; it gives the reader a strong image. Students in their first
+year study poetry, drama, the novel and the literature of ideas. Each work is set
+in its historical context in order to understand the issues of the period, the
+choices made by the author and the meaning of the text today. Victor Hugo defends
+the poor and the excluded in Les Misérables, while Baudelaire looks for beauty
+even in the ugliness of the modern city. A good essay answers a precise question,
+relies on examples taken from the set texts and ends with a conclusion that opens
+up the discussion. Characters, tones and themes help to analyse the way the
+writer tries to move, convince or amuse the reader.
+"""
+}
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f" {LETTERS_RE.sub(' ', text.lower()).strip()} "
+    return [padded[index:index + 3] for index in range(len(padded) - 2)]
+
+
+class LanguageModel:
+    """Bayésien naïf sur les trigrammes de caractères (lissage de Laplace)"""
+
+    def __init__(self, texts: Dict[str, str]):
+        self.log_probs: Dict[str, Dict[str, float]] = {}
+        self.unseen: Dict[str, float] = {}
+        counts = {language: Counter(_trigrams(text)) for language, text in texts.items()}
+        vocabulary = set().union(*counts.values())
+        for language, counter in counts.items():
+            total = sum(counter.values()) + len(vocabulary) + 1
+            self.log_probs[language] = {gram: math.log((n + 1) / total) for gram, n in counter.items()}
+            self.unseen[language] = math.log(1 / total)
+
+    def margin(self, text: str, language: str = 'fr') -> float:
+        """Log-vraisemblance moyenne par trigramme de language moins celle de la meilleure autre langue"""
+        grams = _trigrams(text)
+        if not grams:
+            return 0.0
+        scores = {
+            lang: sum(probs.get(gram, self.unseen[lang]) for gram in grams) / len(grams)
+            for lang, probs in self.log_probs.items()
+        }
+        return scores[language] - max(score for lang, score in scores.items() if lang != language)
+
+
+@lru_cache(maxsize=1)
+def default_language_model() -> LanguageModel:
+    return LanguageModel(REFERENCE_TEXTS)
+
+
+def count_words(text: str) -> int:
+    return len(WORD_RE.findall(text))
+
+
+def repetition_ratio(text: str, n: int = 4) -> float:
+    """Part des n-grammes de mots déjà vus (0 = aucune répétition, proche de 1 = boucle)"""
+    words = [word.lower() for word in WORD_RE.findall(text)]
+    grams = [tuple(words[index:index + n]) for index in range(len(words) - n + 1)]
+    if not grams:
+        return 0.0
+    return 1 - len(set(grams)) / len(grams)
+
+
+class QualityReport(NamedTuple):
+    """Résultat du contrôle : sections à redemander et motifs du refus"""
+    accepted: bool
+    reasons: List[str]
+    failed_sections: List[str]
+    words: int
+    coverage: float
+
+
+class QualityGate:
+    """Contrôle des générations et statistiques d'acceptation par catégorie"""
+
+    def __init__(self, templates: PromptTemplates, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.templates = templates
+        self.enabled = config.get('enabled', True)
+        # Longueur acceptée : entre min_words_ratio et max_words_ratio fois le maximum du prompt
+        self.max_words_ratio = config.get('max_words_ratio', 1.25)
+        self.min_words_ratio = config.get('min_words_ratio', 0.25)
+        self.min_coverage = config.get('min_coverage', 0.8)
+        # Marge minimale de log-vraisemblance du français sur l'anglais, par trigramme
+        self.min_french_margin = config.get('min_french_margin', 0.0)
+        self.max_repetition = config.get('max_repetition', 0.3)
+        # Sections trop courtes pour juger la langue ou les répétitions
+        self.min_section_words = config.get('min_section_words', 20)
+        self.retries = config.get('retries', 2)
+        self.temperature_step = config.get('temperature_step', 0.15)
+        self.max_temperature = config.get('max_temperature', 1.2)
+        # keep : la meilleure tentative est publiée malgré le refus ; fail : l'élément échoue
+        self.on_reject = config.get('on_reject', 'keep')
+        self.language_model = default_language_model()
+        self.logger = logging.getLogger(__name__)
+        self.metrics = None
+        self._expected: Dict[str, List[Tuple[str, ...]]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def expected_sections(self, category: str) -> List[Tuple[str, ...]]:
+        """Clés possibles de chaque section attendue (mise en page, sinon structure du prompt)"""
+        expected = self._expected.get(category)
+        if expected is None:
+            layout = CATEGORY_LAYOUTS.get(category)
+            if layout is not None:
+                expected = [spec.keys for spec in layout.sections]
+            else:
+                expected = [(title.lower(),) for title, _ in self.templates.get_sections(category)]
+            self._expected[category] = expected
+        return expected
+
+    def check(self, category: str, content: Union[str, Dict[str, str]]) -> QualityReport:
+        """Contrôle une génération (texte brut ou sections)"""
+        sections = content if isinstance(content, dict) else parse_sections(content or '')
+        expected = self.expected_sections(category)
+        max_words = self.templates.get_max_words(category)
+        reasons: List[str] = []
+        failed: List[str] = []
+        section_words: Dict[str, int] = {}
+
+        found = 0
+        for keys in expected:
+            key = next((key for key in keys if sections.get(key, '').strip()), None)
+            if key is None:
+                failed.append(keys[0])
+                continue
+            found += 1
+            text = sections[key]
+            words = section_words[key] = count_words(text)
+            if words < self.min_section_words:
+                continue
+            if self.language_model.margin(text) < self.min_french_margin:
+                reasons.append(f"langue ({key})")
+                failed.append(key)
+            elif repetition_ratio(text) > self.max_repetition:
+                reasons.append(f"répétitions ({key})")
+                failed.append(key)
+
+        coverage = found / len(expected) if expected else 1.0
+        if coverage < self.min_coverage:
+            reasons.append(f"sections {found}/{len(expected)}")
+
+        total = sum(section_words.values()) if expected else count_words(' '.join(sections.values()))
+        if max_words and section_words:
+            share = max_words / len(expected)
+            if total > max_words * self.max_words_ratio:
+                reasons.append(f"trop long ({total} > {max_words} mots)")
+                failed.extend(key for key, words in section_words.items()
+                              if words > share * self.max_words_ratio and key not in failed)
+            elif total < max_words * self.min_words_ratio:
+                reasons.append(f"trop court ({total} mots)")
+                failed.extend(key for key, words in section_words.items()
+                              if words < share * self.min_words_ratio and key not in failed)
+
+        # Sections manquantes seules au-dessus du seuil de couverture : page acceptée, section redemandée
+        return QualityReport(not reasons, reasons, failed, total, round(coverage, 3))
+
+    def retry_options(self, attempt: int, base_temperature: float) -> Dict[str, Any]:
+        """Options d'une nouvelle tentative : autre graine, température un peu plus haute"""
+        return {
+            'seed': 1000 + attempt,
+            'temperature': round(min(self.max_temperature, base_temperature + self.temperature_step * attempt), 3)
+        }
+
+    def _category_stats(self, category: str) -> Dict[str, Any]:
+        stats = self.stats.get(category)
+        if stats is None:
+            stats = self.stats[category] = {
+                'checked': 0, 'accepted': 0, 'rejected': 0, 'retries': 0,
+                'pages_rejected': 0, 'wasted_tokens': 0, 'reasons': Counter()
+            }
+        return stats
+
+    def record(self, category: str, report: QualityReport, wasted_tokens: int = 0):
+        """Compte un contrôle ; wasted_tokens : tokens de la réponse (ou des sections) refusée"""
+        stats = self._category_stats(category)
+        stats['checked'] += 1
+        outcome = 'accepted' if report.accepted else 'rejected'
+        stats[outcome] += 1
+        if not report.accepted:
+            stats['wasted_tokens'] += wasted_tokens
+            for reason in report.reasons:
+                stats['reasons'][reason.split(' (')[0]] += 1
+        if self.metrics:
+            self.metrics.inc('cours_quality_checks', category=category, outcome=outcome)
+            if wasted_tokens and not report.accepted:
+                self.metrics.inc('cours_quality_wasted_tokens', wasted_tokens, category=category)
+
+    def record_retry(self, category: str):
+        self._category_stats(category)['retries'] += 1
+
+    def record_final(self, category: str, report: QualityReport):
+        """Issue finale d'un élément après les relances"""
+        if not report.accepted:
+            self._category_stats(category)['pages_rejected'] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Taux d'acceptation, relances et tokens perdus par catégorie"""
+        return {
+            category: {
+                **{key: value for key, value in stats.items() if key != 'reasons'},
+                'acceptance_rate': round(stats['accepted'] / stats['checked'], 3) if stats['checked'] else 0.0,
+                'reasons': dict(stats['reasons'])
+            }
+            for category, stats in self.stats.items()
+        }
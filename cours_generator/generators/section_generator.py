@@ -0,0 +1,260 @@
+"""
+Génération par sections
+Chaque section d'une page (citations, anecdotes...) est demandée, mise en cache
+et relancée séparément : seules les sections manquantes ou invalides sont
+régénérées. Les réponses suivent le schéma JSON de la catégorie et passent par
+son validateur compilé. Les éléments d'une même catégorie sont regroupés dans
+une seule requête tant que leur sortie attendue tient dans max_tokens
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from .generation_cache import GenerationCache
+    from .prompt_templates import PromptTemplates
+    from .structured_output import ContentSchema
+except ImportError:  # exécution directe depuis generators/
+    from generation_cache import GenerationCache
+    from prompt_templates import PromptTemplates
+    from structured_output import ContentSchema
+
+
+# À incrémenter si le format des prompts de section change (invalide le cache des sections)
+SECTIONS_VERSION = '2'
+
+
+class _SectionRequest:
+    """Sections demandées pour un élément, en attente dans un lot"""
+
+    __slots__ = ('name', 'field_ids', 'tokens', 'future')
+
+    def __init__(self, name: str, field_ids: List[str], tokens: float, future: asyncio.Future):
+        self.name = name
+        self.field_ids = field_ids
+        self.tokens = tokens
+        self.future = future
+
+
+class SectionGenerator:
+    """Génère une page section par section, avec cache et lots par catégorie"""
+
+    def __init__(self, ollama, templates: PromptTemplates, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.ollama = ollama
+        self.templates = templates
+        self.enabled = config.get('enabled', False)
+        # Éléments au plus par requête (1 désactive le regroupement)
+        self.batch_items = config.get('batch_items', 4)
+        self.batch_delay = config.get('batch_delay', 0.05)
+        # Part de max_tokens que la sortie attendue d'un lot peut occuper (marge contre la troncature)
+        self.fill_ratio = config.get('fill_ratio', 0.8)
+        self.tokens_per_word = config.get('tokens_per_word', 1.5)
+        self.min_chars = config.get('min_chars', 40)
+        self.attempts = config.get('attempts', 3)
+        # Schéma JSON complet dans format (Ollama >= 0.5), sinon simple format « json »
+        self.send_schema = config.get('schema', True)
+        self.logger = logging.getLogger(__name__)
+
+        self._pending: Dict[str, List[_SectionRequest]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._schemas: Dict[str, ContentSchema] = {}
+
+        # Statistiques
+        self.stats = {
+            'items': 0,
+            'requests': 0,
+            'batched_items': 0,
+            'sections_cached': 0,
+            'sections_generated': 0,
+            'sections_retried': 0,
+            'sections_invalid': 0,
+            'sections_missing': 0
+        }
+
+    def get_schema(self, category: str) -> ContentSchema:
+        """Schéma de la catégorie, construit une fois (validateur compilé compris)"""
+        schema = self._schemas.get(category)
+        if schema is None:
+            schema = self._schemas[category] = ContentSchema.for_category(category, self.templates, self.min_chars)
+        return schema
+
+    def build_prompt(self, category: str, subjects: List[Tuple[str, List[str]]]) -> str:
+        fields = [(field.id, field.title, field.hint) for field in self.get_schema(category).fields]
+        return self.templates.get_sections_prompt(category, subjects, fields)
+
+    def page_prompt(self, category: str, item: Dict[str, Any]) -> str:
+        """Prompt équivalent à la page entière (empreinte du manifeste et journal)"""
+        field_ids = [field.id for field in self.get_schema(category).fields]
+        return self.build_prompt(category, [(item.get('name', ''), field_ids)])
+
+    def expected_tokens(self, category: str, sections: int) -> float:
+        """Tokens de sortie attendus pour quelques sections, d'après le « Maximum N mots » du prompt"""
+        total = len(self.get_schema(category).fields) or 1
+        max_words = self.templates.get_max_words(category) or 700
+        return max_words * self.tokens_per_word * sections / total
+
+    def _cache_key(self, category: str, name: str, field_id: str) -> str:
+        field = self.get_schema(category).by_id[field_id]
+        return GenerationCache.make_key(
+            self.ollama.model,
+            f"section:{SECTIONS_VERSION}:{category}:{name}:{field.id}:{field.hint}",
+            None,
+            self.ollama.generation_options()
+        )
+
+    async def generate(self, category: str, item: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Sections de la page (clés lues par la page, comme parse_sections), ou None
+
+        Sections en cache reprises ; les autres demandées (en lot) puis relancées
+        seules, jusqu'à attempts fois : une relance ne redemande que les champs
+        refusés par le validateur.
+        """
+        name = item.get('name', '')
+        schema = self.get_schema(category)
+        self.stats['items'] += 1
+        values: Dict[str, str] = {}
+        missing = []
+        for field in schema.fields:
+            cached = self.ollama.cache.get(self._cache_key(category, name, field.id))
+            if cached is not None:
+                values[field.id] = cached
+                self.stats['sections_cached'] += 1
+            else:
+                missing.append(field.id)
+
+        errors: Dict[str, str] = {}
+        for attempt in range(self.attempts):
+            if not missing:
+                break
+            if attempt:
+                self.stats['sections_retried'] += len(missing)
+                reasons = ', '.join(f"{field_id}: {errors.get(field_id, 'absent')}" for field_id in missing)
+                self.logger.info(f"{name}: {len(missing)} sections redemandées ({reasons})")
+                # Une relance part seule : un lot refusé ne retarde pas les autres éléments
+                entry = (await self._request(category, [(name, missing)])).get(name)
+            else:
+                entry = await self._submit(category, name, missing)
+
+            valid, errors = schema.validate(entry if entry is not None else {})
+            for field_id in missing:
+                if field_id in valid:
+                    values[field_id] = valid[field_id]
+                    self.ollama.cache.set(self._cache_key(category, name, field_id), self.ollama.model, valid[field_id])
+                    self.stats['sections_generated'] += 1
+                elif entry is not None and field_id in entry:
+                    self.stats['sections_invalid'] += 1
+            missing = [field_id for field_id in missing if field_id not in valid]
+
+        if missing:
+            self.stats['sections_missing'] += len(missing)
+            self.logger.warning(f"{name}: sections manquantes après {self.attempts} tentatives: {', '.join(missing)}")
+        return schema.to_content(values) or None
+
+    async def regenerate(self, category: str, item: Dict[str, Any], content: Dict[str, str],
+                         keys: List[str], options: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Redemande seulement les sections refusées par le contrôle qualité (clés de la page)
+
+        options : graine/température de la relance. Les nouvelles valeurs valides
+        remplacent les anciennes, en cache comme dans la page.
+        """
+        name = item.get('name', '')
+        schema = self.get_schema(category)
+        field_ids = [field.id for field in schema.fields if field.key in keys]
+        if not field_ids:
+            return content
+        self.stats['sections_retried'] += len(field_ids)
+        entry = (await self._request(category, [(name, field_ids)], options)).get(name)
+        valid, _ = schema.validate(entry if entry is not None else {})
+        values = {field.id: content[field.key] for field in schema.fields if field.key in content}
+        for field_id in field_ids:
+            if field_id in valid:
+                values[field_id] = valid[field_id]
+                self.ollama.cache.set(self._cache_key(category, name, field_id), self.ollama.model, valid[field_id])
+                self.stats['sections_generated'] += 1
+        return schema.to_content(values)
+
+    async def _submit(self, category: str, name: str, field_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Ajoute la demande au lot de la catégorie et attend sa part de la réponse"""
+        tokens = self.expected_tokens(category, len(field_ids))
+        capacity = self.ollama.max_tokens * self.fill_ratio
+        # Élément seul trop gros pour partager une requête : pas de regroupement
+        if self.batch_items <= 1 or tokens * 2 > capacity:
+            return (await self._request(category, [(name, field_ids)])).get(name)
+
+        pending = self._pending.get(category, [])
+        if pending and (sum(request.tokens for request in pending) + tokens > capacity
+                        or any(request.name == name for request in pending)):
+            self._flush(category)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(category, []).append(_SectionRequest(name, field_ids, tokens, future))
+        if len(self._pending[category]) >= self.batch_items:
+            self._flush(category)
+        elif category not in self._timers:
+            self._timers[category] = asyncio.get_running_loop().call_later(
+                self.batch_delay, self._flush, category
+            )
+        return await future
+
+    def _flush(self, category: str):
+        """Envoie le lot en attente de la catégorie"""
+        timer = self._timers.pop(category, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(category, [])
+        if batch:
+            task = asyncio.ensure_future(self._send(category, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, category: str, batch: List[_SectionRequest]):
+        try:
+            results = await self._request(category, [(request.name, request.field_ids) for request in batch])
+        except Exception as e:
+            self.logger.error(f"Erreur du lot {category}: {str(e)}")
+            results = {}
+        if len(batch) > 1:
+            self.stats['batched_items'] += len(batch)
+        for request in batch:
+            if not request.future.done():
+                request.future.set_result(results.get(request.name))
+
+    async def _request(self, category: str, subjects: List[Tuple[str, List[str]]],
+                       options: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """Une requête JSON pour un ou plusieurs sujets ; retourne {nom: {identifiant: valeur}}"""
+        self.stats['requests'] += 1
+        schema = self.get_schema(category)
+        output_format: Any = 'json'
+        if self.send_schema:
+            output_format = {
+                'type': 'object',
+                'properties': {name: schema.json_schema(field_ids) for name, field_ids in subjects},
+                'required': [name for name, _ in subjects]
+            }
+        data = await self.ollama.generate_json(self.build_prompt(category, subjects), output_format=output_format,
+                                              options=options)
+        if not data:
+            return {}
+
+        names = [name for name, _ in subjects]
+        # Un seul sujet : le modèle répond parfois directement avec les sections
+        if len(subjects) == 1 and names[0] not in data and not any(isinstance(v, dict) for v in data.values()):
+            data = {names[0]: data}
+        entries = list(data.values())
+        results = {}
+        for index, name in enumerate(names):
+            entry = data.get(name)
+            # Nom reformulé par le modèle : correspondance par position
+            if entry is None and len(entries) == len(names):
+                entry = entries[index]
+            if isinstance(entry, dict):
+                results[name] = entry
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['items_per_request'] = round(stats['items'] / stats['requests'], 2) if stats['requests'] else 0.0
+        return stats
@@ -0,0 +1,80 @@
+"""
+Parser incrémental des sections générées
+Découpe un flux de texte en blocs **Section** dès qu'ils sont terminés
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+class StreamingSectionParser:
+    """Parser de sections alimenté morceau par morceau"""
+
+    def __init__(self):
+        self._buffer = ''
+        self._current_section: Optional[str] = None
+        self._current_content: List[str] = []
+        self.sections: Dict[str, str] = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Ajoute un morceau de texte et retourne les sections terminées"""
+        self._buffer += chunk
+        closed = []
+
+        # On ne traite que les lignes complètes, la dernière peut être partielle
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            section = self._process_line(line)
+            if section:
+                closed.append(section)
+
+        return closed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Termine le flux et retourne les dernières sections"""
+        closed = []
+
+        if self._buffer:
+            section = self._process_line(self._buffer)
+            self._buffer = ''
+            if section:
+                closed.append(section)
+
+        section = self._close_current()
+        if section:
+            closed.append(section)
+
+        return closed
+
+    def _process_line(self, line: str) -> Optional[Tuple[str, str]]:
+        stripped = line.strip()
+        if not stripped:
+            return None
+
+        # Détection des sections (headers avec **)
+        if stripped.startswith('**') and stripped.endswith('**'):
+            closed = self._close_current()
+            self._current_section = stripped.strip('*').strip().lower()
+            self._current_content = []
+            return closed
+
+        # L'indentation est conservée pour les listes imbriquées
+        self._current_content.append(line.rstrip())
+        return None
+
+    def _close_current(self) -> Optional[Tuple[str, str]]:
+        if not self._current_section:
+            return None
+
+        section = (self._current_section, '\n'.join(self._current_content).strip())
+        self.sections[section[0]] = section[1]
+        self._current_section = None
+        self._current_content = []
+        return section
+
+
+def parse_sections(content: str) -> Dict[str, str]:
+    """Parse un contenu complet en sections"""
+    parser = StreamingSectionParser()
+    parser.feed(content)
+    parser.close()
+    return parser.sections
@@ -0,0 +1,242 @@
+"""
+Cache de second niveau par sujet
+Les générations sont indexées par catégorie et sujet normalisé (« Les Lumières »
+-> « lumieres »). Un sujet proche d'un sujet déjà généré, d'après une signature
+MinHash des trigrammes de caractères, réutilise la réponse (même catégorie)
+ou sert d'appui au prompt (autre catégorie, sujet moins proche)
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import struct
+import time
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from .generation_cache import GenerationCache
+except ImportError:  # exécution directe depuis generators/
+    from generation_cache import GenerationCache
+
+
+# Mots vides retirés des sujets : « Les Lumières », « lumieres.md » et « Lumières » se rejoignent
+STOPWORDS = {'le', 'la', 'les', 'l', 'de', 'du', 'des', 'd', 'et', 'un', 'une', 'au', 'aux', 'md'}
+NUMBER_RE = re.compile(r'\d+')
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def normalize_entity(name: str) -> str:
+    """Sujet sans accents, casse, ponctuation, mots vides ni pluriels, mots triés
+
+    « Hugo (Victor) » et « Victor Hugo », « alexandrins » et « alexandrin » se rejoignent.
+    """
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii').lower()
+    words = (word for word in re.split(r'[^a-z0-9]+', ascii_name) if word and word not in STOPWORDS)
+    return ' '.join(sorted(word[:-1] if len(word) > 3 and word[-1] in 'sx' else word for word in words))
+
+
+def shingles(entity: str, size: int = 3) -> Set[str]:
+    """Trigrammes de caractères du sujet normalisé (bords compris)"""
+    padded = f" {entity} "
+    return {padded[index:index + size] for index in range(max(1, len(padded) - size + 1))}
+
+
+class MinHasher:
+    """Signatures MinHash : la part de valeurs égales estime la similarité de Jaccard"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        # Permutations h -> (a * h + b) mod p, tirées de façon reproductible entre les runs
+        digest = hashlib.sha256(f"minhash:{seed}".encode()).digest()
+        params = []
+        while len(params) < num_perm:
+            digest = hashlib.sha256(digest).digest()
+            a, b = struct.unpack('<QQ', digest[:16])
+            params.append((a % (MERSENNE_PRIME - 1) + 1, b % MERSENNE_PRIME))
+        self.params = params
+
+    def signature(self, grams: Set[str]) -> Tuple[int, ...]:
+        hashes = [struct.unpack('<I', hashlib.blake2b(gram.encode(), digest_size=4).digest())[0] for gram in grams]
+        return tuple(
+            min((a * value + b) % MERSENNE_PRIME for value in hashes) & MAX_HASH
+            for a, b in self.params
+        )
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class SimilarMatch(NamedTuple):
+    """Génération antérieure sur un sujet proche"""
+    category: str
+    name: str
+    similarity: float
+    response: str
+    reuse: bool
+
+
+class SimilarityCache:
+    """Index MinHash/LSH des sujets générés, adossé au cache de génération
+
+    Les réponses restent dans GenerationCache : l'index ne garde que le nom
+    d'origine et la clé de cache de chaque (catégorie, sujet normalisé). Une
+    entrée évincée du cache disparaît de l'index à la première recherche qui
+    la rencontre.
+    """
+
+    def __init__(self, cache: GenerationCache, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.cache = cache
+        self.enabled = config.get('enabled', False)
+        # Même catégorie, similarité >= reuse_threshold : réponse reprise telle quelle
+        self.reuse_threshold = config.get('reuse_threshold', 0.9)
+        # Similarité >= seed_threshold : extrait de la réponse ajouté au prompt
+        self.seed_threshold = config.get('seed_threshold', 0.5)
+        self.seed_chars = config.get('seed_chars', 1500)
+        num_perm = config.get('num_perm', 64)
+        # Bandes LSH : candidats = sujets qui partagent une bande entière de la signature
+        self.bands = config.get('bands', 32)
+        self.rows = max(1, num_perm // self.bands)
+        self.hasher = MinHasher(self.bands * self.rows)
+        self.logger = logging.getLogger(__name__)
+
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, ...], str, str]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[Tuple[str, str]]] = {}
+        self.stats = {
+            'lookups': 0,
+            'reused': 0,
+            'seeded': 0,
+            'misses': 0,
+            'indexed': 0,
+            'reused_chars': 0
+        }
+        self._conn: Optional[sqlite3.Connection] = None
+        if self.enabled:
+            self._open()
+
+    def _open(self):
+        """Table des sujets dans la base du cache, chargée en mémoire"""
+        self._conn = sqlite3.connect(self.cache.path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS subjects (
+                category TEXT NOT NULL,
+                entity TEXT NOT NULL,
+                name TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                cache_key TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (category, entity)
+            )
+        """)
+        self._conn.commit()
+        size = len(self.hasher.params)
+        for category, entity, name, blob, cache_key in self._conn.execute(
+            'SELECT category, entity, name, signature, cache_key FROM subjects'
+        ):
+            signature = struct.unpack(f'<{size}I', blob) if len(blob) == size * 4 else None
+            if signature is not None:
+                self._index((category, entity), signature, cache_key, name)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _index(self, subject: Tuple[str, str], signature: Tuple[int, ...], cache_key: str, name: str):
+        self._entries[subject] = (signature, cache_key, name)
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(subject)
+
+    def _forget(self, subject: Tuple[str, str]):
+        signature = self._entries.pop(subject)[0]
+        for band in self._bands(signature):
+            self._buckets.get(band, set()).discard(subject)
+        self._conn.execute('DELETE FROM subjects WHERE category = ? AND entity = ?', subject)
+        self._conn.commit()
+
+    def lookup(self, category: str, name: str) -> Optional[SimilarMatch]:
+        """Génération la plus proche d'un autre élément, au-dessus de seed_threshold
+
+        L'élément lui-même (même catégorie, même nom) est exclu : s'il est régénéré,
+        c'est que ses entrées ont changé.
+        """
+        if not self.enabled:
+            return None
+        self.stats['lookups'] += 1
+        entity = normalize_entity(name)
+        signature = self.hasher.signature(shingles(entity))
+        candidates: Set[Tuple[str, str]] = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+        if self._entries.get((category, entity), (None, None, None))[2] == name:
+            candidates.discard((category, entity))
+
+        ranked: List[Tuple[float, bool, Tuple[str, str]]] = []
+        for subject in candidates:
+            similarity = self.hasher.similarity(signature, self._entries[subject][0])
+            if similarity >= self.seed_threshold:
+                # À similarité égale, la même catégorie d'abord (réutilisable telle quelle)
+                ranked.append((similarity, subject[0] == category, subject))
+
+        for similarity, same_category, subject in sorted(ranked, reverse=True):
+            response = self.cache.get(self._entries[subject][1])
+            if response is None:
+                self._forget(subject)
+                continue
+            # « cours1 » et « cours2 » sont proches mais distincts : pas de réutilisation
+            reuse = (same_category and similarity >= self.reuse_threshold
+                     and NUMBER_RE.findall(subject[1]) == NUMBER_RE.findall(entity))
+            self.stats['reused' if reuse else 'seeded'] += 1
+            if reuse:
+                self.stats['reused_chars'] += len(response)
+            previous = self._entries[subject][2]
+            self.logger.info(f"Sujet proche de {category}/{name}: {subject[0]}/{previous} "
+                             f"(similarité {similarity:.2f}, {'réutilisé' if reuse else 'appui du prompt'})")
+            return SimilarMatch(subject[0], previous, round(similarity, 3), response, reuse)
+
+        self.stats['misses'] += 1
+        return None
+
+    def add(self, category: str, name: str, cache_key: str):
+        """Indexe la génération d'un sujet (clé dans GenerationCache)"""
+        if not self.enabled:
+            return
+        subject = (category, normalize_entity(name))
+        if subject in self._entries:
+            self._forget(subject)
+        signature = self.hasher.signature(shingles(subject[1]))
+        self._index(subject, signature, cache_key, name)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO subjects VALUES (?, ?, ?, ?, ?, ?)',
+            (*subject, name, struct.pack(f'<{len(signature)}I', *signature), cache_key, time.time())
+        )
+        self._conn.commit()
+        self.stats['indexed'] += 1
+
+    def seed_prompt(self, prompt: str, match: SimilarMatch) -> str:
+        """Prompt complété par un extrait de la génération du sujet proche"""
+        excerpt = match.response[:self.seed_chars].rsplit('\n', 1)[0] \
+            if len(match.response) > self.seed_chars else match.response
+        return (
+            f"{prompt}\n\n"
+            f"CONTENU DÉJÀ RÉDIGÉ SUR UN SUJET PROCHE ({match.category} : {match.name}), "
+            f"à reprendre et adapter sans le recopier, en suivant la structure demandée :\n"
+            f"{excerpt}"
+        )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats['lookups']
+        return {
+            **self.stats,
+            'subjects': len(self._entries),
+            'reuse_rate': round(self.stats['reused'] / lookups, 3) if lookups else 0.0,
+            'seed_rate': round(self.stats['seeded'] / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,144 @@
+"""
+Sortie structurée du modèle
+Schéma JSON par catégorie dérivé des sections des pages (CATEGORY_LAYOUTS),
+validateur compilé une fois par schéma et décodage JSON rapide (orjson si
+disponible)
+"""
+
+import json
+import re
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+try:
+    from .html_generator import CATEGORY_LAYOUTS
+    from .prompt_templates import PromptTemplates
+except ImportError:  # exécution directe depuis generators/
+    from html_generator import CATEGORY_LAYOUTS
+    from prompt_templates import PromptTemplates
+
+
+JSON_LIBRARY = 'orjson' if orjson is not None else 'json'
+
+Validator = Callable[[Any], Tuple[Dict[str, str], Dict[str, str]]]
+
+
+def loads(data: Any) -> Any:
+    """Décode du JSON (str ou bytes) avec la bibliothèque la plus rapide disponible"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _slug(title: str) -> str:
+    """Identifiant ASCII d'un titre de section (« Présentation de l'épreuve » -> presentation_de_l_epreuve)"""
+    ascii_title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', ascii_title.lower()).strip('_')
+
+
+def _as_text(value: Any) -> Any:
+    """Listes de textes (citations, œuvres...) converties en liste Markdown"""
+    if isinstance(value, list) and all(isinstance(element, str) for element in value):
+        return '\n'.join(f"- {element}" for element in value)
+    return value
+
+
+def compile_validator(schema: Dict[str, Any]) -> Validator:
+    """Validateur d'un schéma objet à propriétés texte (minLength, maxLength, required)
+
+    Le schéma est lu une seule fois : la fonction retournée ne fait plus que les
+    vérifications, champ par champ. Elle retourne (valeurs valides, erreurs par champ).
+    """
+    required = set(schema.get('required', ()))
+    checks = [
+        (name, prop.get('minLength', 0), prop.get('maxLength'), name in required)
+        for name, prop in schema.get('properties', {}).items()
+    ]
+
+    def validate(data: Any) -> Tuple[Dict[str, str], Dict[str, str]]:
+        if not isinstance(data, dict):
+            return {}, {name: 'objet JSON attendu' for name, _, _, _ in checks}
+        values: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        for name, min_length, max_length, is_required in checks:
+            value = _as_text(data.get(name))
+            if value is None:
+                if is_required:
+                    errors[name] = 'absent'
+                continue
+            if not isinstance(value, str):
+                errors[name] = 'texte attendu'
+                continue
+            value = value.strip()
+            if len(value) < min_length:
+                errors[name] = f"trop court ({len(value)} < {min_length} caractères)"
+            elif max_length is not None and len(value) > max_length:
+                errors[name] = f"trop long ({len(value)} > {max_length} caractères)"
+            else:
+                values[name] = value
+        return values, errors
+
+    return validate
+
+
+class SchemaField(NamedTuple):
+    """Champ du schéma : identifiant JSON, clé du contenu lue par la page, titre et consigne"""
+    id: str
+    key: str
+    title: str
+    hint: str
+
+
+class ContentSchema:
+    """Schéma de la réponse JSON d'une catégorie et son validateur compilé"""
+
+    def __init__(self, category: str, fields: Iterable[SchemaField], min_chars: int = 40):
+        self.category = category
+        self.fields: List[SchemaField] = list(fields)
+        self.by_id = {field.id: field for field in self.fields}
+        self.min_chars = min_chars
+        self.validate: Validator = compile_validator(self.json_schema())
+
+    @classmethod
+    def for_category(cls, category: str, templates: PromptTemplates, min_chars: int = 40) -> 'ContentSchema':
+        """Champs des sections de la page (CATEGORY_LAYOUTS), consignes tirées du prompt
+
+        Les catégories sans mise en page dédiée reprennent les sections de leur prompt.
+        """
+        hints = {title.lower(): (title, hint) for title, hint in templates.get_sections(category)}
+        layout = CATEGORY_LAYOUTS.get(category)
+        if layout is None:
+            fields = [SchemaField(_slug(title), key, title, hint) for key, (title, hint) in hints.items()]
+        else:
+            fields = []
+            for spec in layout.sections:
+                title, hint = next((hints[key] for key in spec.keys if key in hints),
+                                   (spec.title.split(' ', 1)[-1], ''))
+                # spec.keys[0] est la première clé cherchée par la page : jamais de repli
+                fields.append(SchemaField(spec.id, spec.keys[0], title, hint))
+        return cls(category, fields, min_chars)
+
+    def json_schema(self, field_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Schéma JSON (format structuré d'Ollama), limité à certains champs pour une relance"""
+        fields = self.fields if field_ids is None else [self.by_id[field_id] for field_id in field_ids]
+        return {
+            'type': 'object',
+            'properties': {
+                field.id: {
+                    'type': 'string',
+                    'description': f"{field.title} : {field.hint}" if field.hint else field.title,
+                    'minLength': self.min_chars
+                }
+                for field in fields
+            },
+            'required': [field.id for field in fields]
+        }
+
+    def to_content(self, values: Dict[str, str]) -> Dict[str, str]:
+        """Valeurs par identifiant -> contenu par clé de section (format de parse_sections), dans l'ordre de la page"""
+        return {field.key: values[field.id] for field in self.fields if field.id in values}
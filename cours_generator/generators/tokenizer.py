@@ -0,0 +1,222 @@
+"""
+Comptage de tokens pour le budget des prompts
+Tokenizer BPE hors ligne (tokenizer.json local), SentencePiece si disponible,
+sinon estimateur calibré ; les comptes sont mis en cache
+"""
+
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import sentencepiece
+except ImportError:  # dépendance optionnelle
+    sentencepiece = None
+
+
+# Découpage des mots façon GPT-2 (approximation de \p{L} / \p{N} avec re)
+BYTE_LEVEL_RE = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d+| ?[^\s\w]+|\s+(?!\S)|\s+")
+METASPACE_RE = re.compile(r'▁*[^▁]+|▁+')
+
+
+def _bytes_to_unicode() -> Dict[int, str]:
+    """Table octet -> caractère des tokenizers BPE au niveau octet (GPT-2)"""
+    printable = list(range(ord('!'), ord('~') + 1)) + list(range(ord('¡'), ord('¬') + 1)) \
+        + list(range(ord('®'), ord('ÿ') + 1))
+    chars = printable[:]
+    extra = 0
+    for byte in range(256):
+        if byte not in printable:
+            printable.append(byte)
+            chars.append(256 + extra)
+            extra += 1
+    return dict(zip(printable, map(chr, chars)))
+
+
+class Tokenizer(ABC):
+    """Interface commune : nombre de tokens d'un texte"""
+
+    name = 'base'
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Nombre de tokens du texte"""
+
+    def observe(self, text: str, tokens: int):
+        """Compte réel renvoyé par le serveur (utilisé pour la calibration)"""
+
+
+class EstimatingTokenizer(Tokenizer):
+    """Estimateur caractères/token, recalibré sur les comptes réels d'Ollama"""
+
+    name = 'estimation'
+
+    def __init__(self, chars_per_token: float = 3.5, alpha: float = 0.1):
+        self.chars_per_token = chars_per_token
+        self.alpha = alpha
+        self.samples = 0
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token) + 1
+
+    def observe(self, text: str, tokens: int):
+        if not text or tokens <= 0:
+            return
+        ratio = len(text) / tokens
+        # Ignore les comptes aberrants (préfixe déjà en cache côté serveur, etc.)
+        if not 1.5 <= ratio <= 8.0:
+            return
+        self.chars_per_token += self.alpha * (ratio - self.chars_per_token)
+        self.samples += 1
+
+
+class BPETokenizer(Tokenizer):
+    """BPE hors ligne à partir d'un tokenizer.json (format Hugging Face)"""
+
+    name = 'bpe'
+
+    def __init__(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        model = data.get('model', {})
+        if model.get('type') != 'BPE':
+            raise ValueError(f"Modèle de tokenizer non supporté: {model.get('type')}")
+
+        self.vocab: Dict[str, int] = model['vocab']
+        self.ranks: Dict[Tuple[str, str], int] = {}
+        for rank, merge in enumerate(model.get('merges', [])):
+            pair = tuple(merge.split(' ', 1)) if isinstance(merge, str) else tuple(merge)
+            self.ranks[pair] = rank
+        self.byte_fallback = model.get('byte_fallback', False)
+
+        config = json.dumps([data.get('normalizer'), data.get('pre_tokenizer')])
+        self.byte_level = 'ByteLevel' in config
+        self.metaspace = not self.byte_level and '▁' in config
+        self.byte_encoder = _bytes_to_unicode() if self.byte_level else {}
+        # Cache par mot : les mots se répètent énormément d'un prompt à l'autre
+        self._count_word = lru_cache(maxsize=65536)(self._bpe_count)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.byte_level:
+            words = [''.join(self.byte_encoder[b] for b in word.encode('utf-8'))
+                     for word in BYTE_LEVEL_RE.findall(text)]
+        elif self.metaspace:
+            words = METASPACE_RE.findall('▁' + text.replace(' ', '▁'))
+        else:
+            words = text.split()
+        return sum(self._count_word(word) for word in words)
+
+    def _bpe_count(self, word: str) -> int:
+        """Applique les fusions par rang croissant et compte les symboles restants"""
+        if word in self.vocab:
+            return 1
+
+        symbols: List[str] = list(word)
+        while len(symbols) > 1:
+            best = None
+            best_rank = None
+            for i in range(len(symbols) - 1):
+                rank = self.ranks.get((symbols[i], symbols[i + 1]))
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best, best_rank = i, rank
+            if best is None:
+                break
+            symbols[best:best + 2] = [symbols[best] + symbols[best + 1]]
+
+        if not self.byte_fallback:
+            return len(symbols)
+        # Symboles hors vocabulaire : un token par octet UTF-8
+        return sum(1 if symbol in self.vocab else len(symbol.encode('utf-8')) for symbol in symbols)
+
+
+class SentencePieceTokenizer(Tokenizer):
+    """Tokenizer SentencePiece (.model local), si le paquet est installé"""
+
+    name = 'sentencepiece'
+
+    def __init__(self, path: str):
+        self.processor = sentencepiece.SentencePieceProcessor(model_file=path)
+
+    def count(self, text: str) -> int:
+        return len(self.processor.encode(text)) if text else 0
+
+
+class CachedTokenizer(Tokenizer):
+    """Cache LRU des comptes par texte devant un tokenizer quelconque"""
+
+    def __init__(self, tokenizer: Tokenizer, cache_size: int = 4096):
+        self.tokenizer = tokenizer
+        self.name = tokenizer.name
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, int]' = OrderedDict()
+        # Incrémentée quand la calibration invalide les comptes mémorisés
+        self.version = 0
+        self._calibrated_ratio = getattr(tokenizer, 'chars_per_token', None)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def count(self, text: str) -> int:
+        tokens = self._cache.get(text)
+        if tokens is not None:
+            self._cache.move_to_end(text)
+            self.stats['hits'] += 1
+            return tokens
+
+        self.stats['misses'] += 1
+        tokens = self.tokenizer.count(text)
+        self._cache[text] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def observe(self, text: str, tokens: int):
+        self.tokenizer.observe(text, tokens)
+        # Une recalibration significative (> 2 %) invalide les comptes mémorisés
+        ratio = getattr(self.tokenizer, 'chars_per_token', None)
+        if ratio and abs(ratio - self._calibrated_ratio) > 0.02 * self._calibrated_ratio:
+            self._calibrated_ratio = ratio
+            self._cache.clear()
+            self.version += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        chars_per_token = getattr(self.tokenizer, 'chars_per_token', None)
+        return {
+            'tokenizer': self.name,
+            'chars_per_token': round(chars_per_token, 3) if chars_per_token else None,
+            **self.stats
+        }
+
+
+def load_tokenizer(config: Optional[Dict[str, Any]] = None) -> CachedTokenizer:
+    """Tokenizer selon la configuration : vocab_file (.json ou .model), sinon estimation"""
+    config = config or {}
+    logger = logging.getLogger(__name__)
+    vocab_file = config.get('vocab_file')
+    tokenizer: Optional[Tokenizer] = None
+
+    if vocab_file and Path(vocab_file).exists():
+        try:
+            if vocab_file.endswith('.model'):
+                if sentencepiece is None:
+                    logger.warning("sentencepiece non installé, estimation du nombre de tokens")
+                else:
+                    tokenizer = SentencePieceTokenizer(vocab_file)
+            else:
+                tokenizer = BPETokenizer(vocab_file)
+        except Exception as e:
+            logger.warning(f"Tokenizer {vocab_file} inutilisable ({str(e)}), estimation du nombre de tokens")
+    elif vocab_file:
+        logger.warning(f"Vocabulaire introuvable: {vocab_file}, estimation du nombre de tokens")
+
+    if tokenizer is None:
+        tokenizer = EstimatingTokenizer(config.get('chars_per_token', 3.5))
+    return CachedTokenizer(tokenizer, config.get('cache_size', 4096))
@@ -8,13 +8,27 @@ import asyncio
 import argparse
 import json
 import logging
-from pathlib import Path
-from typing import Dict, List, Optional
+import time
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple, Union
 
+from parsers.inventory import Inventory, load_inventory
 from parsers.md_parser import FrancaisParser
 from generators.ollama_client import OllamaClient
 from generators.html_generator import HTMLGenerator
 from generators.prompt_templates import PromptTemplates
+from generators.quality_gate import QualityGate, QualityReport
+from generators.section_generator import SECTIONS_VERSION, SectionGenerator
+from generators.section_stream import StreamingSectionParser
+from pipeline import render_worker
+from pipeline.journal import JobJournal
+from pipeline.linker import CrossLinker
+from pipeline.manifest import BuildManifest
+from pipeline.metrics import MetricsRegistry, current_category
+from pipeline.priority import PriorityPlanner, parse_deadline, parse_duration
+from pipeline.profiler import Profiler
+from pipeline.stages import StagedPipeline
+from pipeline.writer import OutputWriter
 
 
 class CourseGenerator:
@@ -23,9 +37,33 @@ class CourseGenerator:
     def __init__(self, config: Dict):
         self.config = config
         self.parser = FrancaisParser()
+        self.inventory: Optional[Inventory] = None
         self.ollama = OllamaClient(config.get('ollama', {}))
+        self.metrics = MetricsRegistry(config.get('metrics', {}))
+        self.ollama.metrics = self.metrics
         self.html_generator = HTMLGenerator(config.get('templates', {}))
         self.prompt_templates = PromptTemplates()
+        self.sections = SectionGenerator(self.ollama, self.prompt_templates, config.get('sections', {}))
+        self.quality = QualityGate(self.prompt_templates, config.get('quality', {}))
+        self.quality.metrics = self.metrics
+        self.streaming = config.get('streaming', {})
+        self.pipeline_config = config.get('pipeline', {})
+        self.profiler = Profiler(config.get('profiling', {}))
+        if self.profiler.enabled:
+            # Rendu en threads : cProfile et l'échantillonneur de piles voient tout le CPU
+            self.pipeline_config = {**self.pipeline_config, 'render_executor': 'thread'}
+        # Le pré-rendu des sections en streaming n'est utile que si le rendu reste dans ce processus
+        self.prerender_sections = self.pipeline_config.get('render_executor', 'process') == 'thread'
+        self.manifest = BuildManifest(config.get('output_dir', 'output/generated_courses'))
+        journal_config = config.get('journal', {})
+        self.journal = JobJournal(config.get('output_dir', 'output/generated_courses'), journal_config) \
+            if journal_config.get('enabled', True) else None
+        self.linker = CrossLinker(config.get('output_dir', 'output/generated_courses'), config.get('links', {}))
+        self.planner = PriorityPlanner(config.get('output_dir', 'output/generated_courses'), config.get('priority', {}))
+        # Pages liées pendant ce run (déjà à jour pour la passe incrémentale)
+        self.linked_pages: set = set()
+        self.pipeline_stats: Dict = {}
+        self.writer = OutputWriter(config.get('output_dir', 'output/generated_courses'), config.get('writer', {}))
         
         # Configuration des logs
         self.setup_logging()
@@ -45,95 +83,554 @@ class CourseGenerator:
         )
         self.logger = logging.getLogger(__name__)
     
-    async def generate_course(self, category: str, item: Dict) -> Optional[str]:
-        """Génère un cours pour un élément donné"""
+    async def fetch_course(self, category: str, item: Dict) -> Optional[Dict]:
+        """Étape LLM : génère le contenu d'un élément (async, sans rendu ni écriture)"""
+        key = self.item_key(category, item)
+        current_category.set(category)
         try:
+            # Reprise : la réponse brute déjà journalisée évite un nouvel appel au modèle
+            saved = self.journal.get_content(key) if self.journal else None
+            if saved is not None:
+                self.logger.info(f"Reprise de {category}/{item['name']} depuis le journal")
+                return self.make_job(category, item, saved[0], saved[1])
+            
+            # Budget de temps : un élément qui ne finirait pas à temps reste en attente dans le journal
+            if not self.planner.should_start(category):
+                self.logger.info(f"{category}/{item['name']} reporté: temps restant insuffisant")
+                return None
+            
             self.logger.info(f"Génération de {category}/{item['name']}")
+            if self.journal:
+                self.journal.requesting(key)
             
             # Génération du prompt basé sur la catégorie
-            prompt = self.prompt_templates.get_prompt(category, item)
+            start = time.perf_counter()
+            with self.profiler.span('prompt'):
+                prefix, prompt = self.item_prompt(category, item)
+            self.metrics.observe('cours_prompt_build_seconds', time.perf_counter() - start)
             
             # Génération du contenu avec Ollama
-            content = await self.ollama.generate_content(prompt)
+            # Sections pré-rendues en streaming : propres à ce job (rendu en threads seulement)
+            prerendered: Optional[Dict[str, str]] = {} if self.prerender_sections else None
+            generation_start = time.perf_counter()
+            with self.profiler.span('llm'):
+                if self.sections.enabled:
+                    content = await self.sections.generate(category, item)
+                elif self.streaming.get('enabled'):
+                    content = await self.generate_streaming(category, item, prompt, prefix, prerendered)
+                else:
+                    content = await self.ollama.generate_content(prompt, prefix=prefix,
+                                                                 subject=(category, item['name']))
             if not content:
                 self.logger.error(f"Échec génération contenu pour {item['name']}")
+                if self.journal:
+                    self.journal.failed(key, 'contenu vide')
+                self.record_failure(category, 'fetch')
                 return None
             
-            # Génération HTML
-            html_content = self.html_generator.generate_html(
-                category, item, content
-            )
-            
-            # Sauvegarde
-            output_path = self.get_output_path(category, item['name'])
-            await self.save_course(output_path, html_content)
+            if self.quality.enabled:
+                with self.profiler.span('quality'):
+                    content = await self.check_quality(category, item, prompt, prefix, content)
+                if not content:
+                    if self.journal:
+                        self.journal.failed(key, 'refusé par le contrôle qualité')
+                    self.record_failure(category, 'quality')
+                    return None
+            self.planner.latency.observe(category, time.perf_counter() - generation_start)
             
-            self.logger.info(f"Cours généré: {output_path}")
-            return output_path
+            full_prompt = OllamaClient.join_prefix(prefix, prompt)
+            if self.journal:
+                with self.profiler.span('journal'):
+                    self.journal.generated(key, full_prompt, content)
+            return self.make_job(category, item, full_prompt, content, prerendered)
             
         except Exception as e:
             self.logger.error(f"Erreur génération {item['name']}: {str(e)}")
+            if self.journal:
+                self.journal.failed(key, str(e))
+            self.record_failure(category, 'fetch')
+            return None
+    
+    async def check_quality(self, category: str, item: Dict, prompt: str, prefix: Optional[str],
+                            content: Union[str, Dict[str, str]]) -> Optional[Union[str, Dict[str, str]]]:
+        """Contrôle qualité avant le rendu : relance les générations refusées
+        
+        En mode sections, seules les sections refusées sont redemandées ; sinon la page
+        entière, avec une autre graine et une température un peu plus haute. Retourne
+        la génération acceptée, ou la meilleure tentative (None si on_reject vaut fail).
+        """
+        report = self.quality.check(category, content)
+        best, best_report = content, report
+        attempt = 0
+        while True:
+            self.quality.record(category, report, 0 if report.accepted else self.wasted_tokens(content, report))
+            if report.accepted or attempt >= self.quality.retries:
+                break
+            attempt += 1
+            self.quality.record_retry(category)
+            self.logger.info(f"{item['name']}: génération refusée ({', '.join(report.reasons)}), relance {attempt}")
+            options = self.quality.retry_options(attempt, self.ollama.temperature)
+            if self.sections.enabled:
+                keys = report.failed_sections or list(content)
+                content = await self.sections.regenerate(category, item, best, keys, options)
+            else:
+                content = await self.ollama.generate_content(prompt, prefix=prefix, options=options)
+            if not content:
+                break
+            report = self.quality.check(category, content)
+            if len(report.reasons) <= len(best_report.reasons):
+                best, best_report = content, report
+        
+        self.quality.record_final(category, best_report)
+        if best_report.accepted:
+            # Relance acceptée : elle remplace la réponse refusée du cache (mode page entière)
+            if attempt and not self.sections.enabled and isinstance(best, str):
+                self.ollama.store(prompt, best, prefix=prefix)
+            return best
+        self.logger.warning(f"{item['name']}: contrôle qualité non satisfait après {attempt} relances "
+                            f"({', '.join(best_report.reasons)})")
+        return None if self.quality.on_reject == 'fail' else best
+    
+    def wasted_tokens(self, content: Union[str, Dict[str, str]], report: QualityReport) -> int:
+        """Tokens perdus par une génération refusée (sections refusées seulement en mode sections)"""
+        if isinstance(content, str):
+            return self.ollama.tokenizer.count(content)
+        if self.sections.enabled and report.failed_sections:
+            content = {key: text for key, text in content.items() if key in report.failed_sections}
+        return self.ollama.tokenizer.count('\n\n'.join(content.values()))
+    
+    def make_job(self, category: str, item: Dict, prompt: str, content: str,
+                 prerendered: Optional[Dict[str, str]] = None) -> Dict:
+        """Charge utile transmise au rendu (clé et chemin de page pour les liens croisés)"""
+        job = {
+            'category': category,
+            'item': item,
+            'key': self.item_key(category, item),
+            'page_path': self.get_page_path(category, item),
+            'prompt': prompt,
+            'content': content
+        }
+        if prerendered:
+            job['prerendered'] = prerendered
+        return job
+    
+    def render_course(self, job: Dict) -> Dict:
+        """Étape de rendu HTML en thread (le mode processus utilise pipeline.render_worker)"""
+        with self.profiler.cpu_span('render'):
+            return render_worker.render_job(self.html_generator, job, self.linker.targets)
+    
+    def record_failure(self, category: str, stage: str):
+        """Compte un élément abandonné à une étape du pipeline"""
+        self.metrics.inc('cours_failures', category=category, stage=stage)
+        self.metrics.inc('cours_items', category=category, outcome='failed')
+    
+    async def write_course(self, job: Dict) -> Optional[Path]:
+        """Étape d'écriture : sauvegarde la page et met à jour le manifeste"""
+        category, item = job['category'], job['item']
+        key = self.item_key(category, item)
+        output_path = self.get_output_path(category, item)
+        if self.journal:
+            self.journal.rendered(key)
+        if 'render_time' in job:
+            self.metrics.observe('cours_render_seconds', job['render_time'], category=category)
+        start = time.perf_counter()
+        with self.profiler.span('write'):
+            await self.save_course(output_path, job['html'])
+        self.metrics.observe('cours_write_seconds', time.perf_counter() - start, category=category)
+        self.metrics.inc('cours_items', category=category, outcome='written')
+        fingerprint = self.get_fingerprint(job['prompt'])
+        self.manifest.record(key, fingerprint, output_path)
+        if 'links' in job:
+            self.linker.record(key, job['page_path'], job['links'], job['words'])
+            self.linked_pages.add(key)
+        # Écriture atomique puis 'written' : une reprise ne réécrit jamais un élément terminé
+        if self.journal:
+            self.journal.written(key, fingerprint)
+        
+        self.logger.info(f"Cours généré: {output_path}")
+        return output_path
+    
+    async def generate_streaming(self, category: str, item: Dict, prompt: str,
+                                 prefix: Optional[str] = None,
+                                 prerendered: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """Génère en streaming et formate chaque section dès qu'elle est complète
+        
+        prerendered : reçoit les sections formatées (texte -> HTML) ; il suit le job
+        jusqu'au rendu et disparaît avec lui si le contenu est refusé ou remplacé.
+        """
+        max_chars = self.streaming.get('max_chars', 12000)
+        first_section_timeout = self.streaming.get('first_section_timeout', 60)
+        
+        section_parser = StreamingSectionParser()
+        start = time.monotonic()
+        first_section_at = None
+        received = 0
+        aborted = False
+        
+        stream = self.ollama.stream_content(prompt, prefix=prefix, subject=(category, item['name']))
+        try:
+            async for chunk in stream:
+                received += len(chunk)
+                
+                for title, body in section_parser.feed(chunk):
+                    if first_section_at is None:
+                        first_section_at = time.monotonic() - start
+                        self.logger.info(f"Première section de {item['name']} en {first_section_at:.2f}s")
+                    if prerendered is not None:
+                        prerendered[body] = self.html_generator.render_section(title, body)
+                
+                # Coupure anticipée d'une génération qui dérape
+                if received > max_chars:
+                    self.logger.warning(f"Génération de {item['name']} interrompue: plus de {max_chars} caractères")
+                    aborted = True
+                    break
+                if first_section_at is None and time.monotonic() - start > first_section_timeout:
+                    self.logger.warning(f"Génération de {item['name']} interrompue: aucune section après {first_section_timeout}s")
+                    aborted = True
+                    break
+        finally:
+            await stream.aclose()
+        
+        if aborted:
             return None
+        
+        for title, body in section_parser.close():
+            if prerendered is not None:
+                prerendered[body] = self.html_generator.render_section(title, body)
+        
+        return section_parser.sections or None
+    
+    def build_prompt(self, category: str, item: Dict) -> Tuple[Optional[str], str]:
+        """(préfixe commun, prompt de l'élément), réduit par sections s'il dépasse le budget
+        
+        Le préfixe n'est utilisé qu'avec la réutilisation de contexte (prefix_reuse).
+        """
+        optimizer = self.ollama.prompt_optimizer
+        if self.ollama.prefix_reuse:
+            prefix, prompt = self.prompt_templates.get_prompt_parts(category, item)
+            return optimizer.fit_prompt(prefix), prompt
+        
+        prompt = self.prompt_templates.get_prompt(category, item)
+        # Compte mémorisé par template : le prompt complet n'est recompté que s'il déborde
+        if self.prompt_templates.count_tokens(category, item, optimizer.tokenizer) > optimizer.prompt_budget():
+            prompt = optimizer.fit_prompt(prompt)
+        return None, prompt
+    
+    def item_prompt(self, category: str, item: Dict) -> Tuple[Optional[str], str]:
+        """(préfixe, prompt) d'un élément tel qu'il est journalisé et inscrit au manifeste
+        
+        En mode sections, prompt équivalent à la page entière (les requêtes réelles groupent les sections).
+        """
+        if self.sections.enabled:
+            return None, self.sections.page_prompt(category, item)
+        return self.build_prompt(category, item)
+    
+    def get_fingerprint(self, prompt: str) -> Dict[str, str]:
+        """Empreinte des entrées d'une génération (prompt, modèle, options, templates)"""
+        template_version = HTMLGenerator.TEMPLATE_VERSION
+        if self.sections.enabled:
+            template_version = f"{template_version}+sections:{SECTIONS_VERSION}"
+        return BuildManifest.fingerprint(
+            prompt,
+            self.ollama.model,
+            self.ollama.generation_options(),
+            template_version
+        )
     
-    def get_output_path(self, category: str, name: str) -> Path:
+    def select_changed_items(self, items: List[tuple]) -> List[tuple]:
+        """Ne garde que les éléments dont l'empreinte a changé ou dont la sortie manque"""
+        mode = self.config.get('build_mode', 'incremental')
+        if mode == 'force':
+            return items
+        
+        selected = []
+        reasons: Dict[str, int] = {}
+        for category, item in items:
+            prompt = OllamaClient.join_prefix(*self.item_prompt(category, item))
+            change = self.manifest.get_change(
+                self.item_key(category, item),
+                self.get_fingerprint(prompt),
+                self.get_output_path(category, item)
+            )
+            if change is None:
+                continue
+            # --only-changed : ignorer les éléments jamais générés ou dont la sortie manque
+            if mode == 'only_changed' and change in ('new', 'missing'):
+                continue
+            reasons[change] = reasons.get(change, 0) + 1
+            selected.append((category, item))
+        
+        self.logger.info(
+            f"Build incrémental: {len(items) - len(selected)} éléments ignorés, "
+            f"{len(selected)} à générer {reasons}"
+        )
+        return selected
+    
+    @staticmethod
+    def item_key(category: str, item: Dict) -> str:
+        """Clé stable d'un élément (manifeste, journal) : catégorie et chemin complet"""
+        return BuildManifest.make_key(category, item.get('path') or item['filename'])
+    
+    @staticmethod
+    def get_page_path(category: str, item: Dict) -> str:
+        """Chemin de la page relatif au répertoire de sortie (sous-répertoires de l'inventaire conservés)"""
+        path = PurePosixPath(item.get('path') or item['filename'])
+        return str(category / path.parent / f"{path.stem.replace('_', ' ')}.html")
+    
+    def get_output_path(self, category: str, item: Dict) -> Path:
         """Détermine le chemin de sortie pour un cours"""
-        output_dir = Path(self.config.get('output_dir', 'output/generated_courses'))
-        return output_dir / category / f"{name}.html"
+        return Path(self.config.get('output_dir', 'output/generated_courses')) / self.get_page_path(category, item)
+    
+    def build_links(self):
+        """Automate des liens croisés sur tous les éléments de l'inventaire (pas seulement ceux du run)"""
+        if not self.linker.enabled or not self.inventory:
+            return
+        with self.profiler.span('links'):
+            self.linker.build(
+                (self.item_key(item.category, item._asdict()), item.name,
+                 self.get_page_path(item.category, item._asdict()))
+                for item in self.inventory
+            )
+    
+    async def update_links(self):
+        """Passe incrémentale : relie les pages existantes touchées par des noms ajoutés ou retirés"""
+        if not self.linker.targets:
+            return
+        with self.profiler.span('links'):
+            keys = self.linker.pages_to_update(self.linked_pages, self.config.get('relink', False))
+            for key in keys:
+                relinked = self.linker.relink_page(key)
+                if relinked:
+                    path, html = relinked
+                    await self.save_course(path, html)
+                    self.manifest.refresh_output(key, path)
+            self.linker.save()
+        if keys:
+            self.logger.info(
+                f"Liens croisés: {len(keys)} pages existantes relues, "
+                f"{self.linker.stats['pages_relinked']} mises à jour"
+            )
     
     async def save_course(self, path: Path, content: str):
-        """Sauvegarde un cours généré"""
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        """Sauvegarde un cours généré (écriture atomique hors de la boucle)"""
+        await self.writer.write(path, content)
     
     async def process_batch(self, items: List[tuple], batch_size: int = 5):
-        """Traite un lot d'éléments en parallèle"""
-        results = []
+        """Traite les éléments : LLM (file de travail) -> rendu (pool) -> écriture"""
+        # Avec le limiteur adaptatif, c'est lui qui borne les requêtes : le pipeline
+        # garde assez d'éléments en cours pour qu'il puisse monter jusqu'à sa limite max
+        limiter = self.ollama.limiter
+        pipeline = StagedPipeline({
+            **self.pipeline_config,
+            'concurrency': max(batch_size, limiter.max_limit) if limiter else batch_size,
+            'queue_size': self.config.get('queue_size'),
+            'rate_limit': self.config.get('rate_limit')
+        })
+        self.logger.info(
+            f"Traitement de {len(items)} éléments: {pipeline.concurrency} requêtes simultanées, "
+            f"{pipeline.render_workers} workers de rendu ({pipeline.render_executor})"
+        )
         
-        for i in range(0, len(items), batch_size):
-            batch = items[i:i + batch_size]
-            self.logger.info(f"Traitement batch {i//batch_size + 1}/{len(items)//batch_size + 1}")
-            
-            tasks = [
-                self.generate_course(category, item)
-                for category, item in batch
-            ]
-            
-            batch_results = await asyncio.gather(*tasks, return_exceptions=True)
-            results.extend(batch_results)
-            
-            # Pause entre les batches pour éviter la surcharge
-            await asyncio.sleep(1)
+        if pipeline.render_executor == 'process':
+            render = render_worker.render_page
+            executor = pipeline.create_executor(
+                render_worker.init_worker, (self.config.get('templates', {}), self.linker.targets)
+            )
+        else:
+            render = self.render_course
+            executor = pipeline.create_executor()
+        
+        try:
+            results = await pipeline.run(items, self.fetch_course, render, self.write_course, executor)
+        finally:
+            executor.shutdown(wait=True)
+        for index, stage, _ in pipeline.errors:
+            self.record_failure(items[index][0], stage)
+        
+        stats = self.pipeline_stats = pipeline.get_stats()
+        fetch_stats = stats['fetch']
+        self.logger.info(
+            f"Latence LLM par élément: moy {fetch_stats['latency_avg']}s, "
+            f"p50 {fetch_stats['latency_p50']}s, p95 {fetch_stats['latency_p95']}s, max {fetch_stats['latency_max']}s"
+        )
+        self.logger.info(f"Occupation des slots: {fetch_stats['slot_utilisation']}% sur {fetch_stats['wall_time']}s")
+        self.logger.info(f"Temps de rendu: {stats['render_time']}s, temps d'écriture: {stats['write_time']}s")
+        writer_stats = self.writer.get_stats()
+        self.logger.info(
+            f"Écriture: {writer_stats['files_written']} fichiers, {writer_stats['bytes_written']} octets "
+            f"en {writer_stats['batches']} lots, latence moy {writer_stats['write_latency_avg']}s"
+        )
+        for name, queue_stats in stats['queues'].items():
+            self.logger.info(
+                f"File {name}: profondeur moy {queue_stats['avg_depth']}, max {queue_stats['max_depth']}, "
+                f"attente moy {queue_stats['avg_wait']}s"
+            )
         
         return results
     
-    async def run(self, input_file: str, categories: Optional[List[str]] = None):
-        """Lance la génération complète"""
+    def resume_items(self) -> Optional[List[tuple]]:
+        """Éléments restants du run journalisé ; le manifeste est complété avec les éléments déjà écrits"""
+        pending = self.journal.resume() if self.journal else None
+        if pending is None:
+            self.logger.warning("Aucun journal à reprendre, run complet")
+            return None
+        
+        for category, item, fingerprint in self.journal.written_entries():
+            self.manifest.record(
+                self.item_key(category, item),
+                fingerprint,
+                self.get_output_path(category, item)
+            )
+        self.logger.info(f"Reprise: {len(pending)} éléments restants")
+        return pending
+    
+    def load_inventory(self, input_file: str):
+        """Charge l'inventaire (instantané réutilisé si le fichier n'a pas changé)"""
+        with self.profiler.span('parse'):
+            self.inventory = load_inventory(
+                input_file, self.parser, self.config.get('inventory', {}).get('snapshot')
+            )
+    
+    async def run(self, input_file: str, categories: Optional[List[str]] = None,
+                  resume: bool = False) -> Optional[Dict]:
+        """Lance la génération complète et retourne un rapport (éléments, succès, statistiques)
+        
+        resume : reprend le run interrompu d'après le journal au lieu de relire l'inventaire
+        """
+        self.profiler.start()
+        if resume:
+            items_to_process = self.resume_items()
+            if items_to_process is not None:
+                # L'inventaire ne sert ici qu'aux noms des liens croisés
+                if self.linker.enabled:
+                    self.load_inventory(input_file)
+                    self.build_links()
+                return await self.process_items(self.plan_items(items_to_process))
+        
         self.logger.info(f"Début génération à partir de {input_file}")
         
         # Parsing du fichier d'entrée
-        parsed_data = self.parser.parse_file(input_file)
-        if not parsed_data:
+        self.load_inventory(input_file)
+        if not len(self.inventory):
             self.logger.error("Échec du parsing")
+            self.profiler.stop()
             return
         
         # Préparation des éléments à traiter
-        items_to_process = []
-        for category, items in parsed_data.items():
-            if categories and category not in categories:
-                continue
-            for item in items:
-                items_to_process.append((category, item))
+        items_to_process = [
+            (category, item._asdict())
+            for category in self.inventory.categories
+            if not categories or category in categories
+            for item in self.inventory.select(category)
+        ]
         
         self.logger.info(f"Nombre total d'éléments: {len(items_to_process)}")
-        
-        # Traitement par batches
+        with self.profiler.span('select'):
+            items_to_process = self.select_changed_items(items_to_process)
+        items_to_process = self.plan_items(items_to_process)
+        if self.journal:
+            self.journal.start(items_to_process)
+        self.build_links()
+        return await self.process_items(items_to_process)
+    
+    def plan_items(self, items_to_process: List[tuple]) -> List[tuple]:
+        """Ordre par priorité (statut, poids de catégorie) et sélection dans le budget de temps"""
+        batch_size = self.config.get('batch_size', 5)
+        limiter = self.ollama.limiter
+        return self.planner.plan(items_to_process, max(batch_size, limiter.max_limit) if limiter else batch_size)
+    
+    async def process_items(self, items_to_process: List[tuple]) -> Dict:
+        """Traite les éléments sélectionnés et construit le rapport final"""
+        # Traitement par file de travail (session HTTP partagée pendant tout le run)
         batch_size = self.config.get('batch_size', 5)
-        results = await self.process_batch(items_to_process, batch_size)
+        await self.metrics.start()
+        try:
+            async with self.ollama:
+                results = await self.process_batch(items_to_process, batch_size)
+            await self.update_links()
+        finally:
+            self.profiler.stop()
+            await self.metrics.stop()
+            await self.writer.close()
+            self.manifest.save()
+            self.planner.latency.save()
+            if self.journal:
+                self.logger.info(f"Journal: {self.journal.get_stats()['states']}")
         
         # Rapport final
         successful = sum(1 for r in results if r and not isinstance(r, Exception))
         self.logger.info(f"Génération terminée: {successful}/{len(items_to_process)} succès")
+        priority_stats = self.planner.get_stats()
+        if priority_stats['deferred'] or priority_stats['deferred_at_run']:
+            self.logger.info(
+                f"Budget de temps: {priority_stats['deferred']} éléments reportés à la planification, "
+                f"{priority_stats['deferred_at_run']} en cours de run (repris par le prochain run incrémental)"
+            )
+        
+        ollama_stats = self.ollama.get_stats()
+        self.logger.info(
+            f"Connexions HTTP: {ollama_stats['connections_created']} ouvertes, "
+            f"{ollama_stats['connections_reused']} réutilisées, "
+            f"{ollama_stats['dns_lookups']} résolutions DNS, "
+            f"connexion moy. {ollama_stats['avg_connect_time'] * 1000:.1f} ms"
+        )
+        if ollama_stats['concurrency']:
+            limiter_stats = ollama_stats['concurrency']
+            self.logger.info(
+                f"Concurrence adaptative: limite finale {limiter_stats['limit']}, "
+                f"max en cours {limiter_stats['max_in_flight']}, {limiter_stats['increases']} hausses, "
+                f"{limiter_stats['decreases']} baisses ({limiter_stats['timeouts']} timeouts, "
+                f"{limiter_stats['overloads']} surcharges)"
+            )
+        if self.sections.enabled:
+            section_stats = self.sections.get_stats()
+            self.logger.info(
+                f"Sections: {section_stats['sections_cached']} en cache, {section_stats['sections_generated']} générées, "
+                f"{section_stats['sections_retried']} redemandées, {section_stats['sections_missing']} manquantes ; "
+                f"{section_stats['requests']} requêtes pour {section_stats['items']} éléments "
+                f"({section_stats['batched_items']} regroupés)"
+            )
+        if ollama_stats['similarity']:
+            similar_stats = ollama_stats['similarity']
+            self.logger.info(
+                f"Sujets proches: {similar_stats['reused']} réponses réutilisées "
+                f"({similar_stats['reuse_rate'] * 100:.0f}%, {similar_stats['reused_chars']} caractères), "
+                f"{similar_stats['seeded']} prompts appuyés sur un sujet proche, "
+                f"{similar_stats['subjects']} sujets indexés"
+            )
+        for category, quality_stats in self.quality.get_stats().items():
+            self.logger.info(
+                f"Qualité {category}: {quality_stats['acceptance_rate'] * 100:.0f}% acceptées "
+                f"({quality_stats['accepted']}/{quality_stats['checked']}), {quality_stats['retries']} relances, "
+                f"{quality_stats['pages_rejected']} pages refusées, {quality_stats['wasted_tokens']} tokens perdus"
+            )
+        if ollama_stats['prompt_eval_tokens']:
+            self.logger.info(
+                f"Évaluation des prompts: {ollama_stats['prompt_eval_tokens']} tokens en "
+                f"{ollama_stats['prompt_eval_time']:.1f}s, préfixes évalués {ollama_stats['prefix_evaluations']}, "
+                f"réutilisés {ollama_stats['prefix_reuses']}"
+            )
+        for backend in ollama_stats['backends']:
+            latency = f"{backend['latency_ewma']}s" if backend['latency_ewma'] is not None else 'n/a'
+            self.logger.info(
+                f"Nœud {backend['url']}: {backend['requests']} requêtes, {backend['errors']} erreurs, "
+                f"{backend['timeouts']} timeouts, latence {latency}"
+                f"{'' if backend['healthy'] else ' (écarté)'}"
+            )
+        
+        return {
+            'items': len(items_to_process),
+            'successful': successful,
+            'pipeline': self.pipeline_stats,
+            'writer': self.writer.get_stats(),
+            'journal': self.journal.get_stats() if self.journal else None,
+            'sections': self.sections.get_stats() if self.sections.enabled else None,
+            'quality': self.quality.get_stats(),
+            'priority': self.planner.get_stats(),
+            'links': self.linker.get_stats(),
+            'metrics': self.metrics.to_dict(),
+            'ollama': ollama_stats
+        }
 
 
 def load_config(config_file: str) -> Dict:
@@ -144,6 +641,17 @@ def load_config(config_file: str) -> Dict:
     return {}
 
 
+def checked_arg(parse):
+    """Type argparse : valeur gardée telle quelle, refusée avec un message clair si parse lève ValueError"""
+    def check(value: str) -> str:
+        try:
+            parse(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+        return value
+    return check
+
+
 def main():
     """Point d'entrée principal"""
     parser = argparse.ArgumentParser(description='Générateur automatique de cours')
@@ -151,10 +659,31 @@ def main():
     parser.add_argument('--template', '-t', help='Template HTML de base')
     parser.add_argument('--output', '-o', default='output/generated_courses', help='Répertoire de sortie')
     parser.add_argument('--model', '-m', default='gemma:7b', help='Modèle Ollama')
-    parser.add_argument('--batch-size', '-b', type=int, default=5, help='Taille des batches')
+    parser.add_argument('--batch-size', '-b', type=int, default=5, help='Nombre de requêtes simultanées')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Concurrence adaptative (--batch-size devient la limite initiale)')
+    parser.add_argument('--ollama-url', nargs='+', help='Serveurs Ollama (répartition de charge)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profil du run: temps par étape, cProfile et piles repliées (output/profile)')
+    parser.add_argument('--sections', action='store_true',
+                        help='Génération par sections (cache et relance par section, requêtes JSON groupées)')
+    parser.add_argument('--relink', action='store_true',
+                        help='Relie toutes les pages déjà générées (liens croisés), pas seulement celles touchées')
+    parser.add_argument('--budget', type=checked_arg(parse_duration),
+                        help="Budget de temps (ex. 2h, 90m) : éléments les plus utiles qui y tiennent")
+    parser.add_argument('--deadline', type=checked_arg(parse_deadline),
+                        help='Échéance (ex. 08:00 ou 2025-06-01T08:00), comme --budget')
+    parser.add_argument('--metrics-port', type=int, help='Expose les métriques Prometheus sur ce port (/metrics)')
+    parser.add_argument('--rate-limit', type=float, help='Nombre maximal de requêtes par seconde')
     parser.add_argument('--retry', '-r', type=int, default=3, help='Nombre de tentatives')
     parser.add_argument('--categories', '-c', nargs='+', help='Catégories à traiter')
     parser.add_argument('--config', default='config.json', help='Fichier de configuration')
+    build_mode = parser.add_mutually_exclusive_group()
+    build_mode.add_argument('--force', action='store_true', help='Régénère tous les éléments')
+    build_mode.add_argument('--only-changed', action='store_true',
+                            help='Ne régénère que les éléments déjà générés dont les entrées ont changé')
+    build_mode.add_argument('--resume', action='store_true',
+                            help="Reprend le run interrompu d'après le journal (sans rappeler le modèle)")
     
     args = parser.parse_args()
     
@@ -163,19 +692,52 @@ def main():
     config.update({
         'output_dir': args.output,
         'batch_size': args.batch_size,
+        'rate_limit': args.rate_limit or config.get('rate_limit'),
         'retry_count': args.retry,
+        'relink': args.relink,
+        'build_mode': 'force' if args.force else 'only_changed' if args.only_changed else 'incremental',
         'ollama': {
+            **config.get('ollama', {}),
             'model': args.model,
-            'base_url': config.get('ollama', {}).get('base_url', 'http://localhost:11434')
+            'base_url': config.get('ollama', {}).get('base_url', 'http://localhost:11434'),
+            'base_urls': args.ollama_url or config.get('ollama', {}).get('base_urls', []),
+            'adaptive_concurrency': {
+                **config.get('ollama', {}).get('adaptive_concurrency', {}),
+                **({'enabled': True, 'initial_limit': args.batch_size} if args.adaptive else {})
+            }
+        },
+        'sections': {
+            **config.get('sections', {}),
+            **({'enabled': True} if args.sections else {})
+        },
+        'priority': {
+            **config.get('priority', {}),
+            **({'budget': args.budget} if args.budget else {}),
+            **({'deadline': args.deadline} if args.deadline else {})
+        },
+        'profiling': {
+            **config.get('profiling', {}),
+            **({'enabled': True} if args.profile else {})
+        },
+        'metrics': {
+            **config.get('metrics', {}),
+            **({'port': args.metrics_port} if args.metrics_port else {})
         },
         'templates': {
             'base_template': args.template or 'templates/base_template.html'
         }
     })
     
+    # Valeurs de config.json (celles de la ligne de commande sont déjà vérifiées)
+    try:
+        parse_duration(config['priority'].get('budget'))
+        parse_deadline(config['priority'].get('deadline'))
+    except ValueError as e:
+        parser.error(f"{args.config}, section priority: {e}")
+    
     # Lancement
     generator = CourseGenerator(config)
-    asyncio.run(generator.run(args.input, args.categories))
+    asyncio.run(generator.run(args.input, args.categories, resume=args.resume))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""
+Inventaire indexé des cours
+Index par catégorie, statut, nom de fichier et chemin construits une seule
+fois ; instantané JSON réutilisé tant que francais_all.md n'a pas changé
+"""
+
+import hashlib
+import json
+import logging
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .md_parser import CourseItem, FrancaisParser
+except ImportError:  # exécution directe depuis parsers/
+    from md_parser import CourseItem, FrancaisParser
+
+
+INVENTORY_VERSION = 1
+
+
+class Inventory:
+    """Éléments de l'inventaire et leurs index (recherches et comptages en O(1))
+
+    Chaque index est construit en une passe à sa première utilisation : le
+    générateur ne paie que l'index par catégorie. Les listes retournées sont
+    les index eux-mêmes : à ne pas modifier.
+    """
+
+    def __init__(self, items: Iterable[CourseItem]):
+        self.items: List[CourseItem] = list(items)
+
+    @staticmethod
+    def _group(items: Iterable[CourseItem], key) -> Dict:
+        index: Dict = {}
+        for item in items:
+            value = key(item)
+            group = index.get(value)
+            if group is None:
+                group = index[value] = []
+            group.append(item)
+        return index
+
+    @cached_property
+    def _by_category(self) -> Dict[str, List[CourseItem]]:
+        return self._group(self.items, lambda item: item.category)
+
+    @cached_property
+    def _by_status(self) -> Dict[str, List[CourseItem]]:
+        return self._group(self.items, lambda item: item.status)
+
+    @cached_property
+    def _by_category_status(self) -> Dict[Tuple[str, str], List[CourseItem]]:
+        return self._group(self.items, lambda item: (item.category, item.status))
+
+    @cached_property
+    def _by_filename(self) -> Dict[str, List[CourseItem]]:
+        return self._group(self.items, lambda item: item.filename)
+
+    @cached_property
+    def _by_path(self) -> Dict[Tuple[str, str], CourseItem]:
+        return {(item.category, item.path or item.filename): item for item in self.items}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator[CourseItem]:
+        return iter(self.items)
+
+    @property
+    def categories(self) -> List[str]:
+        """Catégories présentes, dans l'ordre du fichier"""
+        return list(self._by_category)
+
+    def select(self, category: Optional[str] = None, status: Optional[str] = None) -> List[CourseItem]:
+        """Éléments d'une catégorie et/ou d'un statut"""
+        if category is not None and status is not None:
+            return self._by_category_status.get((category, status), [])
+        if category is not None:
+            return self._by_category.get(category, [])
+        if status is not None:
+            return self._by_status.get(status, [])
+        return self.items
+
+    def count(self, category: Optional[str] = None, status: Optional[str] = None) -> int:
+        return len(self.select(category, status))
+
+    def get(self, category: str, path: str) -> Optional[CourseItem]:
+        """Élément par chemin dans sa catégorie (ex. 1_La_poesie/cours1.md)"""
+        return self._by_path.get((category, path))
+
+    def find(self, filename: str) -> List[CourseItem]:
+        """Éléments portant ce nom de fichier, toutes catégories confondues"""
+        return self._by_filename.get(filename, [])
+
+    def statistics(self) -> Dict[str, int]:
+        """Mêmes clés que FrancaisParser.get_statistics"""
+        return {
+            'total_items': len(self.items),
+            'existing_items': self.count(status='exists'),
+            'to_create_items': self.count(status='to_create'),
+            'categories': len(self._by_category)
+        }
+
+    def as_dict(self) -> Dict[str, List[CourseItem]]:
+        """Format de FrancaisParser.parse_file (catégorie -> éléments)"""
+        return dict(self._by_category)
+
+    def to_snapshot(self) -> Dict:
+        """Forme compacte : une ligne par élément, colonnes de CourseItem"""
+        return {'fields': list(CourseItem._fields), 'rows': [list(item) for item in self.items]}
+
+    @classmethod
+    def from_snapshot(cls, data: Dict) -> 'Inventory':
+        if data.get('fields') != list(CourseItem._fields):
+            raise ValueError("Colonnes de l'instantané incompatibles")
+        return cls(map(CourseItem._make, data['rows']))
+
+
+def load_inventory(file_path: str, parser: Optional[FrancaisParser] = None,
+                   snapshot_path: Optional[str] = None) -> Inventory:
+    """Charge l'inventaire, depuis l'instantané si francais_all.md n'a pas changé
+
+    Même fichier source, date de modification et taille identiques : instantané
+    réutilisé sans relire le fichier. Sinon le fichier est haché ; même contenu (simple touch, copie) :
+    instantané réutilisé et date mise à jour ; contenu différent : nouveau parsing.
+    """
+    parser = parser or FrancaisParser()
+    logger = logging.getLogger(__name__)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
+
+    source = str(Path(file_path).resolve())
+    snapshot = _read_snapshot(snapshot_path, parser) if snapshot_path else None
+    # Un autre fichier peut avoir la même date et la même taille : la source doit correspondre
+    if snapshot and (snapshot.get('source'), snapshot['mtime_ns'], snapshot['size']) == \
+            (source, stat.st_mtime_ns, stat.st_size):
+        logger.debug(f"Inventaire repris de l'instantané {snapshot_path}")
+        return Inventory.from_snapshot(snapshot)
+
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if snapshot and snapshot['sha256'] == digest:
+        inventory = Inventory.from_snapshot(snapshot)
+        logger.debug("Inventaire inchangé (même hash), instantané réutilisé")
+    else:
+        inventory = Inventory(parser.iter_items(raw.decode('utf-8').splitlines()))
+        logger.info(f"Inventaire analysé: {len(inventory)} éléments")
+
+    if snapshot_path:
+        _write_snapshot(snapshot_path, parser, inventory, source, stat, digest)
+    return inventory
+
+
+def _read_snapshot(snapshot_path: str, parser: FrancaisParser) -> Optional[Dict]:
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.getLogger(__name__).warning(f"Instantané d'inventaire illisible: {str(e)}")
+        return None
+    # Un autre format ou d'autres catégories suivies imposent un nouveau parsing
+    if data.get('version') != INVENTORY_VERSION or data.get('categories') != sorted(parser.categories):
+        return None
+    return data
+
+
+def _write_snapshot(snapshot_path: str, parser: FrancaisParser, inventory: Inventory,
+                    source: str, stat: os.stat_result, digest: str):
+    """Écriture atomique de l'instantané"""
+    path = Path(snapshot_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': INVENTORY_VERSION,
+            'categories': sorted(parser.categories),
+            'source': source,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            **inventory.to_snapshot()
+        }, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
@@ -4,7 +4,20 @@ Parser pour extraire les données du fichier francais_all.md
 
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, NamedTuple
+from typing import Dict, Iterable, Iterator, List, Optional, NamedTuple
+
+
+# Expressions compilées une fois : une seule passe ligne à ligne sur l'inventaire
+SECTION_RE = re.compile(r'^/([^/\s]+)/\s*$')
+# Préfixe d'arbre : un niveau = "│   " ou 4 espaces, puis "├── " ou "└── "
+TREE_ENTRY_RE = re.compile(r'^((?:│\s{3}|\s{4})*)[├└]──\s*(\S.*?)\s*$')
+# Ligne sans dessin d'arbre (ancien format) : fichier .md indenté à la racine de la catégorie
+PLAIN_ENTRY_RE = re.compile(r'^\s+([\w.-]+\.md\b.*?)\s*$')
+FILE_RE = re.compile(r'^([^\s/]+\.md)\b')
+DIRECTORY_RE = re.compile(r'^([^\s/]+)/$')
+URL_RE = re.compile(r'https?://\S+')
+DIRECTORY_NUMBER_RE = re.compile(r'^\d+_')
+TO_CREATE = '(à créer)'
 
 
 class CourseItem(NamedTuple):
@@ -14,6 +27,7 @@ class CourseItem(NamedTuple):
     status: str  # 'exists', 'to_create', 'unknown'
     url: Optional[str] = None
     category: Optional[str] = None
+    path: Optional[str] = None  # chemin dans la catégorie, ex. 1_La_poesie/cours1.md
 
 
 class FrancaisParser:
@@ -36,9 +50,7 @@ class FrancaisParser:
         """Parse le fichier francais_all.md et extrait tous les éléments"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            return self._parse_content(content)
+                return self._group(self.iter_items(f))
         
         except FileNotFoundError:
             raise FileNotFoundError(f"Fichier non trouvé: {file_path}")
@@ -47,134 +59,86 @@ class FrancaisParser:
     
     def _parse_content(self, content: str) -> Dict[str, List[CourseItem]]:
         """Parse le contenu du fichier markdown"""
-        result = {}
-        
-        # Diviser le contenu par sections
-        sections = self._split_by_sections(content)
-        
-        for section_name, section_content in sections.items():
-            if section_name in self.categories:
-                items = self._parse_section(section_name, section_content)
-                result[section_name] = items
-        
-        return result
+        return self._group(self.iter_items(content.splitlines()))
     
-    def _split_by_sections(self, content: str) -> Dict[str, str]:
-        """Divise le contenu en sections basées sur les répertoires"""
-        sections = {}
-        current_section = None
-        current_content = []
-        
-        for line in content.split('\n'):
-            # Détection d'une nouvelle section
-            if line.startswith('/') and line.endswith('/'):
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                
-                current_section = line.strip('/')
-                current_content = []
-            else:
-                current_content.append(line)
-        
-        # Ajouter la dernière section
-        if current_section:
-            sections[current_section] = '\n'.join(current_content)
-        
-        return sections
+    def _group(self, items: Iterable[CourseItem]) -> Dict[str, List[CourseItem]]:
+        """Regroupe les éléments par catégorie connue, dans l'ordre du fichier"""
+        result: Dict[str, List[CourseItem]] = {}
+        for item in items:
+            result.setdefault(item.category, []).append(item)
+        return result
     
-    def _parse_section(self, section_name: str, content: str) -> List[CourseItem]:
-        """Parse une section spécifique"""
-        items = []
-        
-        for line in content.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('│') or line.startswith('├──') or line.startswith('└──'):
+    def iter_items(self, lines: Iterable[str]) -> Iterator[CourseItem]:
+        """Parcourt l'arbre en une passe et produit les éléments au fil de l'eau
+        
+        La pile contient les sous-répertoires ouverts ; la profondeur d'une entrée
+        (largeur du préfixe d'arbre) indique combien de niveaux restent ouverts.
+        """
+        category: Optional[str] = None
+        stack: List[str] = []
+        
+        for line in lines:
+            line = line.rstrip('\n')
+            if line.startswith('/'):
+                match = SECTION_RE.match(line)
+                if match:
+                    category = match.group(1) if match.group(1) in self.categories else None
+                    stack = []
+                continue
+            if category is None:
                 continue
             
-            # Parsing des différents types de lignes
-            if line.startswith('├──') or line.startswith('└──'):
-                item = self._parse_item_line(line, section_name)
-                if item:
-                    items.append(item)
-            elif '.md' in line:
-                item = self._parse_md_line(line, section_name)
-                if item:
-                    items.append(item)
-            elif '/' in line and not line.startswith('#'):
-                # Sous-répertoires (comme pour Seconde, Premiere, Terminale)
-                sub_items = self._parse_subdirectory(line, section_name)
-                items.extend(sub_items)
-        
-        return items
-    
-    def _parse_item_line(self, line: str, category: str) -> Optional[CourseItem]:
-        """Parse une ligne avec ├── ou └──"""
-        # Nettoyer la ligne
-        clean_line = re.sub(r'^[├└]──\s*', '', line)
-        
-        # Extraire le nom du fichier
-        if '.md' in clean_line:
-            parts = clean_line.split()
-            filename = parts[0]
-            name = filename.replace('.md', '').replace('_', ' ')
-            
-            # Détecter le statut et l'URL
-            status = 'exists'
-            url = None
-            
-            if '(à créer)' in clean_line:
-                status = 'to_create'
-                # Chercher une URL
-                url_match = re.search(r'https?://[^\s]+', clean_line)
-                if url_match:
-                    url = url_match.group(0)
-            
-            return CourseItem(
-                name=name,
-                filename=filename,
-                status=status,
-                url=url,
-                category=category
-            )
-        
-        return None
-    
-    def _parse_md_line(self, line: str, category: str) -> Optional[CourseItem]:
-        """Parse une ligne contenant .md"""
-        # Extraire le nom du fichier
-        md_match = re.search(r'(\w+\.md)', line)
-        if md_match:
-            filename = md_match.group(1)
-            name = filename.replace('.md', '').replace('_', ' ')
-            
-            # Détecter le statut
-            status = 'exists'
-            url = None
+            match = TREE_ENTRY_RE.match(line)
+            if match:
+                depth = len(match.group(1)) // 4
+                entry = match.group(2)
+            else:
+                match = PLAIN_ENTRY_RE.match(line)
+                if not match:
+                    continue
+                depth = 0
+                entry = match.group(1)
+            del stack[depth:]
             
-            if '(à créer)' in line:
-                status = 'to_create'
-                url_match = re.search(r'https?://[^\s]+', line)
-                if url_match:
-                    url = url_match.group(0)
+            directory = DIRECTORY_RE.match(entry)
+            if directory:
+                stack.append(directory.group(1))
+                continue
             
-            return CourseItem(
-                name=name,
-                filename=filename,
-                status=status,
-                url=url,
-                category=category
-            )
-        
-        return None
+            item = self._parse_entry(entry, category, stack)
+            if item:
+                yield item
     
-    def _parse_subdirectory(self, line: str, category: str) -> List[CourseItem]:
-        """Parse les sous-répertoires (pour Seconde, Premiere, Terminale)"""
-        items = []
-        
-        # Pour l'instant, on retourne une liste vide
-        # Cette fonction peut être étendue pour parser les sous-structures
-        
-        return items
+    def _parse_entry(self, entry: str, category: str, directories: List[str]) -> Optional[CourseItem]:
+        """Élément d'une entrée de fichier : nom, statut, URL et chemin complet"""
+        match = FILE_RE.match(entry)
+        if not match:
+            return None
+        
+        filename = match.group(1)
+        name = filename[:-3].replace('_', ' ')
+        if directories:
+            # "cours1" seul n'a pas de sens : on le qualifie par son répertoire
+            parent = DIRECTORY_NUMBER_RE.sub('', directories[-1]).replace('_', ' ')
+            name = f"{parent} {name}"
+        
+        status = 'exists'
+        url = None
+        rest = entry[match.end():]
+        if TO_CREATE in rest:
+            status = 'to_create'
+            url_match = URL_RE.search(rest)
+            if url_match:
+                url = url_match.group(0)
+        
+        return CourseItem(
+            name=name,
+            filename=filename,
+            status=status,
+            url=url,
+            category=category,
+            path='/'.join(directories + [filename])
+        )
     
     def get_statistics(self, parsed_data: Dict[str, List[CourseItem]]) -> Dict[str, int]:
         """Retourne des statistiques sur les données parsées"""
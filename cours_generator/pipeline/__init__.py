@@ -0,0 +1 @@
+# Pipeline module
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Journal des tâches pour les runs reprenables
+Base SQLite écrite à côté du répertoire de sortie : état de chaque élément
+(queued, requesting, generated, rendered, written, failed) et réponse brute
+du modèle, enregistrée avant le rendu pour qu'une reprise ne la redemande pas
+"""
+
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .manifest import BuildManifest
+
+
+STATES = ('queued', 'requesting', 'generated', 'rendered', 'written', 'failed')
+
+
+class JobJournal:
+    """Journal durable d'un run : un enregistrement par élément, mis à jour à chaque étape"""
+
+    def __init__(self, output_dir: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        output_path = Path(output_dir)
+        self.path = config.get('path') or str(output_path.with_name(f"{output_path.name}.journal.db"))
+        self.logger = logging.getLogger(__name__)
+        self.run_id: Optional[str] = None
+
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # FULL : chaque transition survit aussi à une coupure de courant
+        self._conn.execute(f"PRAGMA synchronous={config.get('synchronous', 'NORMAL')}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                item TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                prompt TEXT,
+                content TEXT,
+                fingerprint TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # Statistiques
+        self.stats = {state: 0 for state in STATES}
+        self.stats['resumed'] = 0
+
+    def start(self, items: List[Tuple[str, Dict]]):
+        """Nouveau run : remplace le journal précédent, tous les éléments en 'queued'"""
+        self.run_id = uuid.uuid4().hex
+        now = time.time()
+        with self._conn:
+            self._conn.execute('DELETE FROM jobs')
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO jobs (key, run_id, position, category, item, state, updated_at) '
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                [(BuildManifest.make_key(category, item.get('path') or item['filename']), self.run_id, position, category,
+                  json.dumps(item, ensure_ascii=False), now)
+                 for position, (category, item) in enumerate(items)]
+            )
+        self.stats['queued'] = len(items)
+
+    def resume(self) -> Optional[List[Tuple[str, Dict]]]:
+        """Éléments du run journalisé qui restent à terminer, None si aucun journal"""
+        row = self._conn.execute('SELECT run_id, COUNT(*) FROM jobs').fetchone()
+        if not row[1]:
+            return None
+        self.run_id = row[0]
+
+        pending = []
+        counts: Dict[str, int] = {}
+        for category, item, state in self._conn.execute(
+            'SELECT category, item, state FROM jobs ORDER BY position'
+        ):
+            counts[state] = counts.get(state, 0) + 1
+            if state != 'written':
+                pending.append((category, json.loads(item)))
+
+        self.logger.info(f"Reprise du run {self.run_id[:8]}: {counts}")
+        return pending
+
+    def written_entries(self) -> List[Tuple[str, Dict, Dict[str, str]]]:
+        """(catégorie, élément, empreinte) des éléments écrits, pour reconstruire le manifeste
+        après un arrêt brutal (il n'est sauvegardé qu'en fin de run)"""
+        return [
+            (category, json.loads(item), json.loads(fingerprint))
+            for category, item, fingerprint in self._conn.execute(
+                "SELECT category, item, fingerprint FROM jobs WHERE state = 'written' AND fingerprint IS NOT NULL"
+            )
+        ]
+
+    def get_content(self, key: str) -> Optional[Tuple[str, Any]]:
+        """(prompt, réponse brute) déjà générés pour cet élément, ou None"""
+        row = self._conn.execute(
+            "SELECT prompt, content FROM jobs WHERE key = ? AND content IS NOT NULL AND state != 'written'",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.stats['resumed'] += 1
+        return row[0], json.loads(row[1])
+
+    def requesting(self, key: str):
+        self._set(key, 'requesting', 'attempts = attempts + 1')
+
+    def generated(self, key: str, prompt: str, content: Any):
+        """Enregistre la réponse brute (texte ou sections) avant le rendu"""
+        self._set(key, 'generated', 'prompt = ?, content = ?, error = NULL',
+                  (prompt, json.dumps(content, ensure_ascii=False)))
+
+    def rendered(self, key: str):
+        self._set(key, 'rendered')
+
+    def written(self, key: str, fingerprint: Dict[str, str]):
+        """Élément terminé : la réponse brute n'est plus nécessaire"""
+        self._set(key, 'written', 'content = NULL, fingerprint = ?', (json.dumps(fingerprint),))
+
+    def failed(self, key: str, error: str):
+        self._set(key, 'failed', 'error = ?', (error,))
+
+    def _set(self, key: str, state: str, extra: str = '', params: Tuple = ()):
+        assignments = f"state = ?, updated_at = ?{', ' + extra if extra else ''}"
+        with self._conn:
+            self._conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE key = ?',
+                (state, time.time(), *params, key)
+            )
+        self.stats[state] += 1
+        self.logger.debug(f"Journal {key}: {state}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Transitions de ce processus et états actuels du journal"""
+        states = dict(self._conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+        return {'run_id': self.run_id, 'transitions': dict(self.stats), 'states': states}
+
+    def close(self):
+        self._conn.close()
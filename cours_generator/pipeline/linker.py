@@ -0,0 +1,335 @@
+"""
+Liens croisés entre les cours
+Un automate Aho–Corasick sur les noms (et alias) de l'inventaire parcourt une
+seule fois le texte de chaque page et insère des liens vers les autres pages ;
+un index persistant (mots des pages, liens sortants) limite la mise à jour des
+pages existantes à celles qui mentionnent un nom ajouté ou un cours retiré
+"""
+
+import json
+import logging
+import os
+import posixpath
+import re
+import unicodedata
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+
+INDEX_VERSION = 1
+LINK_CLASS = 'lien-cours'
+
+TAG_RE = re.compile(r'(<[^>]*>)')
+TAG_NAME_RE = re.compile(r'<\s*(/?)\s*([a-zA-Z0-9]+)')
+WORD_RE = re.compile(r'\w{3,}')
+OUR_LINK_RE = re.compile(rf'<a class="{LINK_CLASS}" href="[^"]*">(.*?)</a>', re.DOTALL)
+
+# Pas de lien dans ces éléments (titres, navigation, liens existants)
+SKIPPED_TAGS = frozenset({'a', 'h1', 'h2', 'h3', 'h4', 'summary', 'nav', 'title', 'script', 'style', 'head'})
+
+_fold_cache: Dict[str, str] = {}
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents, un caractère pour un caractère (positions conservées)"""
+    out = []
+    for char in text:
+        folded = _fold_cache.get(char)
+        if folded is None:
+            base = unicodedata.normalize('NFD', char)[0].lower()
+            folded = _fold_cache[char] = base if len(base) == 1 else char
+        out.append(folded)
+    return ''.join(out)
+
+
+class AhoCorasick:
+    """Automate multi-motifs : toutes les occurrences en un seul parcours du texte"""
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Motifs reconnus en chaque état : (longueur, valeur), suffixes compris
+        self.output: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append((len(pattern), value))
+
+        # Liens d'échec en largeur (les fils de la racine échouent vers la racine)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                if state:
+                    self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[int, int, Any]]:
+        """Occurrences (début, fin, valeur) entre limites de mots, sans chevauchement,
+        la plus longue l'emportant à position de départ égale"""
+        goto, fail, output = self.goto, self.fail, self.output
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = index + 1
+                if end < len(text) and text[end].isalnum():
+                    continue
+                for length, value in output[state]:
+                    start = end - length
+                    if start == 0 or not text[start - 1].isalnum():
+                        matches.append((start, end, value))
+
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        selected = []
+        last_end = 0
+        for start, end, value in matches:
+            if start >= last_end:
+                selected.append((start, end, value))
+                last_end = end
+        return selected
+
+
+class LinkTargets:
+    """Automate des noms de l'inventaire et chemins des pages (transmis aux workers de rendu)"""
+
+    def __init__(self, targets: Dict[str, Tuple[str, List[str]]], min_length: int = 4):
+        # clé de l'élément -> (chemin de la page relatif au site, noms et alias)
+        self.paths = {key: path for key, (path, _) in targets.items()}
+        self.patterns: Dict[str, str] = {}
+        for key, (_, names) in targets.items():
+            for name in names:
+                pattern = ' '.join(fold(name).replace('_', ' ').replace('-', ' ').split())
+                # Premier élément de l'inventaire prioritaire en cas d'homonymie
+                if len(pattern) >= min_length and pattern not in self.patterns:
+                    self.patterns[pattern] = key
+        self.automaton = AhoCorasick(self.patterns)
+
+    def link_html(self, html: str, page_key: str, page_path: str) -> Tuple[str, Set[str], Set[str]]:
+        """Insère un lien par page cible (première occurrence) dans les nœuds texte
+
+        Retourne (html, clés liées, mots de la page) ; les mots alimentent l'index
+        incrémental.
+        """
+        html = OUR_LINK_RE.sub(r'\1', html)
+        page_dir = posixpath.dirname(page_path)
+        linked: Set[str] = set()
+        words: Set[str] = set()
+        skipped: List[str] = []
+        parts = TAG_RE.split(html)
+
+        for index, part in enumerate(parts):
+            if index % 2:
+                match = TAG_NAME_RE.match(part)
+                if match and match.group(2).lower() in SKIPPED_TAGS and not part.endswith('/>'):
+                    name = match.group(2).lower()
+                    if not match.group(1):
+                        skipped.append(name)
+                    elif name in skipped:
+                        del skipped[len(skipped) - 1 - skipped[::-1].index(name)]
+                continue
+            if not part.strip():
+                continue
+
+            folded = fold(part)
+            words.update(WORD_RE.findall(folded))
+            if skipped:
+                continue
+
+            pieces = []
+            position = 0
+            for start, end, key in self.automaton.find(folded):
+                if key == page_key or key in linked:
+                    continue
+                href = quote(posixpath.relpath(self.paths[key], page_dir or '.'))
+                pieces.append(part[position:start])
+                pieces.append(f'<a class="{LINK_CLASS}" href="{href}">{part[start:end]}</a>')
+                position = end
+                linked.add(key)
+            if pieces:
+                pieces.append(part[position:])
+                parts[index] = ''.join(pieces)
+
+        return ''.join(parts), linked, words
+
+
+class LinkIndex:
+    """État persistant des liens du site (<output_dir>.links.json)
+
+    Pour chaque page : chemin, liens sortants et mots du texte (index inversé
+    mot -> pages en mémoire) ; motifs de l'automate au dernier passage. Un nom ajouté ne fait relire que
+    les pages contenant tous ses mots, un cours retiré que les pages qui y menaient.
+    """
+
+    def __init__(self, output_dir: str):
+        output_path = Path(output_dir)
+        self.path = output_path.with_name(f"{output_path.name}.links.json")
+        self.logger = logging.getLogger(__name__)
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.words: Dict[str, Set[str]] = {}
+        self.patterns: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Index des liens illisible, reconstruit au fil des pages: {str(e)}")
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self.pages = data.get('pages', {})
+        self.patterns = data.get('patterns', {})
+        # Index inversé reconstruit depuis les mots de chaque page (non stocké deux fois)
+        for key, page in self.pages.items():
+            for word in page['words']:
+                self.words.setdefault(word, set()).add(key)
+
+    def save(self):
+        """Écriture atomique"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'patterns': self.patterns,
+                'pages': self.pages
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def record(self, key: str, path: str, links: Iterable[str], words: Iterable[str]):
+        """Enregistre une page (re)liée ; les mots absents de sa nouvelle version sont retirés"""
+        previous = self.pages.get(key)
+        new_words = set(words)
+        if previous:
+            for word in set(previous['words']) - new_words:
+                pages = self.words.get(word)
+                if pages:
+                    pages.discard(key)
+        for word in new_words:
+            self.words.setdefault(word, set()).add(key)
+        self.pages[key] = {'path': path, 'links': sorted(links), 'words': sorted(new_words)}
+
+    def forget(self, key: str):
+        """Retire une page disparue du répertoire de sortie"""
+        page = self.pages.pop(key, None)
+        if page:
+            for word in page['words']:
+                self.words.get(word, set()).discard(key)
+
+    def affected_pages(self, targets: LinkTargets) -> Set[str]:
+        """Pages à relier après un changement de l'automate"""
+        affected: Set[str] = set()
+        for pattern, key in targets.patterns.items():
+            if self.patterns.get(pattern) == key:
+                continue
+            # Candidates : pages contenant tous les mots du nouveau motif
+            pattern_words = WORD_RE.findall(pattern)
+            if not pattern_words:
+                affected.update(self.pages)
+                continue
+            candidates = set(self.words.get(pattern_words[0], ()))
+            for word in pattern_words[1:]:
+                candidates &= self.words.get(word, set())
+            affected |= candidates
+
+        removed = set(self.patterns.values()) - set(targets.patterns.values())
+        if removed:
+            affected.update(key for key, page in self.pages.items() if removed & set(page['links']))
+        return affected & set(self.pages)
+
+
+class CrossLinker:
+    """Étape de liens : automate pour le rendu, puis mise à jour incrémentale du site"""
+
+    def __init__(self, output_dir: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.aliases: Dict[str, List[str]] = config.get('aliases', {})
+        self.min_length = config.get('min_length', 4)
+        self.output_dir = Path(output_dir)
+        self.logger = logging.getLogger(__name__)
+        self.targets: Optional[LinkTargets] = None
+        self.index = LinkIndex(output_dir) if self.enabled else None
+        self.stats = {'pages_linked': 0, 'links': 0, 'pages_relinked': 0}
+
+    def build(self, entries: Iterable[Tuple[str, str, str]]):
+        """Automate à partir de (clé, nom, chemin de la page) ; alias de la configuration par clé"""
+        if not self.enabled:
+            return
+        targets = {
+            key: (path, [name] + self.aliases.get(key, []))
+            for key, name, path in entries
+        }
+        self.targets = LinkTargets(targets, self.min_length)
+        self.logger.info(f"Liens croisés: {len(self.targets.patterns)} noms, "
+                         f"{len(self.targets.automaton.goto)} états")
+
+    def record(self, key: str, path: str, links: Iterable[str], words: Iterable[str]):
+        links = list(links)
+        self.index.record(key, path, links, words)
+        self.stats['pages_linked'] += 1
+        self.stats['links'] += len(links)
+
+    def pages_to_update(self, written: Set[str], relink_all: bool = False) -> List[str]:
+        """Pages existantes touchées par les noms ajoutés ou retirés
+
+        written : pages déjà liées pendant ce run ; relink_all : toutes les pages indexées.
+        """
+        if not self.targets:
+            return []
+        if relink_all:
+            # Pages de l'inventaire générées avant l'index des liens comprises
+            for key, path in self.targets.paths.items():
+                self.index.pages.setdefault(key, {'path': path, 'links': [], 'words': []})
+            keys = set(self.index.pages)
+        else:
+            keys = self.index.affected_pages(self.targets)
+        return sorted(keys - written)
+
+    def relink_page(self, key: str) -> Optional[Tuple[Path, str]]:
+        """Relie une page déjà écrite ; retourne (chemin, html) si elle a changé"""
+        page_path = self.index.pages[key]['path']
+        path = self.output_dir / page_path
+        try:
+            html = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            self.index.forget(key)
+            return None
+        linked, links, words = self.targets.link_html(html, key, page_path)
+        self.index.record(key, page_path, links, words)
+        if linked == html:
+            return None
+        self.stats['pages_relinked'] += 1
+        return path, linked
+
+    def save(self):
+        """Enregistre l'index avec les motifs courants (référence du prochain passage)"""
+        if not self.targets:
+            return
+        self.index.patterns = dict(self.targets.patterns)
+        self.index.save()
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
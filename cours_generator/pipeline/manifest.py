@@ -0,0 +1,105 @@
+"""
+Manifeste de build pour la régénération incrémentale
+Enregistre l'empreinte de chaque cours généré pour ne refaire que ce qui a changé
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+MANIFEST_VERSION = 1
+
+
+def hash_text(text: str) -> str:
+    """Hash SHA-256 d'un texte"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def hash_file(path: Path) -> Optional[str]:
+    """Hash SHA-256 du contenu d'un fichier, None s'il n'existe pas"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class BuildManifest:
+    """Manifeste JSON écrit à côté du répertoire de sortie"""
+
+    def __init__(self, output_dir: str):
+        output_path = Path(output_dir)
+        self.path = output_path.with_name(f"{output_path.name}.manifest.json")
+        self.logger = logging.getLogger(__name__)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    @staticmethod
+    def make_key(category: str, filename: str) -> str:
+        return f"{category}/{filename}"
+
+    @staticmethod
+    def fingerprint(prompt: str, model: str, options: Dict[str, Any],
+                    template_version: str) -> Dict[str, str]:
+        """Empreinte des entrées d'une génération"""
+        return {
+            'prompt': hash_text(prompt),
+            'model': model,
+            'options': hash_text(json.dumps(options, sort_keys=True)),
+            'template_version': template_version
+        }
+
+    def load(self):
+        """Charge le manifeste existant"""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('items', {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Manifeste illisible, reconstruction complète: {str(e)}")
+            self.entries = {}
+
+    def save(self):
+        """Écrit le manifeste de façon atomique"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'items': self.entries}, f,
+                      ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get_change(self, key: str, fingerprint: Dict[str, str], output_path: Path) -> Optional[str]:
+        """Retourne la raison d'une régénération, ou None si l'élément est à jour"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return 'new'
+
+        for field, value in fingerprint.items():
+            if entry.get(field) != value:
+                return field
+
+        output_hash = hash_file(output_path)
+        if output_hash is None:
+            return 'missing'
+        if output_hash != entry.get('output'):
+            return 'output'
+
+        return None
+
+    def record(self, key: str, fingerprint: Dict[str, str], output_path: Path):
+        """Enregistre l'empreinte d'un cours généré avec succès"""
+        self.entries[key] = {**fingerprint, 'output': hash_file(output_path)}
+
+    def refresh_output(self, key: str, output_path: Path):
+        """Met à jour le hash d'une page réécrite après coup (liens croisés) sans changer son empreinte"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry['output'] = hash_file(output_path)
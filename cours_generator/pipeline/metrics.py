@@ -0,0 +1,248 @@
+"""
+Métriques du pipeline au format Prometheus/OpenMetrics
+Compteurs et histogrammes étiquetés, exposés sur un endpoint HTTP local
+optionnel (/metrics) et sauvegardés en JSON en fin de run avec une série
+temporelle pour suivre le débit des longs runs
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+
+# Secondes : de la milliseconde (rendu, écriture) aux générations longues
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Catégorie de l'élément en cours de génération, propagée dans la tâche asyncio
+current_category: ContextVar[str] = ContextVar('current_category', default='')
+
+
+def _escape_label(value: str) -> str:
+    """Échappement d'une valeur d'étiquette du format texte Prometheus (\\, \" et saut de ligne)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Compteur monotone par combinaison d'étiquettes"""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *label_values: str):
+        key = tuple(label_values)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> List[str]:
+        return [f"{self.name}_total{_format_labels(self.labels, key)} {value:g}"
+                for key, value in sorted(self.values.items())]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'/'.join(key) or '_': value for key, value in sorted(self.values.items())}
+
+
+class Histogram:
+    """Histogramme cumulatif à seaux fixes par combinaison d'étiquettes"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # étiquettes -> [comptes par seau (non cumulés), somme, nombre]
+        self.series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        key = tuple(label_values)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def quantile(self, q: float, key: Tuple[str, ...]) -> float:
+        """Estimation par interpolation linéaire dans le seau (comme histogram_quantile)"""
+        counts, _, count = self.series[key]
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return 0.0
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            '/'.join(key) or '_': {
+                'count': count,
+                'sum': round(total, 6),
+                'p50': round(self.quantile(0.5, key), 4),
+                'p95': round(self.quantile(0.95, key), 4),
+                'buckets': dict(zip([f'{b:g}' for b in self.buckets] + ['+Inf'], counts))
+            }
+            for key, (counts, total, count) in sorted(self.series.items())
+        }
+
+
+class MetricsRegistry:
+    """Ensemble des métriques d'un run
+
+    Les métriques étiquetées par catégorie reçoivent automatiquement la
+    catégorie courante (current_category) si elle n'est pas donnée.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.host = config.get('host', '127.0.0.1')
+        self.port = config.get('port')
+        self.json_path = config.get('json')
+        self.sample_interval = config.get('sample_interval', 10)
+        self.logger = logging.getLogger(__name__)
+        self.metrics: Dict[str, Any] = {}
+        self.timeline: List[Dict[str, Any]] = []
+        self._started = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+        self._sampler: Optional[asyncio.Task] = None
+
+        category = ('category',)
+        self.counter('cours_items', 'Éléments traités par catégorie et issue', category + ('outcome',))
+        self.counter('cours_failures', "Échecs par catégorie et étape", category + ('stage',))
+        self.counter('ollama_requests', 'Requêtes Ollama par catégorie et issue', category + ('outcome',))
+        self.counter('ollama_retries', 'Nouvelles tentatives de requêtes Ollama', category)
+        self.counter('ollama_cache_hits', 'Réponses servies par le cache de génération', category)
+        self.counter('ollama_eval_tokens', 'Tokens générés (eval_count)', category)
+        self.counter('ollama_prompt_eval_tokens', 'Tokens de prompt évalués (prompt_eval_count)', category)
+        self.counter('cours_quality_checks', 'Générations contrôlées par catégorie et issue', category + ('outcome',))
+        self.counter('cours_quality_wasted_tokens', 'Tokens des générations refusées par le contrôle qualité', category)
+        self.histogram('cours_prompt_build_seconds', 'Construction du prompt', category)
+        self.histogram('ollama_request_seconds', "Latence d'une requête Ollama", category)
+        self.histogram('ollama_time_to_first_token_seconds', 'Délai avant le premier token (streaming)', category)
+        self.histogram('cours_render_seconds', "Rendu HTML d'une page", category)
+        self.histogram('cours_write_seconds', "Écriture d'une page", category)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def _label_values(self, metric: Any, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if 'category' in metric.labels and 'category' not in labels:
+            labels['category'] = current_category.get()
+        return tuple(str(labels.get(name, '')) for name in metric.labels)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str):
+        metric = self.metrics[name]
+        metric.inc(amount, *self._label_values(metric, labels))
+
+    def observe(self, name: str, value: float, **labels: str):
+        metric = self.metrics[name]
+        metric.observe(value, *self._label_values(metric, labels))
+
+    def render(self) -> str:
+        """Format texte d'exposition Prometheus"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def sample(self):
+        """Point de la série temporelle : totaux cumulés depuis le début du run"""
+        self.timeline.append({
+            't': round(time.monotonic() - self._started, 2),
+            **{name: metric.total() for name, metric in self.metrics.items() if isinstance(metric, Counter)}
+        })
+
+    async def _sample_loop(self):
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            self.sample()
+
+    async def start(self):
+        """Démarre l'échantillonnage et, si un port est configuré, l'endpoint /metrics"""
+        self._started = time.monotonic()
+        if self.sample_interval:
+            self._sampler = asyncio.create_task(self._sample_loop())
+        if self.port is None:
+            return
+
+        async def handle_metrics(request: web.Request) -> web.Response:
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.logger.info(f"Métriques exposées sur http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """Arrête l'endpoint et sauvegarde le JSON"""
+        if self._sampler:
+            self._sampler.cancel()
+            await asyncio.gather(self._sampler, return_exceptions=True)
+            self._sampler = None
+        self.sample()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self.json_path:
+            self.dump(self.json_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'metrics': {name: metric.to_dict() for name, metric in self.metrics.items()},
+            'timeline': self.timeline
+        }
+
+    def dump(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        self.logger.info(f"Métriques sauvegardées: {path}")
@@ -0,0 +1,218 @@
+"""
+Ordonnancement par priorité
+Les éléments sont traités par valeur décroissante (statut dans l'inventaire ×
+poids de la catégorie) au lieu de l'ordre des catégories. Avec un budget de
+temps ou une échéance, seuls les éléments les plus utiles qui tiennent dans le
+temps imparti sont retenus, d'après la latence glissante de chaque catégorie
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ESTIMATES_VERSION = 1
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([hms]?)')
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1, '': 1}
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Durée en secondes : 7200, « 2h », « 1h30 », « 90m », « 45s »"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise ValueError(f"Durée invalide: {value}")
+        return float(value)
+    text = str(value).strip().lower()
+    parts = DURATION_RE.findall(text)
+    if not parts or DURATION_RE.sub('', text).strip():
+        raise ValueError(f"Durée invalide: {value}")
+    seconds = 0.0
+    for index, (amount, unit) in enumerate(parts):
+        # « 1h30 » : un nombre sans unité après des heures compte en minutes
+        if not unit and index and parts[index - 1][1] == 'h':
+            unit = 'm'
+        seconds += float(amount) * DURATION_UNITS[unit]
+    return seconds
+
+
+def parse_deadline(value: Any, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Échéance : date ISO (« 2025-06-01T08:00 ») ou heure seule (« 08:00 », le jour même ou le lendemain)"""
+    if not value:
+        return None
+    now = now or datetime.now()
+    text = str(value).strip()
+    try:
+        deadline = datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    else:
+        # Échéance avec fuseau (« 2030-06-01T08:00+02:00 ») : ramenée à l'heure locale naïve
+        return deadline.astimezone().replace(tzinfo=None) if deadline.tzinfo else deadline
+    try:
+        clock = datetime.strptime(text, '%H:%M')
+    except ValueError:
+        raise ValueError(f"Échéance invalide: {value}")
+    deadline = now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    return deadline if deadline > now else deadline + timedelta(days=1)
+
+
+class LatencyEstimates:
+    """Durée moyenne glissante (EWMA) de génération d'un élément par catégorie
+
+    Persistée à côté du répertoire de sortie (<output_dir>.latency.json) pour
+    planifier le run suivant. Les générations quasi instantanées (cache,
+    journal) ne sont pas des mesures : elles sont ignorées sous min_sample.
+    """
+
+    def __init__(self, output_dir: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        output_path = Path(output_dir)
+        self.path = output_path.with_name(f"{output_path.name}.latency.json")
+        self.alpha = config.get('latency_alpha', 0.2)
+        self.min_sample = config.get('min_sample', 0.2)
+        self.default = config.get('default_latency', 30.0)
+        self.logger = logging.getLogger(__name__)
+        self.estimates: Dict[str, Dict[str, float]] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Estimations de latence illisibles, valeurs par défaut: {str(e)}")
+            return
+        if data.get('version') == ESTIMATES_VERSION:
+            self.estimates = data.get('categories', {})
+
+    def save(self):
+        """Écriture atomique"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ESTIMATES_VERSION, 'categories': self.estimates}, f,
+                      ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def observe(self, category: str, seconds: float):
+        if seconds < self.min_sample:
+            return
+        entry = self.estimates.get(category)
+        if entry is None:
+            self.estimates[category] = {'latency': round(seconds, 3), 'samples': 1}
+            return
+        entry['latency'] = round(entry['latency'] + self.alpha * (seconds - entry['latency']), 3)
+        entry['samples'] += 1
+
+    def get(self, category: str) -> float:
+        """Estimation de la catégorie, sinon moyenne des catégories connues, sinon default_latency"""
+        entry = self.estimates.get(category)
+        if entry is not None:
+            return entry['latency']
+        if self.estimates:
+            return sum(entry['latency'] for entry in self.estimates.values()) / len(self.estimates)
+        return self.default
+
+
+class PriorityPlanner:
+    """Ordre de traitement par valeur et sélection dans un budget de temps"""
+
+    def __init__(self, output_dir: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.status_weights = {'to_create': 3.0, 'unknown': 2.0, 'exists': 1.0, **config.get('status_weights', {})}
+        self.category_weights: Dict[str, float] = config.get('category_weights', {})
+        self.budget = parse_duration(config.get('budget'))
+        self.deadline = parse_deadline(config.get('deadline'))
+        # Part du budget planifiée : marge pour la fin du rendu, de l'écriture et des liens
+        self.budget_margin = config.get('budget_margin', 0.9)
+        self.latency = LatencyEstimates(output_dir, config)
+        self.logger = logging.getLogger(__name__)
+        self._started: Optional[float] = None
+        self._time_limit: Optional[float] = None
+        self.stats = {
+            'planned': 0,
+            'deferred': 0,
+            'deferred_at_run': 0,
+            'planned_value': 0.0,
+            'deferred_value': 0.0,
+            'estimated_seconds': 0.0,
+            'time_limit': None
+        }
+
+    def value(self, category: str, item: Dict[str, Any]) -> float:
+        return self.status_weights.get(item.get('status'), 1.0) * self.category_weights.get(category, 1.0)
+
+    def time_limit(self) -> Optional[float]:
+        """Secondes disponibles : budget et/ou temps restant avant l'échéance"""
+        limits = [self.budget] if self.budget is not None else []
+        if self.deadline:
+            limits.append(max(0.0, (self.deadline - datetime.now()).total_seconds()))
+        return min(limits) if limits else None
+
+    def plan(self, items: List[Tuple[str, Dict[str, Any]]], concurrency: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """Éléments par valeur décroissante (ordre de l'inventaire à valeur égale)
+
+        Avec un budget ou une échéance, les éléments sont retenus par valeur
+        décroissante tant que leur durée estimée (latence de la catégorie,
+        répartie sur concurrency requêtes simultanées) tient dans le temps
+        disponible ; un élément trop long laisse sa place aux suivants.
+        """
+        self._started = time.monotonic()
+        self._time_limit = self.time_limit()
+        if not self.enabled:
+            self.stats['planned'] = len(items)
+            return items
+
+        ranked = sorted(enumerate(items), key=lambda entry: (-self.value(*entry[1]), entry[0]))
+        ordered = [item for _, item in ranked]
+        if self._time_limit is None:
+            selected, deferred = ordered, []
+        else:
+            capacity = self._time_limit * self.budget_margin * max(1, concurrency)
+            selected, deferred = [], []
+            used = 0.0
+            for category, item in ordered:
+                cost = self.latency.get(category)
+                if used + cost <= capacity:
+                    selected.append((category, item))
+                    used += cost
+                else:
+                    deferred.append((category, item))
+            self.stats['estimated_seconds'] = round(used / max(1, concurrency), 1)
+            self.stats['time_limit'] = round(self._time_limit, 1)
+            self.logger.info(
+                f"Budget de {self._time_limit / 60:.0f} min: {len(selected)}/{len(items)} éléments retenus "
+                f"(~{used / max(1, concurrency) / 60:.0f} min estimées), {len(deferred)} reportés"
+            )
+
+        self.stats['planned'] = len(selected)
+        self.stats['deferred'] = len(deferred)
+        self.stats['planned_value'] = sum(self.value(*entry) for entry in selected)
+        self.stats['deferred_value'] = sum(self.value(*entry) for entry in deferred)
+        return selected
+
+    def should_start(self, category: str) -> bool:
+        """Faux si l'élément ne peut plus finir avant la limite (budget dépassé en cours de run)"""
+        if self._time_limit is None:
+            return True
+        remaining = self._time_limit - (time.monotonic() - self._started)
+        if remaining >= self.latency.get(category):
+            return True
+        self.stats['deferred_at_run'] += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'latency': {category: entry['latency'] for category, entry in sorted(self.latency.estimates.items())}
+        }
@@ -0,0 +1,330 @@
+"""
+Mode profil des runs de génération
+Mesure le temps mural de chaque étape (spans) et de chaque tâche asyncio,
+profile le CPU avec cProfile (boucle d'événements et threads de rendu) et
+échantillonne les piles de tous les threads pour produire un fichier de piles
+repliées (flamegraph.pl, speedscope)
+"""
+
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Coroutine
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """Mesure d'une étape ; le temps est ajouté même si l'étape lève une exception"""
+
+    __slots__ = ('profiler', 'stage', 'start')
+
+    def __init__(self, profiler: 'Profiler', stage: str):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.spans.setdefault(self.stage, []).append(time.perf_counter() - self.start)
+        return False
+
+
+class _CPUSpan(_Span):
+    """Span dont le CPU est profilé par le cProfile du thread courant"""
+
+    __slots__ = ('profile',)
+
+    def __enter__(self):
+        self.profile = self.profiler._thread_profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Python >= 3.12 : un seul profileur actif, celui de la boucle couvre déjà ce thread
+            self.profile = None
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        if self.profile is not None:
+            self.profile.disable()
+        return False
+
+
+class _TimedCoroutine(Coroutine):
+    """Coroutine d'une tâche asyncio dont chaque pas (send/throw) est chronométré
+
+    Le temps CPU du thread de la boucle pendant un pas est celui de la tâche :
+    une seule tâche s'exécute à la fois sur la boucle.
+    """
+
+    __slots__ = ('_coro', '_profiler', 'name', 'created', 'running', 'cpu', 'steps')
+
+    def __init__(self, coro, profiler: 'Profiler'):
+        self._coro = coro
+        self._profiler = profiler
+        self.name = getattr(coro, '__qualname__', type(coro).__name__)
+        self.created = time.perf_counter()
+        self.running = 0.0
+        self.cpu = 0.0
+        self.steps = 0
+
+    def _step(self, method, *args):
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        done = True
+        try:
+            result = method(*args)
+            done = False
+            return result
+        finally:
+            self.running += time.perf_counter() - start
+            self.cpu += time.thread_time() - cpu_start
+            self.steps += 1
+            if done:
+                self._profiler._task_done(self)
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    # Attributs lus par asyncio pour le repr des tâches et les avertissements
+    def __getattr__(self, name: str):
+        return getattr(self._coro, name)
+
+
+class Profiler:
+    """Spans par étape, cProfile et piles échantillonnées ; coût quasi nul si désactivé"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.output_dir = Path(config.get('output_dir', 'output/profile'))
+        self.cprofile = config.get('cprofile', True)
+        # Période d'échantillonnage des piles (0 = désactivé)
+        self.sample_interval = config.get('sample_interval', 0.005)
+        # Temps mural, temps d'exécution sur la boucle et CPU par tâche asyncio (fabrique de tâches)
+        self.task_accounting = config.get('tasks', True)
+        self.logger = logging.getLogger(__name__)
+
+        self.spans: Dict[str, List[float]] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.tasks: Dict[str, Dict[str, float]] = {}
+        self._profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._main_profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started = 0.0
+        self.wall_time = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+
+    def span(self, stage: str):
+        """Contexte mesurant le temps mural d'une étape (utilisable autour d'un await)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def cpu_span(self, stage: str):
+        """Comme span, avec cProfile pour une étape CPU exécutée dans un thread de rendu"""
+        if not self.enabled:
+            return _NULL_SPAN
+        if not self.cprofile:
+            return _Span(self, stage)
+        return _CPUSpan(self, stage)
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            self._profiles.append(profile)
+        return profile
+
+    def start(self):
+        """Démarre le profil du thread de la boucle d'événements et l'échantillonneur"""
+        if not self.enabled:
+            return
+        self._started = time.perf_counter()
+        if self.cprofile:
+            self._main_profile = cProfile.Profile()
+            self._profiles.append(self._main_profile)
+            self._main_profile.enable()
+        if self.task_accounting:
+            self._install_task_factory()
+        if self.sample_interval:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Arrête les mesures et écrit les rapports"""
+        if not self.enabled:
+            return
+        if self._main_profile:
+            self._main_profile.disable()
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.wall_time = time.perf_counter() - self._started
+        self.write_reports()
+
+    def _install_task_factory(self):
+        """Chronomètre les tâches créées sur la boucle courante (sans effet hors d'une boucle)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        previous = loop.get_task_factory()
+
+        def task_factory(loop, coro, **kwargs):
+            timed = _TimedCoroutine(coro, self)
+            if previous is not None:
+                return previous(loop, timed, **kwargs)
+            return asyncio.Task(timed, loop=loop, **kwargs)
+
+        self._loop, self._previous_factory = loop, previous
+        loop.set_task_factory(task_factory)
+
+    def _task_done(self, task: _TimedCoroutine):
+        stats = self.tasks.get(task.name)
+        if stats is None:
+            stats = self.tasks[task.name] = {'count': 0, 'wall': 0.0, 'running': 0.0, 'cpu': 0.0, 'steps': 0}
+        stats['count'] += 1
+        stats['wall'] += time.perf_counter() - task.created
+        stats['running'] += task.running
+        stats['cpu'] += task.cpu
+        stats['steps'] += task.steps
+
+    def _sample_loop(self):
+        names = {}
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Temps mural par étape : nombre, total, moyenne, p95, max et part du run"""
+        rows = []
+        for stage, durations in self.spans.items():
+            ordered = sorted(durations)
+            total = sum(ordered)
+            rows.append({
+                'stage': stage,
+                'count': len(ordered),
+                'total_s': round(total, 3),
+                'mean_ms': round(total / len(ordered) * 1000, 2),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2),
+                # Les étapes se chevauchent (requêtes concurrentes) : peut dépasser 100 %
+                'wall_pct': round(total / self.wall_time * 100, 1) if self.wall_time else 0.0
+            })
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def format_summary(self) -> str:
+        header = f"{'étape':<12} {'nombre':>8} {'total (s)':>10} {'moy (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10} {'% run':>7}"
+        lines = [header, '-' * len(header)]
+        for row in self.summary():
+            lines.append(
+                f"{row['stage']:<12} {row['count']:>8} {row['total_s']:>10.3f} {row['mean_ms']:>10.2f} "
+                f"{row['p95_ms']:>10.2f} {row['max_ms']:>10.2f} {row['wall_pct']:>7.1f}"
+            )
+        lines.append(f"Durée du run: {self.wall_time:.2f}s, {self.samples} échantillons de piles")
+        return '\n'.join(lines)
+
+    def task_summary(self) -> List[Dict[str, Any]]:
+        """Par coroutine de tâche terminée : nombre, temps mural (création -> fin),
+        temps passé à s'exécuter sur la boucle, CPU et nombre de pas"""
+        rows = [
+            {
+                'task': name,
+                'count': stats['count'],
+                'wall_s': round(stats['wall'], 3),
+                'mean_wall_ms': round(stats['wall'] / stats['count'] * 1000, 2),
+                'running_s': round(stats['running'], 3),
+                'cpu_s': round(stats['cpu'], 3),
+                'steps': stats['steps'],
+                # Part du temps d'exécution sur la boucle (le reste est de l'attente)
+                'loop_pct': round(stats['running'] / stats['wall'] * 100, 1) if stats['wall'] else 0.0
+            }
+            for name, stats in self.tasks.items()
+        ]
+        return sorted(rows, key=lambda row: row['cpu_s'], reverse=True)
+
+    def format_task_summary(self) -> str:
+        header = (f"{'tâche':<44} {'nombre':>8} {'mural (s)':>10} {'moy (ms)':>10} "
+                  f"{'boucle (s)':>10} {'CPU (s)':>9} {'pas':>8} {'% boucle':>8}")
+        lines = [header, '-' * len(header)]
+        for row in self.task_summary():
+            lines.append(
+                f"{row['task'][:44]:<44} {row['count']:>8} {row['wall_s']:>10.3f} {row['mean_wall_ms']:>10.2f} "
+                f"{row['running_s']:>10.3f} {row['cpu_s']:>9.3f} {row['steps']:>8} {row['loop_pct']:>8.1f}"
+            )
+        return '\n'.join(lines)
+
+    def write_reports(self):
+        """stages.txt (tableau), tasks.txt (tâches asyncio), cpu.prof (pstats) et stacks.collapsed (piles repliées)"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        table = self.format_summary()
+        (self.output_dir / 'stages.txt').write_text(table + '\n', encoding='utf-8')
+        self.logger.info(f"Profil par étape:\n{table}")
+
+        if self.tasks:
+            task_table = self.format_task_summary()
+            (self.output_dir / 'tasks.txt').write_text(task_table + '\n', encoding='utf-8')
+            self.logger.info(f"Profil par tâche asyncio:\n{task_table}")
+
+        profiles = [profile for profile in self._profiles if profile.getstats()]
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(str(self.output_dir / 'cpu.prof'))
+
+        if self.stacks:
+            with open(self.output_dir / 'stacks.collapsed', 'w', encoding='utf-8') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        self.logger.info(f"Rapports de profil dans {self.output_dir}")
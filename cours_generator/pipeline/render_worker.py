@@ -0,0 +1,44 @@
+"""
+Rendu HTML exécuté hors de la boucle d'événements
+Utilisé par le pool de processus (un HTMLGenerator par processus) ou de threads
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from generators.html_generator import HTMLGenerator
+from pipeline.linker import LinkTargets
+
+
+_generator: Optional[HTMLGenerator] = None
+_link_targets: Optional[LinkTargets] = None
+
+
+def init_worker(templates_config: Dict[str, Any], link_targets: Optional[LinkTargets] = None):
+    """Initialise le générateur HTML (et l'automate des liens) d'un processus de rendu"""
+    global _generator, _link_targets
+    _generator = HTMLGenerator(templates_config)
+    _link_targets = link_targets
+
+
+def render_job(generator: HTMLGenerator, job: Dict[str, Any],
+               link_targets: Optional[LinkTargets] = None) -> Dict[str, Any]:
+    """Rend la page d'un élément et l'ajoute au job, avec la durée du rendu (hors attente du pool)
+
+    Avec link_targets, les liens croisés sont insérés dans la même passe ; le job
+    reçoit les clés liées et les mots de la page pour l'index des liens.
+    """
+    start = time.perf_counter()
+    html = generator.generate_html(job['category'], job['item'], job['content'], job.get('prerendered'))
+    rendered = {**job, 'html': html}
+    rendered.pop('prerendered', None)
+    if link_targets is not None:
+        rendered['html'], links, words = link_targets.link_html(html, job['key'], job['page_path'])
+        rendered['links'], rendered['words'] = sorted(links), sorted(words)
+    rendered['render_time'] = time.perf_counter() - start
+    return rendered
+
+
+def render_page(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Point d'entrée du pool de processus"""
+    return render_job(_generator, job, _link_targets)
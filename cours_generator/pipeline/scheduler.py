@@ -0,0 +1,129 @@
+"""
+Ordonnanceur à concurrence bornée
+Remplace le traitement par batches fixes par une file de travail continue
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class RateLimiter:
+    """Limiteur de débit simple (nombre maximal de démarrages par seconde)"""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Attend le prochain créneau disponible"""
+        if not self.interval:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class WorkQueueScheduler:
+    """Pool de workers qui consomment une file asyncio bornée"""
+
+    def __init__(self, concurrency: int = 5, queue_size: Optional[int] = None,
+                 rate_limit: Optional[float] = None):
+        self.concurrency = max(1, concurrency)
+        # File bornée : le producteur attend quand les workers sont saturés
+        self.queue_size = queue_size or self.concurrency * 2
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.logger = logging.getLogger(__name__)
+
+        # Statistiques
+        self.latencies: List[float] = []
+        self.busy_time = 0.0
+        self.wall_time = 0.0
+        # Durée x workers réellement lancés (moins que concurrency s'il y a peu d'éléments)
+        self.slot_time = 0.0
+        self.stats = {
+            'processed': 0,
+            'failed': 0,
+            'max_queue_depth': 0
+        }
+
+    async def run(self, items: List[tuple],
+                  handler: Callable[..., Awaitable[Any]]) -> List[Any]:
+        """Traite tous les éléments (tuples d'arguments du handler) dans l'ordre d'entrée"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: List[Any] = [None] * len(items)
+        start = time.monotonic()
+
+        workers = [
+            asyncio.create_task(self._worker(queue, handler, results))
+            for _ in range(min(self.concurrency, max(1, len(items))))
+        ]
+
+        for index, item in enumerate(items):
+            await queue.put((index, item))
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], queue.qsize())
+
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.monotonic() - start
+        self.wall_time += elapsed
+        self.slot_time += elapsed * len(workers)
+        return results
+
+    async def _worker(self, queue: asyncio.Queue, handler: Callable[..., Awaitable[Any]],
+                      results: List[Any]):
+        """Boucle d'un worker : prend un élément, le traite, recommence"""
+        while True:
+            index, item = await queue.get()
+            try:
+                await self.rate_limiter.acquire()
+                item_start = time.monotonic()
+                try:
+                    results[index] = await handler(*item)
+                    self.stats['processed'] += 1
+                except Exception as e:
+                    self.logger.error(f"Erreur worker: {str(e)}")
+                    results[index] = e
+                    self.stats['failed'] += 1
+                finally:
+                    elapsed = time.monotonic() - item_start
+                    self.latencies.append(elapsed)
+                    self.busy_time += elapsed
+            finally:
+                queue.task_done()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne latences par élément et taux d'occupation des slots"""
+        latencies = sorted(self.latencies)
+        return {
+            **self.stats,
+            'concurrency': self.concurrency,
+            'wall_time': round(self.wall_time, 3),
+            'latency_avg': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'latency_p50': round(_percentile(latencies, 50), 3),
+            'latency_p95': round(_percentile(latencies, 95), 3),
+            'latency_p99': round(_percentile(latencies, 99), 3),
+            'latency_max': round(latencies[-1], 3) if latencies else 0.0,
+            'slot_utilisation': round(
+                self.busy_time / max(1e-9, self.slot_time) * 100, 1
+            )
+        }
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Percentile par rang le plus proche sur une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(percent / 100 * len(sorted_values)))) - 1
+    return sorted_values[rank]
@@ -0,0 +1,179 @@
+"""
+Pipeline de génération en étapes découplées
+Récupération LLM (async) -> file bornée -> rendu HTML (pool) -> file bornée -> écriture (async)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .scheduler import WorkQueueScheduler
+
+
+_DONE = object()
+
+
+class StageQueue:
+    """File asyncio bornée qui mesure sa profondeur et le temps d'attente des éléments"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.stats = {
+            'puts': 0,
+            'max_depth': 0,
+            'depth_sum': 0,
+            'wait_time': 0.0,
+            'blocked_time': 0.0
+        }
+
+    async def put(self, item: Any):
+        if item is _DONE:
+            await self._queue.put((0.0, item))
+            return
+
+        start = time.monotonic()
+        await self._queue.put((start, item))
+        self.stats['blocked_time'] += time.monotonic() - start
+        depth = self._queue.qsize()
+        self.stats['puts'] += 1
+        self.stats['depth_sum'] += depth
+        self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+
+    async def get(self) -> Any:
+        queued_at, item = await self._queue.get()
+        if item is not _DONE:
+            self.stats['wait_time'] += time.monotonic() - queued_at
+        return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        puts = max(1, self.stats['puts'])
+        return {
+            'puts': self.stats['puts'],
+            'max_depth': self.stats['max_depth'],
+            'avg_depth': round(self.stats['depth_sum'] / puts, 2),
+            'avg_wait': round(self.stats['wait_time'] / puts, 4),
+            'producer_blocked_time': round(self.stats['blocked_time'], 3)
+        }
+
+
+class StagedPipeline:
+    """Enchaîne récupération, rendu et écriture sans bloquer la boucle d'événements"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.concurrency = config.get('concurrency', 5)
+        self.queue_size = config.get('queue_size')
+        self.rate_limit = config.get('rate_limit')
+        self.render_executor = config.get('render_executor', 'process')
+        self.render_workers = config.get('render_workers') or min(4, os.cpu_count() or 1)
+        self.render_queue_size = config.get('render_queue_size', 10)
+        self.write_queue_size = config.get('write_queue_size', 20)
+        self.writers = config.get('writers', 2)
+        self.logger = logging.getLogger(__name__)
+
+        self.scheduler: Optional[WorkQueueScheduler] = None
+        self.stage_time = {'render': 0.0, 'write': 0.0}
+        self.queues: List[StageQueue] = []
+        # (index de l'élément, étape, exception) des erreurs de rendu et d'écriture
+        self.errors: List[Tuple[int, str, Exception]] = []
+
+    def create_executor(self, initializer: Optional[Callable] = None,
+                        initargs: Tuple = ()) -> Executor:
+        """Pool de rendu : processus (CPU en parallèle) ou threads"""
+        if self.render_executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.render_workers,
+                                       initializer=initializer, initargs=initargs)
+        return ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix='render')
+
+    async def run(self, items: List[tuple],
+                  fetch: Callable[..., Awaitable[Any]],
+                  render: Callable[[Any], Any],
+                  write: Callable[[Any], Awaitable[Any]],
+                  executor: Executor) -> List[Any]:
+        """Exécute le pipeline et retourne le résultat de l'écriture pour chaque élément
+
+        fetch(*item) -> charge utile ou None ; render(charge) -> charge, exécuté dans
+        l'executor ; write(charge) -> résultat. None à une étape arrête l'élément.
+        """
+        loop = asyncio.get_running_loop()
+        render_queue = StageQueue('render', self.render_queue_size)
+        write_queue = StageQueue('write', self.write_queue_size)
+        self.queues = [render_queue, write_queue]
+        results: List[Any] = [None] * len(items)
+
+        async def fetch_stage(index: int, *args):
+            payload = await fetch(*args)
+            if payload is not None:
+                await render_queue.put((index, payload))
+            return payload is not None
+
+        async def render_worker():
+            while True:
+                job = await render_queue.get()
+                if job is _DONE:
+                    return
+                index, payload = job
+                start = time.monotonic()
+                try:
+                    rendered = await loop.run_in_executor(executor, render, payload)
+                except Exception as e:
+                    self.logger.error(f"Erreur rendu: {str(e)}")
+                    results[index] = e
+                    self.errors.append((index, 'render', e))
+                    continue
+                finally:
+                    self.stage_time['render'] += time.monotonic() - start
+                if rendered is not None:
+                    await write_queue.put((index, rendered))
+
+        async def write_worker():
+            while True:
+                job = await write_queue.get()
+                if job is _DONE:
+                    return
+                index, payload = job
+                start = time.monotonic()
+                try:
+                    results[index] = await write(payload)
+                except Exception as e:
+                    self.logger.error(f"Erreur écriture: {str(e)}")
+                    results[index] = e
+                    self.errors.append((index, 'write', e))
+                finally:
+                    self.stage_time['write'] += time.monotonic() - start
+
+        renderers = [asyncio.create_task(render_worker()) for _ in range(self.render_workers)]
+        writers = [asyncio.create_task(write_worker()) for _ in range(self.writers)]
+
+        self.scheduler = WorkQueueScheduler(
+            concurrency=self.concurrency,
+            queue_size=self.queue_size,
+            rate_limit=self.rate_limit
+        )
+        try:
+            await self.scheduler.run(
+                [(index, *item) for index, item in enumerate(items)], fetch_stage
+            )
+        finally:
+            # Arrêt ordonné : on vide chaque étape avant de fermer la suivante
+            for _ in renderers:
+                await render_queue.put(_DONE)
+            await asyncio.gather(*renderers, return_exceptions=True)
+            for _ in writers:
+                await write_queue.put(_DONE)
+            await asyncio.gather(*writers, return_exceptions=True)
+
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques par étape (files, temps de rendu et d'écriture)"""
+        return {
+            'fetch': self.scheduler.get_stats() if self.scheduler else {},
+            'render_time': round(self.stage_time['render'], 3),
+            'write_time': round(self.stage_time['write'], 3),
+            'queues': {queue.name: queue.get_stats() for queue in self.queues}
+        }
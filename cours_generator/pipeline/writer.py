@@ -0,0 +1,228 @@
+"""
+Écriture des pages générées
+Écritures hors boucle, atomiques (fichier temporaire + os.replace), regroupées
+par lots pour les petits fichiers, avec archive optionnelle du site complet
+"""
+
+import asyncio
+import io
+import logging
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class OutputWriter:
+    """Écrivain asynchrone des fichiers de sortie"""
+
+    def __init__(self, root: str, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.root = Path(root)
+        self.fsync = config.get('fsync', False)
+        # Regroupement des petits fichiers (0 désactive) ; chaque écriture attend son lot,
+        # il faut donc au moins batch_files écritures simultanées pour remplir un lot
+        self.batch_max_bytes = config.get('batch_max_bytes', 0)
+        self.batch_files = config.get('batch_files', 16)
+        self.batch_delay = config.get('batch_delay', 0.05)
+        self.archive_path = config.get('archive')
+
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=config.get('threads', 1),
+                                            thread_name_prefix='writer')
+        self._lock = threading.Lock()
+        self._created_dirs: Set[Path] = set()
+        self._pending: List[Tuple[Path, bytes, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._archive = None
+        self._archived: Set[str] = set()
+
+        # Statistiques (latence d'écriture en agrégats glissants, sans liste par fichier)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.stats = {
+            'files_written': 0,
+            'files_failed': 0,
+            'bytes_written': 0,
+            'batches': 0,
+            'dirs_created': 0,
+            'io_time': 0.0
+        }
+
+    async def write(self, path: Path, content: str) -> Path:
+        """Écrit un fichier ; retourne son chemin une fois sur disque"""
+        start = time.monotonic()
+        data = content.encode('utf-8')
+        loop = asyncio.get_running_loop()
+
+        if self.batch_max_bytes and len(data) <= self.batch_max_bytes:
+            future = loop.create_future()
+            self._pending.append((Path(path), data, future))
+            if len(self._pending) >= self.batch_files:
+                self._schedule_flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_delay, self._schedule_flush)
+            await future
+        else:
+            error = (await loop.run_in_executor(self._executor, self._write_many, [(Path(path), data)]))[0]
+            if error is not None:
+                raise error
+
+        elapsed = time.monotonic() - start
+        self.latency_sum += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        return Path(path)
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        task = asyncio.ensure_future(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self):
+        """Écrit le lot en attente en un seul passage dans le pool ; chaque fichier a son propre résultat"""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        loop = asyncio.get_running_loop()
+        try:
+            errors = await loop.run_in_executor(
+                self._executor, self._write_many, [(path, data) for path, data, _ in batch]
+            )
+        except Exception as e:
+            errors = [e] * len(batch)
+
+        self.stats['batches'] += 1
+        for (_, _, future), error in zip(batch, errors):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    def _write_many(self, files: List[Tuple[Path, bytes]]) -> List[Optional[Exception]]:
+        """Écrit plusieurs fichiers (exécuté dans le pool d'écriture)
+
+        Retourne l'erreur de chaque fichier (None s'il est écrit) : un échec
+        n'invalide pas les fichiers du lot déjà remplacés sur disque.
+        """
+        start = time.monotonic()
+        errors: List[Optional[Exception]] = []
+        for path, data in files:
+            # Fichier temporaire puis remplacement atomique : jamais de page tronquée
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            try:
+                self._ensure_dir(path.parent)
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.error(f"Écriture de {path} échouée: {str(e)}")
+                try:
+                    tmp_path.unlink()
+                except OSError:
+                    pass
+                with self._lock:
+                    self.stats['files_failed'] += 1
+                errors.append(e)
+                continue
+            errors.append(None)
+
+            with self._lock:
+                self.stats['files_written'] += 1
+                self.stats['bytes_written'] += len(data)
+                if self.archive_path:
+                    self._add_to_archive(path, data)
+
+        with self._lock:
+            self.stats['io_time'] += time.monotonic() - start
+        return errors
+
+    def _ensure_dir(self, directory: Path):
+        """Crée chaque répertoire une seule fois"""
+        if directory in self._created_dirs:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if directory not in self._created_dirs:
+                self._created_dirs.add(directory)
+                self.stats['dirs_created'] += 1
+
+    def _open_archive(self):
+        archive_path = Path(self.archive_path)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        if archive_path.suffix == '.zip':
+            self._archive = zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(archive_path, 'w:gz')
+
+    def _add_to_archive(self, path: Path, data: bytes):
+        """Ajoute un fichier à l'archive (appelé sous verrou)"""
+        if self._archive is None:
+            self._open_archive()
+
+        try:
+            arcname = path.relative_to(self.root).as_posix()
+        except ValueError:
+            arcname = path.name
+        if arcname in self._archived:
+            return
+
+        if isinstance(self._archive, zipfile.ZipFile):
+            self._archive.writestr(arcname, data)
+        else:
+            info = tarfile.TarInfo(arcname)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+        self._archived.add(arcname)
+
+    def _finalize_archive(self):
+        """Complète l'archive avec les pages existantes non réécrites, puis la ferme"""
+        if self.root.exists():
+            for path in sorted(self.root.rglob('*.html')):
+                if path.relative_to(self.root).as_posix() in self._archived:
+                    continue
+                with self._lock:
+                    self._add_to_archive(path, path.read_bytes())
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+        self.logger.info(f"Archive du site: {self.archive_path} ({len(self._archived)} fichiers)")
+
+    async def close(self):
+        """Vide les lots en attente, finalise l'archive et arrête le pool"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        await self.flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+        loop = asyncio.get_running_loop()
+        if self.archive_path:
+            await loop.run_in_executor(self._executor, self._finalize_archive)
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Octets écrits et latence d'écriture"""
+        writes = self.stats['files_written']
+        return {
+            **self.stats,
+            'io_time': round(self.stats['io_time'], 3),
+            'write_latency_avg': round(self.latency_sum / writes, 4) if writes else 0.0,
+            'write_latency_max': round(self.latency_max, 4)
+        }